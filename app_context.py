@@ -0,0 +1,130 @@
+"""Application startup: the pygame subsystems the game uses, fonts, timings.
+
+pygame.init() brings up every subsystem, including audio, which the game
+never uses. AppContext initializes only the display, the timer and the font
+module, when the game is actually started rather than when main.py is
+imported.
+
+Finding a system font with pygame.font.match_font runs a fontconfig scan
+(fc-list) the first time it is called, which is most of a cold start on
+machines with many fonts installed. FontRegistry resolves each face once,
+remembers the path in a small JSON file across runs, and constructs each
+(face, size, bold) font once. Delete the file to pick up newly installed
+fonts.
+"""
+
+import json
+import os
+import time
+
+import pygame
+
+FONT_CACHE_VERSION = 1
+
+
+class StartupTimer:
+    """Wall-clock time of each startup phase, for the startup report"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.phases = []  # (name, seconds)
+
+    def mark(self, name):
+        """Record the time since the previous mark as phase `name`"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self):
+        parts = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.phases)
+        return f"Startup: {parts} (total {(self.last - self.start) * 1000:.1f} ms)"
+
+
+class FontRegistry:
+    """Fonts constructed once per (face, size, bold), with font paths cached on disk"""
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.paths = self._load_paths()  # "face:bold" -> file path, or None for pygame's default
+        self.fonts = {}  # (face, size, bold) -> pygame.font.Font
+        self.scans = 0  # match_font calls this run (0 when every path was cached)
+
+    def _load_paths(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cached, dict) or cached.get("version") != FONT_CACHE_VERSION:
+            return {}
+        return cached.get("paths", {})
+
+    def _save_paths(self):
+        temp_path = f"{self.cache_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": FONT_CACHE_VERSION, "paths": self.paths}, f, indent=1)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            pass  # Without a writable cache the fonts are simply looked up again next run
+
+    def resolve(self, face, bold=False):
+        """Return the font file for a face (None means pygame's default font)"""
+        key = f"{face}:{'bold' if bold else 'regular'}"
+        if key in self.paths:
+            path = self.paths[key]
+            if path is None or os.path.exists(path):
+                return path
+        path = pygame.font.match_font(face, bold=bold)
+        self.scans += 1
+        self.paths[key] = path
+        self._save_paths()
+        return path
+
+    def get(self, face, size, bold=False):
+        key = (face, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(self.resolve(face, bold), size)
+        return font
+
+
+class AppContext:
+    """The initialized pygame subsystems, display, fonts and startup timings"""
+
+    def __init__(self, font_cache_path):
+        self.timer = StartupTimer()
+        self.font_cache_path = font_cache_path
+        self.fonts = None
+        self.screen = None
+        self.size = (0, 0)
+        self.clock = None
+
+    def open_display(self, caption, aspect_ratio, fullscreen=True):
+        """Open the largest window of the given aspect ratio that fits the screen"""
+        pygame.display.init()
+        # Creating a Clock starts SDL's timer, which pygame.time.get_ticks needs
+        self.clock = pygame.time.Clock()
+
+        info = pygame.display.Info()
+        screen_width, screen_height = info.current_w, info.current_h
+        if screen_width / screen_height > aspect_ratio:
+            # Screen is wider than the aspect ratio, fit to height
+            size = (int(screen_height * aspect_ratio), screen_height)
+        else:
+            # Screen is taller than the aspect ratio, fit to width
+            size = (screen_width, int(screen_width / aspect_ratio))
+
+        # The fullscreen surface may be larger than requested; draw within `size`
+        self.size = size
+        self.screen = pygame.display.set_mode(size, pygame.FULLSCREEN if fullscreen else 0)
+        pygame.display.set_caption(caption)
+        self.timer.mark("display")
+        return self.screen
+
+    def init_fonts(self):
+        pygame.font.init()
+        self.fonts = FontRegistry(self.font_cache_path)
+        return self.fonts
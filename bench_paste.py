@@ -0,0 +1,69 @@
+"""Benchmark clipboard paste and multi-line delete in the editor buffer.
+
+Pastes clipboards of increasing size into a large buffer and reports the time
+per pasted line. With the bulk splice path the per-line cost stays flat, i.e.
+paste and delete time are linear in clipboard size and independent of the
+size of the file being edited.
+
+    uv run bench_paste.py
+"""
+
+import contextlib
+import io
+import os
+import time
+
+# Run without a real display or audio device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import main  # noqa: E402
+
+BUFFER_LINES = 50_000
+CLIPBOARD_SIZES = [1_000, 2_000, 4_000, 8_000, 16_000, 32_000, 64_000]
+REPEATS = 3
+
+
+def make_lines(count, prefix):
+    return [f"{prefix} {i:06d} | 0 1 | 1" for i in range(count)]
+
+
+def time_paste_and_delete(clipboard_lines):
+    """Return (best paste seconds, best delete seconds) for one clipboard"""
+    best_paste = best_delete = float("inf")
+    for _ in range(REPEATS):
+        main.text_buffer = main.LineRope(make_lines(BUFFER_LINES, "row"))
+        main.cursor_x, main.cursor_y = 3, BUFFER_LINES // 2
+        main.clear_selection()
+        main.clipboard = "\n".join(clipboard_lines)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            main.paste_from_clipboard()
+            best_paste = min(best_paste, time.perf_counter() - start)
+
+            # Select exactly what was pasted and delete it again
+            main.start_selection(3, BUFFER_LINES // 2)
+            main.update_selection(main.cursor_x, main.cursor_y)
+            start = time.perf_counter()
+            main.delete_selected_text()
+            best_delete = min(best_delete, time.perf_counter() - start)
+
+        assert len(main.text_buffer) == BUFFER_LINES
+    return best_paste, best_delete
+
+
+def main_benchmark():
+    main.init_app()
+    print(f"Buffer: {BUFFER_LINES} lines, best of {REPEATS}")
+    print(f"{'lines':>8} {'paste ms':>10} {'us/line':>8} {'delete ms':>10} {'us/line':>8}")
+    for size in CLIPBOARD_SIZES:
+        paste_s, delete_s = time_paste_and_delete(make_lines(size, "paste"))
+        print(
+            f"{size:>8} {paste_s * 1000:>10.2f} {paste_s / size * 1e6:>8.3f}"
+            f" {delete_s * 1000:>10.2f} {delete_s / size * 1e6:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,180 @@
+"""Benchmark SequentialSimulator on a J16-sized clocked datapath.
+
+Generates a single-cycle 16-bit core in the workspace's structural style -
+an 8 x 16-bit register file with two read ports, a ripple-carry ALU (add,
+and, xor, pass B), a program counter with increment and branch - flattens
+it with the workspace's gate library and steps it with pseudo-random
+instructions on both simulators (change-driven and compiled), reporting
+cycles per second per lane and for all lanes.
+
+    uv run bench_sequential.py
+"""
+
+import random
+import time
+
+from sequential import CompiledSequentialSimulator, SequentialSimulator
+from simulator import flatten, load_workspace_library, parse_source
+
+CYCLES = 20_000
+LANE_COUNTS = [1, 64]
+SIMULATORS = [("levelized", SequentialSimulator), ("compiled", CompiledSequentialSimulator)]
+SEED = 16
+
+
+def core_source():
+    """SystemVerilog for the benchmark core and its building blocks"""
+    lines = [
+        """
+module mux2 (input logic sel, input logic inA, input logic inB, output logic outY);
+    logic nsel, pickA, pickB;
+    assign nsel = ~(sel & sel);
+    assign pickA = ~(inA & nsel);
+    assign pickB = ~(inB & sel);
+    assign outY = ~(pickA & pickB);
+endmodule
+
+module full_adder (input logic inA, input logic inB, input logic cin,
+                   output logic sum, output logic cout);
+    logic half, carry1, carry2;
+    xor_gate x1 (.inA(inA), .inB(inB), .outY(half));
+    xor_gate x2 (.inA(half), .inB(cin), .outY(sum));
+    assign carry1 = ~(inA & inB);
+    assign carry2 = ~(half & cin);
+    assign cout = ~(carry1 & carry2);
+endmodule
+"""
+    ]
+
+    def module(name, ports, body):
+        lines.append(f"module {name} ({', '.join(ports)});")
+        lines.extend(f"    {line}" for line in body)
+        lines.append("endmodule\n")
+
+    # 16-bit 2:1 mux, register with write enable, adder
+    module(
+        "mux2_16",
+        ["input logic sel", "input logic [15:0] inA", "input logic [15:0] inB",
+         "output logic [15:0] outY"],
+        [f"mux2 m{i} (.sel(sel), .inA(inA[{i}]), .inB(inB[{i}]), .outY(outY[{i}]));"
+         for i in range(16)],
+    )
+    module(
+        "reg16",
+        ["input logic clk", "input logic we", "input logic [15:0] inD",
+         "output logic [15:0] outQ"],
+        ["logic [15:0] next;",
+         "mux2_16 hold (.sel(we), .inA(outQ), .inB(inD), .outY(next));",
+         "always_ff @(posedge clk) outQ <= next;"],
+    )
+    module(
+        "adder16",
+        ["input logic [15:0] inA", "input logic [15:0] inB", "input logic cin",
+         "output logic [15:0] sum"],
+        ["logic [16:0] carry;", "assign carry[0] = cin;"]
+        + [f"full_adder fa{i} (.inA(inA[{i}]), .inB(inB[{i}]), .cin(carry[{i}]), "
+           f".sum(sum[{i}]), .cout(carry[{i + 1}]));" for i in range(16)],
+    )
+
+    # Register file: 3-to-8 write decoder, 8 registers, two 8:1 read muxes
+    body = ["logic [2:0] nwa;", "logic [7:0] sel, we;"]
+    body += [f"not_gate n{i} (.inA(wa[{i}]), .outY(nwa[{i}]));" for i in range(3)]
+    for r in range(8):
+        bits = [f"wa[{i}]" if (r >> i) & 1 else f"nwa[{i}]" for i in range(3)]
+        body.append(f"logic dec{r};")
+        body.append(f"logic [15:0] r{r};")
+        body.append(f"and_gate d{r}a (.inA({bits[0]}), .inB({bits[1]}), .outY(dec{r}));")
+        body.append(f"and_gate d{r}b (.inA(dec{r}), .inB({bits[2]}), .outY(sel[{r}]));")
+        body.append(f"and_gate d{r}w (.inA(sel[{r}]), .inB(wen), .outY(we[{r}]));")
+        body.append(f"reg16 reg{r} (.clk(clk), .we(we[{r}]), .inD(wd), .outQ(r{r}));")
+    for port, addr in (("rd_a", "ra"), ("rd_b", "rb")):
+        for level, count in ((0, 4), (1, 2), (2, 1)):
+            for k in range(count):
+                src = [f"r{2 * k}", f"r{2 * k + 1}"] if level == 0 else [
+                    f"{port}_{level - 1}_{2 * k}", f"{port}_{level - 1}_{2 * k + 1}"
+                ]
+                out = port if level == 2 else f"{port}_{level}_{k}"
+                if level < 2:
+                    body.append(f"logic [15:0] {out};")
+                body.append(
+                    f"mux2_16 {port}_m{level}_{k} (.sel({addr}[{level}]), .inA({src[0]}), "
+                    f".inB({src[1]}), .outY({out}));"
+                )
+    module(
+        "regfile",
+        ["input logic clk", "input logic wen", "input logic [2:0] wa", "input logic [15:0] wd",
+         "input logic [2:0] ra", "input logic [2:0] rb",
+         "output logic [15:0] rd_a", "output logic [15:0] rd_b"],
+        body,
+    )
+
+    # ALU: op 00 add, 01 and, 10 xor, 11 pass B
+    body = ["logic [15:0] sum, conj, disj;", "logic [15:0] low, high;",
+            "adder16 add (.inA(inA), .inB(inB), .cin(1'b0), .sum(sum));"]
+    body += [f"and_gate a{i} (.inA(inA[{i}]), .inB(inB[{i}]), .outY(conj[{i}]));"
+             for i in range(16)]
+    body += [f"xor_gate x{i} (.inA(inA[{i}]), .inB(inB[{i}]), .outY(disj[{i}]));"
+             for i in range(16)]
+    body += ["mux2_16 m_low (.sel(op[0]), .inA(sum), .inB(conj), .outY(low));",
+             "mux2_16 m_high (.sel(op[0]), .inA(disj), .inB(inB), .outY(high));",
+             "mux2_16 m_out (.sel(op[1]), .inA(low), .inB(high), .outY(result));"]
+    module(
+        "alu16",
+        ["input logic [1:0] op", "input logic [15:0] inA", "input logic [15:0] inB",
+         "output logic [15:0] result"],
+        body,
+    )
+
+    # Core: instr = op[15:14] rd[13:11] ra[10:8] rb[7:5] wen[4] branch[3] imm[2:0]
+    module(
+        "j16_bench",
+        ["input logic clk", "input logic [15:0] instr", "output logic [15:0] pc",
+         "output logic [15:0] result"],
+        ["logic [15:0] rd_a, rd_b, pc_inc, pc_next;",
+         "regfile rf (.clk(clk), .wen(instr[4]), .wa(instr[13:11]), .wd(result), "
+         ".ra(instr[10:8]), .rb(instr[7:5]), .rd_a(rd_a), .rd_b(rd_b));",
+         "alu16 alu (.op(instr[15:14]), .inA(rd_a), .inB(rd_b), .result(result));",
+         "adder16 inc (.inA(pc), .inB(16'h0001), .cin(1'b0), .sum(pc_inc));",
+         "mux2_16 jump (.sel(instr[3]), .inA(pc_inc), .inB(rd_b), .outY(pc_next));",
+         "reg16 pc_reg (.clk(clk), .we(1'b1), .inD(pc_next), .outQ(pc));"],
+    )
+    return "\n".join(lines)
+
+
+def build_netlist():
+    modules = load_workspace_library("workspace")
+    for module in parse_source(core_source(), "j16_bench.sv"):
+        modules[module.name] = module
+    return flatten(modules, "j16_bench")
+
+
+def main_benchmark():
+    netlist = build_netlist()
+    print(
+        f"j16_bench: {netlist.nand_count} NAND gates, {len(netlist.flops)} flip-flops, "
+        f"{CYCLES} cycles"
+    )
+    rng = random.Random(SEED)
+    program = [{"instr": rng.getrandbits(16) & ~0b1000} for _ in range(CYCLES)]
+    for i in range(0, CYCLES, 50):
+        program[i]["instr"] |= 0b1000  # An occasional branch
+    print(
+        f"{'simulator':>10} {'lanes':>6} {'cycles/s':>10} {'lane-cycles/s':>14}"
+        f" {'evals/cycle':>12}"
+    )
+    for name, simulator_class in SIMULATORS:
+        for lanes in LANE_COUNTS:
+            simulator = simulator_class(netlist, lanes)
+            evaluations = simulator.evaluations
+            start = time.perf_counter()
+            simulator.run(program, watch=())
+            elapsed = time.perf_counter() - start
+            per_cycle = (simulator.evaluations - evaluations) / CYCLES
+            print(
+                f"{name:>10} {lanes:>6} {CYCLES / elapsed:>10.0f}"
+                f" {CYCLES * lanes / elapsed:>14.0f} {per_cycle:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,164 @@
+"""Indexed, lazily loaded email store for the inbox.
+
+Each level's emails live as .txt files in emails/<level>/: a few header
+lines (From/Date/Subject/Read), a blank line, then the body. The inbox only
+needs the headers, so the store keeps a small per-level index of headers
+and the byte offset where each body starts. The index is saved next to the
+level directory as emails/<level>.index.json. Loading a level re-stats the
+files and only re-reads the headers of files whose mtime or size changed.
+
+Bodies are read on demand (preview, full-message modal) and kept in a
+bounded LRU, so long reference manuals don't sit in memory for every level.
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+INDEX_VERSION = 1
+DEFAULT_BODY_CACHE_SIZE = 16  # Email bodies kept in memory
+
+
+def parse_email_header(path):
+    """Read just the header of an email file.
+
+    Returns a dict with from/date/subject/read and body_offset, the byte
+    offset where the body starts. Leading blank lines are skipped; a file
+    without a blank line after its headers is all body.
+    """
+    header = {"from": "", "date": "", "subject": "", "read": False}
+    offset = 0
+    text_start = None
+    body_offset = None
+    blank_offset = None  # Offset just past a blank line, if text follows it
+    with open(path, "rb") as f:
+        for raw in f:
+            line = raw.decode("utf-8").strip()
+            if text_start is None:
+                if not line:
+                    offset += len(raw)
+                    continue
+                text_start = offset
+            offset += len(raw)
+
+            if blank_offset is not None:
+                if line:
+                    body_offset = blank_offset
+                    break
+            elif line.startswith("From: "):
+                header["from"] = line[6:]
+            elif line.startswith("Date: "):
+                header["date"] = line[6:]
+            elif line.startswith("Subject: "):
+                header["subject"] = line[9:]
+            elif line.startswith("Read: "):
+                header["read"] = line[6:].lower() == "true"
+            elif line == "":  # First empty line after headers
+                blank_offset = offset
+    if body_offset is None:
+        body_offset = text_start or 0
+    header["body_offset"] = body_offset
+    return header
+
+
+def read_email_body(path, body_offset):
+    """Read an email body starting at its byte offset"""
+    with open(path, "rb") as f:
+        f.seek(body_offset)
+        text = f.read().decode("utf-8")
+    return text.replace("\r\n", "\n").replace("\r", "\n").rstrip()
+
+
+class EmailStore:
+    """Header index per level plus an LRU of email bodies"""
+
+    def __init__(self, root="emails", body_cache_size=DEFAULT_BODY_CACHE_SIZE):
+        self.root = root
+        self.body_cache_size = body_cache_size
+        self.bodies = OrderedDict()  # (path, mtime_ns, size) -> body text
+
+    def level_dir(self, level):
+        return os.path.join(self.root, str(level))
+
+    def index_path(self, level):
+        return os.path.join(self.root, f"{level}.index.json")
+
+    def _load_index(self, level):
+        try:
+            with open(self.index_path(level), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("files", {})
+
+    def _save_index(self, level, files):
+        path = self.index_path(level)
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "files": files}, f, indent=1)
+            os.replace(temp_path, path)
+        except OSError:
+            pass  # Without a writable index the headers are simply re-read next time
+
+    def load_level(self, level):
+        """Return the level's emails (header dicts, sorted by filename).
+
+        Raises FileNotFoundError if the level has no email directory.
+        """
+        email_dir = self.level_dir(level)
+        filenames = sorted(f for f in os.listdir(email_dir) if f.endswith(".txt"))
+        cached = self._load_index(level)
+        files = {}
+        changed = len(cached) != len(filenames)
+
+        emails = []
+        for filename in filenames:
+            path = os.path.join(email_dir, filename)
+            try:
+                stat = os.stat(path)
+                entry = cached.get(filename)
+                if (
+                    entry is None
+                    or entry["mtime_ns"] != stat.st_mtime_ns
+                    or entry["size"] != stat.st_size
+                ):
+                    entry = parse_email_header(path)
+                    entry["mtime_ns"] = stat.st_mtime_ns
+                    entry["size"] = stat.st_size
+                    changed = True
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error parsing email file {path}: {e}")
+                continue
+            files[filename] = entry
+
+            email = dict(entry)
+            email["id"] = f"{level}/{filename}"  # Stable across platforms and runs
+            email["path"] = path
+            emails.append(email)
+
+        if changed:
+            self._save_index(level, files)
+        return emails
+
+    def get_body(self, email):
+        """Return an email's body, reading it from disk on a cache miss"""
+        key = (email["path"], email["mtime_ns"], email["size"])
+        body = self.bodies.get(key)
+        if body is not None:
+            self.bodies.move_to_end(key)
+            return body
+        try:
+            body = read_email_body(email["path"], email["body_offset"])
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error reading email {email['path']}: {e}")
+            return ""
+        self.bodies[key] = body
+        while len(self.bodies) > self.body_cache_size:
+            self.bodies.popitem(last=False)
+        return body
+
+    def clear(self):
+        self.bodies.clear()
@@ -0,0 +1,94 @@
+"""Column <-> pixel conversions for editor text.
+
+Measuring `font.size(line[:column])` slices a new string and runs the text
+shaper every time. The editor font is Courier New, where every printable
+ASCII character has the same advance width, so FontMetrics detects a
+monospace font once and turns column math into `column * advance`. Other
+fonts (or lines with characters outside printable ASCII) fall back to a
+per-line table of prefix widths, each entry measured once on first use.
+"""
+
+from collections import OrderedDict
+
+MONOSPACE_SAMPLE = "iW.M_0 |"  # Narrow and wide glyphs; equal widths => monospace
+PREFIX_TABLE_LINES = 512  # Lines whose prefix-width tables are kept
+
+
+class FontMetrics:
+    """Cached text measurements for one pygame font"""
+
+    def __init__(self, font):
+        self.font = font
+        self.advance = self._detect_advance(font)
+        self.prefix_tables = OrderedDict()  # line -> [width of line[:i] or None]
+
+    @staticmethod
+    def _detect_advance(font):
+        """Return the fixed advance width of a monospace font, or None"""
+        widths = {font.size(char)[0] for char in MONOSPACE_SAMPLE}
+        if len(widths) != 1:
+            return None
+        advance = widths.pop()
+        # A run of glyphs must be exactly n advances wide (no kerning)
+        sample = MONOSPACE_SAMPLE * 4
+        if advance <= 0 or font.size(sample)[0] != advance * len(sample):
+            return None
+        return advance
+
+    @property
+    def monospace(self):
+        return self.advance is not None
+
+    def _fixed_width(self, text):
+        """Whether text can use the monospace fast path"""
+        return self.advance is not None and text.isascii() and text.isprintable()
+
+    def _prefix_table(self, line):
+        table = self.prefix_tables.get(line)
+        if table is None:
+            table = [None] * (len(line) + 1)
+            table[0] = 0
+            self.prefix_tables[line] = table
+            if len(self.prefix_tables) > PREFIX_TABLE_LINES:
+                self.prefix_tables.popitem(last=False)
+        else:
+            self.prefix_tables.move_to_end(line)
+        return table
+
+    def text_width(self, text):
+        """Width of text in pixels"""
+        if self._fixed_width(text):
+            return len(text) * self.advance
+        return self.font.size(text)[0]
+
+    def column_x(self, line, column):
+        """Pixel offset of the left edge of `column` within line"""
+        column = max(0, min(column, len(line)))
+        if self._fixed_width(line):
+            return column * self.advance
+        table = self._prefix_table(line)
+        width = table[column]
+        if width is None:
+            width = table[column] = self.font.size(line[:column])[0]
+        return width
+
+    def column_at_x(self, line, x):
+        """Column whose left edge is nearest pixel offset x (for hit-testing)"""
+        if x <= 0:
+            return 0
+        if self._fixed_width(line):
+            return min(len(line), (x + self.advance // 2) // self.advance)
+        # Binary search for the last column starting at or before x
+        low, high = 0, len(line)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.column_x(line, mid) <= x:
+                low = mid
+            else:
+                high = mid - 1
+        if low < len(line):
+            left = self.column_x(line, low)
+            right = self.column_x(line, low + 1)
+            if right - x < x - left:
+                low += 1
+        return low
@@ -0,0 +1,173 @@
+"""NAND gate counts from the instance hierarchy, with a per-instance breakdown.
+
+A module's NAND count is the width of its own ~(a & b) assigns plus the
+counts of the modules it instantiates, so counting never needs to flatten:
+each module is counted once, from its parsed form, and every instance of it
+reuses that count. A 64-bit ALU instantiating xor_gate hundreds of times
+counts xor_gate (4) once.
+
+Counts are memoized by design key (ModuleCache.design_key: the hash of the
+module's file plus the keys of everything below it). Editing one file
+changes the keys of the modules in it and of the modules above them, so
+only those are recounted; every other module is a memo hit.
+
+The breakdown is a tree of GateCount nodes whose children are shared: all
+instances of a module point at the same node, so the tree costs one node
+per module however many instances the design has.
+
+    python gate_count.py workspace/xor_gate.sv [TOP_MODULE]
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from module_cache import ModuleCache
+from simulator import SimulatorError
+
+MAX_MEMORY_COUNTS = 4096  # Module counts kept (least recently used dropped)
+
+
+@dataclass
+class GateCount:
+    module: str
+    own_gates: int  # NAND gates from the module's own ~(a & b) assigns
+    own_flops: int  # Flip-flops from its own always_ff registers
+    gates: int  # Total NAND gates, instances included
+    flops: int
+    instances: list = field(default_factory=list)  # [(instance name, GateCount)]
+
+    def format(self, max_depth=3):
+        """Render as an indented tree, grouping repeated instances of one module"""
+        lines = [f"{self.module}: {self.gates} NAND" + _flops_text(self.flops)]
+        self._format_children(lines, 1, max_depth)
+        return "\n".join(lines)
+
+    def _format_children(self, lines, depth, max_depth):
+        indent = "  " * depth
+        if self.instances and self.own_gates:
+            lines.append(f"{indent}~(a & b): {self.own_gates} NAND")
+        if self.instances and self.own_flops:
+            lines.append(f"{indent}always_ff: {self.own_flops} flip-flops")
+        groups = OrderedDict()  # module -> [instance names], in first-instance order
+        children = {}
+        for name, child in self.instances:
+            groups.setdefault(child.module, []).append(name)
+            children[child.module] = child
+        for module, names in groups.items():
+            child = children[module]
+            count = len(names)
+            if count == 1:
+                label = f"{names[0]} ({module}): {child.gates} NAND"
+            else:
+                label = f"{count} x {module}: {child.gates * count} NAND ({child.gates} each)"
+            lines.append(f"{indent}{label}{_flops_text(child.flops * count)}")
+            if depth < max_depth:
+                child._format_children(lines, depth + 1, max_depth)
+
+
+def _flops_text(flops):
+    return f", {flops} flip-flops" if flops else ""
+
+
+def expression_width(module, expr, line):
+    """Bits in an assign or register target, from the module's declarations"""
+    kind = expr[0]
+    if kind == "concat":
+        return sum(expression_width(module, item, line) for item in expr[1])
+    if kind == "const":
+        return expr[1] or 1
+    _, name, msb, lsb = expr
+    if msb is not None:
+        return abs(msb - lsb) + 1
+    port = module.port(name)
+    if port is not None:
+        return port.width
+    if name in module.nets:
+        msb, lsb = module.nets[name]
+        return abs(msb - lsb) + 1
+    where = f"{module.filename}:{line}: " if module.filename else ""
+    raise SimulatorError(f"{where}'{name}' is not declared in module '{module.name}'")
+
+
+class GateCounter:
+    """Memoized hierarchical gate counts over a ModuleCache's parsed modules"""
+
+    def __init__(self, module_cache):
+        self.module_cache = module_cache
+        self.lock = threading.Lock()
+        self.counts = OrderedDict()  # design key -> GateCount
+        self.count_calls = 0  # Modules actually counted (memo misses)
+
+    def count(self, modules, hashes, top):
+        """Return the GateCount tree of module `top`"""
+        return self._count(modules, hashes, top, {}, [])
+
+    def _count(self, modules, hashes, name, keys, stack):
+        module = modules.get(name)
+        if module is None:
+            parent = modules[stack[-1]] if stack else None
+            where = f"{parent.filename}: " if parent and parent.filename else ""
+            raise SimulatorError(f"{where}unknown module '{name}'")
+        if name in stack:
+            raise SimulatorError(f"module instantiates itself: {' -> '.join(stack + [name])}")
+        key = self.module_cache.design_key(modules, hashes, name, keys)
+        with self.lock:
+            count = self.counts.get(key)
+            if count is not None:
+                self.counts.move_to_end(key)
+                return count
+
+        stack.append(name)
+        own_gates = sum(
+            expression_width(module, lhs, line)
+            for lhs, rhs, line in module.assigns
+            if rhs[0] == "nand"
+        )
+        own_flops = sum(
+            expression_width(module, lhs, line) for _, lhs, _, line in module.registers
+        )
+        instances = [
+            (instance.instance_name, self._count(modules, hashes, instance.module_name, keys, stack))
+            for instance in module.instances
+        ]
+        stack.pop()
+        count = GateCount(
+            module=name,
+            own_gates=own_gates,
+            own_flops=own_flops,
+            gates=own_gates + sum(child.gates for _, child in instances),
+            flops=own_flops + sum(child.flops for _, child in instances),
+            instances=instances,
+        )
+        with self.lock:
+            self.count_calls += 1
+            self.counts[key] = count
+            while len(self.counts) > MAX_MEMORY_COUNTS:
+                self.counts.popitem(last=False)
+        return count
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("usage: python gate_count.py FILE.sv [TOP_MODULE]")
+        return 2
+    path = argv[1]
+    workspace_dir = os.path.dirname(path) or "."
+    cache = ModuleCache()
+    try:
+        modules, hashes = cache.load_library(workspace_dir, os.path.basename(path))
+        _, parsed = cache.parse_file(path)
+        top = argv[2] if len(argv) > 2 else parsed[-1].name
+        count = GateCounter(cache).count(modules, hashes, top)
+    except (SimulatorError, OSError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(count.format())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
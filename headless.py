@@ -0,0 +1,343 @@
+"""Replay recorded input without a display and report per-frame draw timings.
+
+Runs the game under the SDL dummy video driver, feeds a scripted list of key
+events through process_key_event, and times update_workspace, draw_workspace
+and every panel redrawn in each frame. Use it to catch rendering regressions
+on machines with no GPU or monitor:
+
+    uv run headless.py replays/editor_tour.json
+    uv run headless.py replays/editor_tour.json --json timings.json
+    uv run headless.py replays/editor_tour.json --baseline timings.json
+
+With --baseline the run fails (exit status 1) if the p95 time of any metric
+grew by more than --tolerance over the baseline's.
+
+A script is JSON: {"frame_ms": 33, "events": [...]}, where each event has a
+time "t" in ms and either a "key" (a pygame key name such as "down", "f1" or
+"a", with optional "mod": ["ctrl", "shift", "alt"] and "unicode") or "text"
+to type, one key every TYPING_INTERVAL_MS. Record one by playing normally:
+
+    uv run headless.py --record my_session.json
+
+Both modes run in a scratch copy of workspace/ and emails/ with no saved
+progress, so replays start from the same state the recording did and never
+touch your files.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FRAME_MS = 33  # One frame per 1000 // MAX_FPS ms, like the real loop
+TYPING_INTERVAL_MS = 40  # Spacing of the keys a "text" event expands to
+SETTLE_FRAMES = 5  # Frames run after the last event so late redraws are timed
+MIN_REGRESSION_MS = 0.5  # Ignore p95 growth smaller than this (timer noise)
+
+MOD_NAMES = ("shift", "ctrl", "alt")
+
+
+def make_sandbox():
+    """Copy workspace/ and emails/ to a temp dir and make it the working directory"""
+    sandbox = tempfile.mkdtemp(prefix="bitworks-headless-")
+    for name in ("workspace", "emails"):
+        source = os.path.join(ROOT, name)
+        if os.path.isdir(source):
+            shutil.copytree(
+                source, os.path.join(sandbox, name), ignore=shutil.ignore_patterns("*.index.json")
+            )
+    os.chdir(sandbox)
+    return sandbox
+
+
+def import_game(headless):
+    """Import main.py (the display opens later, in main.init_app)"""
+    if headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import main
+
+    return main
+
+
+def mod_flags(pygame, names):
+    flags = {"shift": pygame.KMOD_LSHIFT, "ctrl": pygame.KMOD_LCTRL, "alt": pygame.KMOD_LALT}
+    mod = 0
+    for name in names:
+        if name not in flags:
+            raise ValueError(f"Unknown modifier {name!r} (expected one of {', '.join(MOD_NAMES)})")
+        mod |= flags[name]
+    return mod
+
+
+def mod_names(pygame, mod):
+    masks = {"shift": pygame.KMOD_SHIFT, "ctrl": pygame.KMOD_CTRL, "alt": pygame.KMOD_ALT}
+    return [name for name in MOD_NAMES if mod & masks[name]]
+
+
+def load_script(pygame, path):
+    """Read a replay script; returns (frame_ms, [pygame KEYDOWN events with a .t])"""
+    with open(path, "r", encoding="utf-8") as f:
+        script = json.load(f)
+    frame_ms = script.get("frame_ms", DEFAULT_FRAME_MS)
+
+    events = []
+    for entry in script["events"]:
+        t = entry["t"]
+        if "text" in entry:
+            for i, char in enumerate(entry["text"]):
+                key = pygame.K_RETURN if char == "\n" else pygame.key.key_code(char.lower())
+                unicode = "" if char == "\n" else char
+                mod = pygame.KMOD_LSHIFT if char.isupper() else 0
+                events.append((t + i * TYPING_INTERVAL_MS, key, unicode, mod))
+            continue
+        key = pygame.key.key_code(entry["key"])
+        mods = entry.get("mod", [])
+        unicode = entry.get("unicode")
+        if unicode is None:
+            # Plain printable keys type their character, like a real key press
+            name = " " if entry["key"] == "space" else entry["key"]
+            printable = len(name) == 1 and not {"ctrl", "alt"} & set(mods)
+            unicode = (name.upper() if "shift" in mods else name) if printable else ""
+        events.append((t, key, unicode, mod_flags(pygame, mods)))
+
+    events.sort(key=lambda event: event[0])  # Stable: same-time events keep their order
+    return frame_ms, [
+        pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode, mod=mod, t=t)
+        for t, key, unicode, mod in events
+    ]
+
+
+def start_game(main):
+    """Open the display, skip the boot screen and open the level file the way main() does"""
+    main.init_app()
+    main.boot_index = len(main.boot_lines)
+    main.boot_done = True
+    main.running = True
+    main.ensure_workspace_dir()
+    if not main.load_file():
+        print(f"Creating new file: {main.current_file}")
+    main.scan_workspace_files()
+
+
+def stop_game(main):
+    main.stop_save_worker()
+    main.stop_verification_worker()
+    main.stop_vector_pool()
+    main.progress_store.close()
+
+
+def replay(main, events, frame_ms):
+    """Run the frame loop over the events; returns one timing dict per frame"""
+    frames = []
+    next_event = 0
+    last_t = events[-1].t if events else 0
+    frame = 0
+    while main.running:
+        frame_t = frame * frame_ms
+        handled = 0
+        while next_event < len(events) and events[next_event].t <= frame_t:
+            main.last_input_time = main.pygame.time.get_ticks()
+            main.process_key_event(events[next_event])
+            next_event += 1
+            handled += 1
+        if not main.running:  # Escape or Exit quits like the real game
+            break
+
+        start = time.perf_counter()
+        main.update_workspace()
+        drawn = time.perf_counter()
+        main.draw_workspace()
+        done = time.perf_counter()
+
+        frames.append(
+            {
+                "frame": frame,
+                "t": frame_t,
+                "events": handled,
+                "update_workspace": (drawn - start) * 1000,
+                "draw_workspace": (done - drawn) * 1000,
+                "panels": {name: s * 1000 for name, s in main.panel_draw_times.items()},
+            }
+        )
+        if next_event == len(events) and frame_t >= last_t + SETTLE_FRAMES * frame_ms:
+            break
+        frame += 1
+    return frames
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def summarize(frames):
+    """Per-metric count/mean/p50/p95/max in ms (panels only over frames that redrew them)"""
+    samples = {"update_workspace": [], "draw_workspace": []}
+    for frame in frames:
+        samples["update_workspace"].append(frame["update_workspace"])
+        samples["draw_workspace"].append(frame["draw_workspace"])
+        for name, ms in frame["panels"].items():
+            samples.setdefault(name, []).append(ms)
+
+    summary = {}
+    for name, values in samples.items():
+        if not values:
+            continue
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 0.5),
+            "p95": percentile(values, 0.95),
+            "max": values[-1],
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'metric':<18} {'count':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name, stats in summary.items():
+        print(
+            f"{name:<18} {stats['count']:>6} {stats['mean']:>8.3f} {stats['p50']:>8.3f}"
+            f" {stats['p95']:>8.3f} {stats['max']:>8.3f}"
+        )
+
+
+def find_regressions(summary, baseline, tolerance):
+    """Metrics whose p95 grew by more than `tolerance` (a fraction) over the baseline"""
+    regressions = []
+    for name, stats in summary.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        limit = max(before["p95"] * (1 + tolerance), before["p95"] + MIN_REGRESSION_MS)
+        if stats["p95"] > limit:
+            regressions.append((name, before["p95"], stats["p95"]))
+    return regressions
+
+
+def run_replay(args):
+    script_path = os.path.abspath(args.script)
+    json_path = os.path.abspath(args.json) if args.json else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    screenshot_path = os.path.abspath(args.screenshot) if args.screenshot else None
+
+    sandbox = make_sandbox()
+    started = False
+    try:
+        main = import_game(headless=True)
+        start_game(main)
+        started = True
+        frame_ms, events = load_script(main.pygame, script_path)
+        if args.frame_ms:
+            frame_ms = args.frame_ms
+        frames = replay(main, events, frame_ms)
+        if screenshot_path:
+            main.pygame.image.save(main.screen, screenshot_path)
+    finally:
+        # Stop the worker threads and processes even when the replay fails,
+        # so the error is reported instead of hanging on exit
+        try:
+            if started:
+                stop_game(main)
+        finally:
+            os.chdir(ROOT)
+            shutil.rmtree(sandbox, ignore_errors=True)
+
+    summary = summarize(frames)
+    print(f"\n{os.path.basename(script_path)}: {len(events)} events, {len(frames)} frames"
+          f" of {frame_ms} ms at {main.WIDTH}x{main.HEIGHT}")
+    print_summary(summary)
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "script": os.path.basename(script_path),
+                    "frame_ms": frame_ms,
+                    "size": [main.WIDTH, main.HEIGHT],
+                    "summary": summary,
+                    "frames": frames,
+                },
+                f,
+                indent=1,
+            )
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+        regressions = find_regressions(summary, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION: {name} p95 {before:.3f} ms -> {after:.3f} ms")
+        if regressions:
+            return 1
+        print(f"No regressions against {os.path.basename(baseline_path)}")
+    return 0
+
+
+def run_record(args):
+    output_path = os.path.abspath(args.record)
+    sandbox = make_sandbox()
+    main = import_game(headless=False)
+    pygame = main.pygame
+    events = []
+    first_ticks = None
+    play = main.process_key_event
+
+    def recording(event):
+        nonlocal first_ticks
+        if main.boot_done:  # Replays start after boot, so keys skipping it aren't kept
+            now = pygame.time.get_ticks()
+            if first_ticks is None:
+                first_ticks = now
+            events.append(
+                {
+                    "t": now - first_ticks,
+                    "key": pygame.key.name(event.key),
+                    "unicode": event.unicode,
+                    "mod": mod_names(pygame, event.mod),
+                }
+            )
+        play(event)
+
+    main.process_key_event = recording  # main() looks it up on every key
+    try:
+        main.main()
+    except SystemExit:
+        pass
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(sandbox, ignore_errors=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump({"frame_ms": DEFAULT_FRAME_MS, "events": events}, f, indent=1)
+        print(f"Recorded {len(events)} key events to {output_path}")
+    return 0
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("script", nargs="?", help="replay script (JSON) to run headless")
+    parser.add_argument("--record", metavar="FILE", help="play in a window and record keys to FILE")
+    parser.add_argument("--frame-ms", type=int, help="override the script's frame interval")
+    parser.add_argument("--json", metavar="FILE", help="write per-frame timings and the summary")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against an earlier --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth (default 0.25)")
+    parser.add_argument("--screenshot", metavar="FILE", help="save the final frame as an image")
+    args = parser.parse_args(argv[1:])
+
+    if args.record:
+        return run_record(args)
+    if not args.script:
+        parser.error("a replay script (or --record FILE) is required")
+    return run_replay(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
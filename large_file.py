@@ -0,0 +1,82 @@
+"""Memory-mapped, incrementally indexed line access for large files.
+
+Reading a multi-megabyte file with f.read().split("\\n") holds two full
+copies in memory before anything can be shown. MappedLineFile instead maps
+the file and indexes the byte offset of each line a chunk at a time, so the
+editor can show the first screen after indexing only the first chunk. Line
+text is decoded only when read_lines() asks for it, which LineRope's lazy
+leaves do the first time those lines are displayed or edited.
+
+The map is only needed while indexing. Once the index is complete the editor
+closes it (an open map stops the file from being replaced on Windows), and
+read_lines() then reads each leaf's byte range from the file by offset. A
+save reads every line before it replaces the file, so no lazy leaf outlives
+the contents its offsets point into.
+"""
+
+import mmap
+import os
+from array import array
+from itertools import accumulate, islice
+
+
+class MappedLineFile:
+    """A read-only memory map of a file plus a growing index of line starts"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            # The map stays valid after the file is closed (or replaced on disk)
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        # Byte offset where each indexed line starts. Once indexing completes
+        # a sentinel at size + 1 closes the last line, so line i always ends
+        # one byte (its newline) before starts[i + 1].
+        self.starts = array("q", [0])
+        self.scanned = 0  # Bytes indexed so far
+        self.complete = False
+        if not self.size:
+            self._finish()
+
+    @property
+    def line_count(self):
+        """Number of lines indexed so far (all lines once complete)"""
+        return len(self.starts) - 1
+
+    def _finish(self):
+        self.starts.append(self.size + 1)
+        self.complete = True
+
+    def index_more(self, max_bytes):
+        """Index up to max_bytes more of the file; returns the new line count"""
+        if self.complete:
+            return self.line_count
+        end = min(self.size, self.scanned + max_bytes)
+        pieces = self.data[self.scanned : end].split(b"\n")
+        # Every piece but the last ends in a newline, which starts a new line
+        offsets = accumulate((len(piece) + 1 for piece in pieces[:-1]), initial=self.scanned)
+        self.starts.extend(islice(offsets, 1, None))
+        self.scanned = end
+        if end == self.size:
+            self._finish()
+        return self.line_count
+
+    def read_lines(self, start, stop):
+        """Decode lines [start, stop) as a tuple of str (without line endings)"""
+        begin, end = self.starts[start], self.starts[stop] - 1
+        if self.data is None:
+            # Map closed: read just this range, without holding the file open
+            with open(self.path, "rb") as f:
+                f.seek(begin)
+                raw = f.read(end - begin)
+        else:
+            raw = self.data[begin:end]
+        text = raw.decode("utf-8", errors="replace")
+        lines = text.split("\n")
+        return tuple(line[:-1] if line.endswith("\r") else line for line in lines)
+
+    def close(self):
+        """Release the map; later read_lines() calls read from the file instead"""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = None
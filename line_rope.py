@@ -0,0 +1,344 @@
+"""Persistent rope of text lines used as the editor's text buffer.
+
+Lines are stored in small tuples ("leaves") hanging off a height-balanced
+binary tree. Every node caches the number of lines beneath it, so looking up,
+replacing, inserting or deleting a line is O(log n) no matter how large the
+file is. Nodes are never modified after creation - edits build a new path
+from the root and share everything else - which makes snapshot() O(1).
+
+LineRope behaves like the list of strings the editor used before: indexing,
+slicing, len(), iteration, insert(), pop() and del all work, so
+"\\n".join(buffer) and buffer[y] = new_line keep working unchanged.
+
+Leaves can also be lazy: append_lazy() adds lines that are only read from
+their source (e.g. a memory-mapped file) the first time a leaf is touched.
+"""
+
+LEAF_MAX_LINES = 64  # Max lines stored in a single leaf
+
+
+class _Leaf:
+    __slots__ = ("lines", "count", "height")
+
+    def __init__(self, lines):
+        self.lines = lines  # tuple of str
+        self.count = len(lines)
+        self.height = 0
+
+
+class _LazyLeaf:
+    """A leaf whose lines are read from `source` on first access"""
+
+    __slots__ = ("source", "start", "count", "height", "_lines")
+
+    def __init__(self, source, start, count):
+        self.source = source  # Has read_lines(start, stop) -> tuple of str
+        self.start = start
+        self.count = count
+        self.height = 0
+        self._lines = None
+
+    @property
+    def lines(self):
+        if self._lines is None:
+            self._lines = self.source.read_lines(self.start, self.start + self.count)
+        return self._lines
+
+
+class _Node:
+    __slots__ = ("left", "right", "count", "height")
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.count = left.count + right.count
+        self.height = max(left.height, right.height) + 1
+
+
+def _build(lines):
+    """Build a balanced tree from a sequence of lines (None if empty)"""
+    leaves = [
+        _Leaf(tuple(lines[i : i + LEAF_MAX_LINES]))
+        for i in range(0, len(lines), LEAF_MAX_LINES)
+    ]
+    return _build_from_leaves(leaves)
+
+
+def _build_lazy(source, start, stop):
+    """Build a balanced tree of lazy leaves for source lines [start, stop)"""
+    leaves = [
+        _LazyLeaf(source, i, min(LEAF_MAX_LINES, stop - i))
+        for i in range(start, stop, LEAF_MAX_LINES)
+    ]
+    return _build_from_leaves(leaves)
+
+
+def _build_from_leaves(leaves):
+    if not leaves:
+        return None
+    while len(leaves) > 1:
+        paired = [
+            _Node(leaves[i], leaves[i + 1]) for i in range(0, len(leaves) - 1, 2)
+        ]
+        if len(leaves) % 2:
+            paired.append(leaves[-1])
+        leaves = paired
+    return leaves[0]
+
+
+def _balanced(left, right):
+    """Join two subtrees whose heights differ by at most two, rotating if needed"""
+    if left.height > right.height + 1:
+        if left.left.height >= left.right.height:
+            return _Node(left.left, _Node(left.right, right))
+        inner = left.right
+        return _Node(_Node(left.left, inner.left), _Node(inner.right, right))
+    if right.height > left.height + 1:
+        if right.right.height >= right.left.height:
+            return _Node(_Node(left, right.left), right.right)
+        inner = right.left
+        return _Node(_Node(left, inner.left), _Node(inner.right, right.right))
+    return _Node(left, right)
+
+
+def _concat(left, right):
+    """Concatenate two trees in O(|height difference|)"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if (
+        left.height == 0
+        and right.height == 0
+        and left.count + right.count <= LEAF_MAX_LINES
+    ):
+        # Merge small neighbouring leaves so splits don't fragment the tree
+        return _Leaf(left.lines + right.lines)
+    if left.height > right.height + 1:
+        return _balanced(left.left, _concat(left.right, right))
+    if right.height > left.height + 1:
+        return _balanced(_concat(left, right.left), right.right)
+    return _Node(left, right)
+
+
+def _split(node, index):
+    """Split a tree into (first `index` lines, remaining lines)"""
+    if node is None:
+        return None, None
+    if index <= 0:
+        return None, node
+    if index >= node.count:
+        return node, None
+    if node.height == 0:
+        return _Leaf(node.lines[:index]), _Leaf(node.lines[index:])
+    left_count = node.left.count
+    if index < left_count:
+        head, tail = _split(node.left, index)
+        return head, _concat(tail, node.right)
+    if index > left_count:
+        head, tail = _split(node.right, index - left_count)
+        return _concat(node.left, head), tail
+    return node.left, node.right
+
+
+def _get(node, index):
+    while node.height:
+        if index < node.left.count:
+            node = node.left
+        else:
+            index -= node.left.count
+            node = node.right
+    return node.lines[index]
+
+
+def _set(node, index, line):
+    """Return a copy of the tree with one line replaced (path copying)"""
+    if node.height == 0:
+        lines = node.lines
+        return _Leaf(lines[:index] + (line,) + lines[index + 1 :])
+    if index < node.left.count:
+        return _Node(_set(node.left, index, line), node.right)
+    return _Node(node.left, _set(node.right, index - node.left.count, line))
+
+
+def _iter_from(node, start, stop):
+    """Yield lines [start, stop) of a tree"""
+    stack = []
+    while node is not None:
+        if node.height == 0:
+            yield from node.lines[start:stop]
+            stop -= node.count
+            start = 0
+            if stop <= 0:
+                return
+            node = stack.pop() if stack else None
+        elif start >= node.left.count:
+            start -= node.left.count
+            stop -= node.left.count
+            node = node.right
+        else:
+            stack.append(node.right)
+            node = node.left
+
+
+def _common_lines(a, b, from_end):
+    """Number of equal lines at the start (or end) of two trees.
+
+    Subtrees shared by both trees are skipped without looking at their lines,
+    so comparing a rope with an edited snapshot of itself costs O(log n) plus
+    the lines around the edit.
+    """
+    if a is None or b is None:
+        return 0
+    a_stack, b_stack = [a], [b]
+    a_skip = b_skip = 0  # Lines of the leaf on top of each stack already compared
+    common = 0
+    while a_stack and b_stack:
+        a, b = a_stack[-1], b_stack[-1]
+        if a is b and a_skip == b_skip:
+            common += a.count - a_skip
+            a_stack.pop()
+            b_stack.pop()
+            a_skip = b_skip = 0
+        elif a.height and (b.height == 0 or a.count >= b.count):
+            a_stack.pop()
+            a_stack.extend((a.left, a.right) if from_end else (a.right, a.left))
+        elif b.height:
+            b_stack.pop()
+            b_stack.extend((b.left, b.right) if from_end else (b.right, b.left))
+        else:
+            a_lines = a.lines[::-1] if from_end else a.lines
+            b_lines = b.lines[::-1] if from_end else b.lines
+            n = min(a.count - a_skip, b.count - b_skip)
+            for i in range(n):
+                if a_lines[a_skip + i] != b_lines[b_skip + i]:
+                    return common + i
+            common += n
+            a_skip += n
+            b_skip += n
+            if a_skip == a.count:
+                a_stack.pop()
+                a_skip = 0
+            if b_skip == b.count:
+                b_stack.pop()
+                b_skip = 0
+    return common
+
+
+class LineRope:
+    """A list-like sequence of lines backed by a persistent balanced rope"""
+
+    __slots__ = ("_root",)
+
+    def __init__(self, lines=()):
+        self._root = _build(list(lines))
+
+    @classmethod
+    def _from_root(cls, root):
+        rope = cls.__new__(cls)
+        rope._root = root
+        return rope
+
+    def __len__(self):
+        return self._root.count if self._root is not None else 0
+
+    def _normalize_index(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("LineRope index out of range")
+        return index
+
+    def _normalize_slice(self, key):
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError("LineRope slices do not support a step")
+        return start, max(start, stop)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop = self._normalize_slice(key)
+            return list(_iter_from(self._root, start, stop))
+        return _get(self._root, self._normalize_index(key))
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, stop = self._normalize_slice(key)
+            self.splice(start, stop, value)
+        else:
+            self._root = _set(self._root, self._normalize_index(key), value)
+
+    def __delitem__(self, key):
+        if isinstance(key, slice):
+            start, stop = self._normalize_slice(key)
+        else:
+            start = self._normalize_index(key)
+            stop = start + 1
+        self.splice(start, stop, ())
+
+    def __iter__(self):
+        return _iter_from(self._root, 0, len(self))
+
+    def __eq__(self, other):
+        if isinstance(other, (LineRope, list, tuple)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other)
+            )
+        return NotImplemented
+
+    def __repr__(self):
+        return f"LineRope({len(self)} lines)"
+
+    def splice(self, start, stop, lines):
+        """Replace lines [start, stop) with `lines` in O(log n + len(lines))"""
+        head, rest = _split(self._root, start)
+        _, tail = _split(rest, stop - start)
+        self._root = _concat(_concat(head, _build(list(lines))), tail)
+
+    def insert(self, index, line):
+        """Insert a line before `index` (clamped like list.insert)"""
+        length = len(self)
+        if index < 0:
+            index = max(0, index + length)
+        index = min(index, length)
+        self.splice(index, index, (line,))
+
+    def append(self, line):
+        self.insert(len(self), line)
+
+    def pop(self, index=-1):
+        """Remove and return the line at `index`"""
+        index = self._normalize_index(index)
+        line = _get(self._root, index)
+        self.splice(index, index + 1, ())
+        return line
+
+    def append_lazy(self, source, start, stop):
+        """Append lines [start, stop) of `source` without reading them yet.
+
+        `source.read_lines(start, stop)` is called for one leaf's worth of
+        lines the first time any of them is accessed.
+        """
+        if stop > start:
+            self._root = _concat(self._root, _build_lazy(source, start, stop))
+
+    def snapshot(self):
+        """Return an independent copy in O(1); later edits to either don't affect the other"""
+        return LineRope._from_root(self._root)
+
+    def changed_range(self, other):
+        """Compare with another rope (typically an earlier snapshot of this one).
+
+        Returns (start, stop, other_stop): lines [start, stop) of self replaced
+        lines [start, other_stop) of other, and everything outside those ranges
+        is equal. For identical ropes start == stop == other_stop == len(self).
+        """
+        prefix = _common_lines(self._root, other._root, False)
+        limit = min(len(self), len(other)) - prefix
+        suffix = min(_common_lines(self._root, other._root, True), limit)
+        return prefix, len(self) - suffix, len(other) - suffix
+
+    def text(self, separator="\n"):
+        """Join all lines into a single string"""
+        return separator.join(self)
@@ -1,36 +1,46 @@
-import pygame, sys, time, random, os
-
-pygame.init()
-pygame.mixer.init()
-
-# Screen setup - Get fullscreen resolution and set to 16:9 if needed
-info = pygame.display.Info()
-screen_width, screen_height = info.current_w, info.current_h
-
-# Calculate 16:9 aspect ratio dimensions that fit the screen
-aspect_ratio = 16 / 9
-if screen_width / screen_height > aspect_ratio:
-    # Screen is wider than 16:9, fit to height
-    WIDTH = int(screen_height * aspect_ratio)
-    HEIGHT = screen_height
-else:
-    # Screen is taller than 16:9, fit to width
-    WIDTH = screen_width
-    HEIGHT = int(screen_width / aspect_ratio)
-
-# Create fullscreen display
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
-pygame.display.set_caption("Retro PC Boot - Text Editor")
-
-# Scale fonts based on screen size (larger fonts for bigger screens)
-font_size = max(18, WIDTH // 60)  # Scale font with screen width
-big_font_size = max(22, WIDTH // 50)
-FONT = pygame.font.Font(pygame.font.match_font("couriernew", bold=True), font_size)
-BIGFONT = pygame.font.Font(
-    pygame.font.match_font("couriernew", bold=True), big_font_size
-)
-STATUS_BAR_HEIGHT = font_size + 8  # Height of status bar at bottom
-clock = pygame.time.Clock()
+import pygame, sys, time, random, os, threading, queue, math, tempfile, stat
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from line_rope import LineRope
+from undo import UndoHistory, text_end_position
+from simulator import MAX_TRUTH_TABLE_INPUTS, SimulatorError, SimulationCancelled, find_mismatches
+from module_cache import ModuleCache
+from gate_count import GateCounter
+from vector_check import VectorPool, check_vectors
+from font_metrics import FontMetrics
+from email_store import EmailStore
+from progress_store import ProgressStore
+from large_file import MappedLineFile
+from sv_highlight import SyntaxHighlighter
+from app_context import AppContext
+
+# Display, fonts and layout are set up by init_app() so importing this module
+# opens no window and loads no fonts (see app_context.py)
+app = None  # AppContext once init_app() has run
+screen = None
+WIDTH, HEIGHT = 0, 0
+font_size = 0
+FONT = None
+# Smaller regular-weight font for the boot skip hint and email modal body
+SMALL_FONT = None
+# Column <-> pixel math for the editor (col * advance for monospace fonts)
+EDITOR_METRICS = None
+STATUS_BAR_HEIGHT = 0  # Height of status bar at bottom
+clock = None
+
+# Frame scheduler - the main loop blocks on pygame.event.wait while nothing is
+# animating and only runs at the frame cap during boot, key repeat and cursor fade
+MAX_FPS = 30  # Frame cap while animating
+ECO_MAX_FPS = 10  # Frame cap in eco mode
+# The cursor fade stops (leaving a solid cursor) after this many ms without
+# input, so an idle editor blocks in event.wait instead of animating
+CURSOR_IDLE_TIMEOUT = 5000
+ECO_CURSOR_IDLE_TIMEOUT = 2000  # The same in eco mode
+eco_mode = False
+last_input_time = 0  # pygame ticks of the last key event
+next_frame_time = 0  # Earliest pygame ticks the next animation frame may run
+# Posted from background threads to wake a main loop blocked in event.wait
+WAKE_EVENT = pygame.event.custom_type()
 
 # Colors
 BLACK = (0, 0, 0)
@@ -39,6 +49,31 @@ WHITE = (255, 255, 255)
 GRAY = (50, 50, 50)
 MENU_BG = (0, 60, 0)
 SELECTION_BG = (0, 128, 0)  # Darker green for selection background
+COLORKEY = (255, 0, 255)  # Transparent fill for overlay panel surfaces
+
+# Syntax highlighting colors for .sv files (span kinds from sv_highlight.py)
+SYNTAX_COLORS = {
+    "text": GREEN,
+    "keyword": (140, 255, 255),
+    "type": (255, 255, 120),
+    "comment": (0, 150, 0),
+    "number": (255, 180, 80),
+    "string": (255, 150, 210),
+    "directive": (200, 170, 255),
+}
+
+# Text render cache - most visible strings are unchanged from frame to frame,
+# so rendered surfaces are kept in an LRU bounded by an approximate byte budget
+RENDER_CACHE_BUDGET_BYTES = 32 * 1024 * 1024
+render_cache = OrderedDict()  # (font, text, antialias, color) -> Surface
+render_cache_bytes = 0
+render_cache_hits = 0
+render_cache_misses = 0
+
+# Fitted text - labels cut down to a pixel width with "...", memoized per
+# (font, text, max_width, min_length)
+FIT_TEXT_CACHE_SIZE = 4096
+fit_text_cache = OrderedDict()
 
 boot_lines = [
     "JackROM BIOS (C) 1991 Jack Games Ltd.",
@@ -65,9 +100,16 @@ boot_index = 0
 boot_timer = 0
 boot_speed = 0.7
 
-text_buffer = [""]
+text_buffer = LineRope([""])  # Editor lines (list-like rope, see line_rope.py)
+editor_highlighter = SyntaxHighlighter()  # Line states and lexed spans for text_buffer
 cursor_x, cursor_y = 0, 0
 cursor_timer = 0  # Timer for CRT-style cursor fade effect
+
+# Baked animations - looping effects are pre-rendered into a table of frames
+# once, so drawing a frame is a table lookup plus one blit
+CURSOR_FADE_CYCLE_MS = 1200  # Full fade out and back in, slow and CRT-like
+CURSOR_FADE_STEPS = 36  # Frames per cycle (~33ms each, one per frame at 30 FPS)
+animations = {}  # name -> {"cycle_ms", "frames": [Surface]}
 running = False
 
 # Text selection system
@@ -76,39 +118,140 @@ selection_end_x, selection_end_y = None, None
 selection_active = False
 clipboard = ""  # Simple clipboard storage
 
-# Workspace layout
-LEFT_PANEL_WIDTH = WIDTH // 3  # Left third for browser and inbox
-FILE_BROWSER_HEIGHT = HEIGHT // 2  # Top half of left panel
-# Bottom half of left panel, accounting for status bar
-INBOX_HEIGHT = HEIGHT - FILE_BROWSER_HEIGHT - STATUS_BAR_HEIGHT
-EDITOR_WIDTH = WIDTH - LEFT_PANEL_WIDTH  # Right two-thirds for editor
-EDITOR_X_OFFSET = LEFT_PANEL_WIDTH  # Editor starts after left panel
+# Undo/redo - edits are recorded as compact deltas, see undo.py
+undo_history = UndoHistory()  # Keeps undo.DEFAULT_MEMORY_BUDGET bytes of history per file
+
+# Workspace layout (computed from the screen size by init_app)
+LEFT_PANEL_WIDTH = 0
+FILE_BROWSER_HEIGHT = 0
+INBOX_HEIGHT = 0
+EDITOR_WIDTH = 0
+EDITOR_X_OFFSET = 0
 
 # Email inbox state
-emails = []  # Will be loaded from files
+emails = []  # Header dicts for the current level; bodies come from email_store
+email_store = None  # EmailStore once init_app() has run: header index per level
+# Read flags, level results and the last open file (SQLite, batched writes),
+# opened by init_app() so importing main (or a spawned worker re-importing it)
+# creates no files
+PROGRESS_DB_PATH = "progress.db"
+progress_store = None
 current_level = 1  # Current game level
 
 # Text editor scroll state
 editor_scroll_offset = 0  # Current vertical scroll position in editor
 
 # File browser state
-workspace_files = []
+workspace_files = []  # Cached, sorted workspace file list (see scan_workspace_files)
 selected_file_index = 0
 current_file = f"{current_level}.sv"  # Currently opened file - level-based
 file_read_only = False  # Track if current file is read-only
 selected_email_index = 0
 active_panel = "editor"  # "editor", "files", "inbox"
 show_email_modal = False  # Whether to show full email modal
+email_modal_title = "EMAIL MESSAGE"  # Modal header; the gate report reuses the modal
 email_modal_content = ""  # Content for the modal
 email_modal_scroll_offset = 0  # Current scroll position in modal
 email_modal_content_lines = []  # Pre-processed lines for scrolling
 email_modal_max_visible_lines = 0  # Max lines that fit in modal viewport
+# Wrapped and rendered message previews keyed by (email id, width, lines, font);
+# rebuilt only when the selection, panel size or font changes
+PREVIEW_LAYOUT_CACHE_SIZE = 32
+preview_layout_cache = OrderedDict()
+
+# Workspace index - the file list is cached and only rescanned on explicit
+# actions (save, new file, level change) or when the watcher thread sees the
+# workspace directory's mtime change. Polling backs off while nothing changes.
+WORKSPACE_POLL_MIN_INTERVAL = 0.5  # seconds between checks right after a change
+WORKSPACE_POLL_MAX_INTERVAL = 8.0  # seconds between checks once idle
+workspace_dir_mtime = None  # mtime of the workspace dir at the last scan
+workspace_index_changed = threading.Event()  # Set by the watcher, drained by main loop
+workspace_watcher_stop = threading.Event()
+workspace_watcher_thread = None
+
+# Save pipeline - a save snapshots the buffer (O(1) with the rope) and hands it
+# to a background I/O thread that writes a temp file, fsyncs it and renames it
+# over the target, so a slow disk never stalls a frame and a crash can't leave
+# a half-written file. Saves of a file that is still waiting are coalesced.
+AUTOSAVE_INTERVAL = 30000  # ms a modified buffer waits before it is autosaved
+# The umask is process-wide and can only be read by setting it, so read it
+# once here (on the importing main thread) rather than on the save thread
+_umask = os.umask(0)
+os.umask(_umask)
+NEW_FILE_MODE = 0o666 & ~_umask  # Permissions of files a save creates
+save_lock = threading.Lock()
+save_pending = {}  # filename -> {"lines", "version", "verify"} waiting for the writer
+save_wakeup = threading.Event()
+save_results = queue.Queue()  # Result dicts posted by the save thread
+save_thread = None
+save_stopping = False
+save_status = ""  # Latest save result shown in the status bar
+saved_buffer_version = 0  # buffer_version last written (or queued) for current_file
+buffer_modified = False  # text_buffer was edited since current_file was loaded or saved
+next_autosave_time = None  # pygame ticks when the modified buffer gets autosaved
+
+# Level goals - the module each level asks for and its expected truth table,
+# as (input values, output values) rows in the order the simulator lists them.
+# Designs wider than MAX_TRUTH_TABLE_INPUTS give a function from the input
+# values to the output values instead (see vector_check.py).
+LEVEL_GOALS = {
+    1: {
+        "module": "not_gate",
+        "expected": [
+            ((0,), (1,)),
+            ((1,), (0,)),
+        ],
+    },
+}
+
+# Save-triggered verification - saves queue a job for a background worker;
+# each job carries a generation number and stops as soon as a newer save
+# bumps verification_generation. Results come back through a queue that the
+# main loop drains every frame.
+verification_jobs = queue.Queue()  # (generation, level, filename, source) or None to stop
+verification_results = queue.Queue()  # Result dicts posted by the worker
+verification_generation = 0  # Generation of the newest requested job
+verification_thread = None
+verification_status = ""  # Short verification result shown in the status bar
+gate_report = ""  # Gate count breakdown of the last passing design (F3 > Gate Report)
+vector_pool = None  # VectorPool for designs too wide for a truth table, started on first use
+# Parsed files and flattened designs keyed by content hash, persisted between runs
+MODULE_CACHE_DIR = ".bitworks_cache"
+module_cache = ModuleCache(MODULE_CACHE_DIR)
+gate_counter = GateCounter(module_cache)  # Memoized per-module NAND counts and breakdowns
+FONT_PATH_CACHE = os.path.join(MODULE_CACHE_DIR, "font_paths.json")
+
+# Large files are memory-mapped and their line index is built a chunk per
+# frame, so opening one costs the first screen rather than the whole file.
+# The buffer stays read-only until indexing completes.
+LARGE_FILE_THRESHOLD = 1024 * 1024  # Bytes above which files open memory-mapped
+LARGE_FILE_FIRST_CHUNK = 256 * 1024  # Bytes indexed before the first paint
+LARGE_FILE_INDEX_BYTES = 8 * 1024 * 1024  # Bytes indexed per frame after that
+large_file = None  # MappedLineFile still being indexed into text_buffer
+
+# Workspace compositor - each panel keeps an offscreen surface that is only
+# redrawn when its inputs change; changed regions are pushed with display.update
+PANEL_ORDER = [  # Bottom to top
+    "menu",
+    "files",
+    "inbox",
+    "preview",
+    "editor",
+    "status",
+    "modal",
+    "dropdown",
+]
+panels = {}  # name -> {"rect", "surface", "visible", "inputs", "dirty"}
+workspace_full_redraw = True  # Push the whole screen on the next frame
+panel_draw_times = {}  # name -> seconds spent redrawing it in the last draw_workspace()
+cursor_rect = None  # Screen rect covered by the cursor last frame
+buffer_version = 0  # Bumped whenever text_buffer is modified
 
 active_menu = None
 menus = {
     "F1": ["New File", "Open File", "Save File", "Exit"],
-    "F2": ["Cut", "Copy", "Paste"],
-    "F3": ["Files Panel", "Inbox Panel", "Editor Panel"],  # Panel navigation
+    "F2": ["Cut", "Copy", "Paste", "Undo", "Redo"],
+    "F3": ["Files Panel", "Inbox Panel", "Editor Panel", "Eco Mode", "Gate Report"],  # View menu
 }
 
 # Key repeat system
@@ -131,6 +274,137 @@ REPEAT_KEYS = {
     pygame.K_PAGEDOWN,
 }
 
+# Cursor movement keys in the editor
+NAVIGATION_KEYS = {
+    pygame.K_LEFT,
+    pygame.K_RIGHT,
+    pygame.K_UP,
+    pygame.K_DOWN,
+    pygame.K_HOME,
+    pygame.K_END,
+    pygame.K_PAGEUP,
+    pygame.K_PAGEDOWN,
+}
+
+
+def init_app(fullscreen=True):
+    """Initialize pygame, open the display, load fonts, lay out the workspace,
+    open the email index and saved progress and prune the module cache.
+
+    Safe to call more than once; returns the AppContext.
+    """
+    global app, screen, WIDTH, HEIGHT, font_size, FONT, SMALL_FONT, EDITOR_METRICS
+    global STATUS_BAR_HEIGHT, clock, email_store, progress_store
+    global LEFT_PANEL_WIDTH, FILE_BROWSER_HEIGHT, INBOX_HEIGHT, EDITOR_WIDTH, EDITOR_X_OFFSET
+    if app is not None:
+        return app
+    app = AppContext(FONT_PATH_CACHE)
+
+    # Fullscreen at the largest 16:9 size that fits the screen
+    screen = app.open_display("Retro PC Boot - Text Editor", 16 / 9, fullscreen)
+    WIDTH, HEIGHT = app.size
+    clock = app.clock
+
+    # Scale fonts based on screen size (larger fonts for bigger screens)
+    fonts = app.init_fonts()
+    font_size = max(18, WIDTH // 60)  # Scale font with screen width
+    FONT = fonts.get("couriernew", font_size, bold=True)
+    SMALL_FONT = fonts.get("couriernew", max(14, int(font_size * 0.8)))
+    EDITOR_METRICS = FontMetrics(FONT)
+    STATUS_BAR_HEIGHT = font_size + 8
+    app.timer.mark("fonts" if fonts.scans else "fonts (cached paths)")
+
+    LEFT_PANEL_WIDTH = WIDTH // 3  # Left third for browser and inbox
+    FILE_BROWSER_HEIGHT = HEIGHT // 2  # Top half of left panel
+    # Bottom half of left panel, accounting for status bar
+    INBOX_HEIGHT = HEIGHT - FILE_BROWSER_HEIGHT - STATUS_BAR_HEIGHT
+    EDITOR_WIDTH = WIDTH - LEFT_PANEL_WIDTH  # Right two-thirds for editor
+    EDITOR_X_OFFSET = LEFT_PANEL_WIDTH  # Editor starts after left panel
+
+    email_store = EmailStore("emails")
+    progress_store = ProgressStore(PROGRESS_DB_PATH)
+    app.timer.mark("progress")
+    module_cache.prune_disk()  # Cached pickles are never invalidated, only aged out
+    app.timer.mark("module cache")
+    return app
+
+
+def render_text(font, text, antialias, color):
+    """Render text through the LRU surface cache (same arguments as Font.render).
+
+    The returned surface is shared with the cache and must not be drawn on.
+    """
+    global render_cache_bytes, render_cache_hits, render_cache_misses
+    key = (font, text, antialias, color)
+    surface = render_cache.get(key)
+    if surface is not None:
+        render_cache.move_to_end(key)
+        render_cache_hits += 1
+        return surface
+
+    render_cache_misses += 1
+    surface = font.render(text, antialias, color)
+    render_cache[key] = surface
+    render_cache_bytes += surface.get_pitch() * surface.get_height()
+
+    # Evict least recently used surfaces until we're back under budget
+    while render_cache_bytes > RENDER_CACHE_BUDGET_BYTES and len(render_cache) > 1:
+        _, old_surface = render_cache.popitem(last=False)
+        render_cache_bytes -= old_surface.get_pitch() * old_surface.get_height()
+    return surface
+
+
+def clear_render_cache():
+    """Drop all cached text surfaces (e.g. after fonts change)"""
+    global render_cache_bytes
+    render_cache.clear()
+    render_cache_bytes = 0
+
+
+def get_render_cache_stats():
+    """Return render cache counters for diagnostics"""
+    lookups = render_cache_hits + render_cache_misses
+    return {
+        "entries": len(render_cache),
+        "bytes": render_cache_bytes,
+        "budget": RENDER_CACHE_BUDGET_BYTES,
+        "hits": render_cache_hits,
+        "misses": render_cache_misses,
+        "hit_rate": render_cache_hits / lookups if lookups else 0.0,
+    }
+
+
+def fit_text(font, text, max_width, min_length=0):
+    """Return text cut down with "..." so it fits in max_width pixels.
+
+    Keeps the longest prefix (but at least min_length characters) whose
+    width plus "..." fits, found by binary search over prefix widths.
+    Text that already fits is returned unchanged.
+    """
+    key = (font, text, max_width, min_length)
+    fitted = fit_text_cache.get(key)
+    if fitted is not None:
+        fit_text_cache.move_to_end(key)
+        return fitted
+
+    if font.size(text)[0] <= max_width:
+        fitted = text
+    else:
+        # Prefix widths only grow with length: find the longest that fits
+        low, high = min_length, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if font.size(text[:mid] + "...")[0] <= max_width:
+                low = mid
+            else:
+                high = mid - 1
+        fitted = text[:low] + "..."
+
+    fit_text_cache[key] = fitted
+    if len(fit_text_cache) > FIT_TEXT_CACHE_SIZE:
+        fit_text_cache.popitem(last=False)
+    return fitted
+
 
 def should_key_repeat(key):
     """Check if a key should repeat when held down"""
@@ -139,6 +413,13 @@ def should_key_repeat(key):
     )  # Include printable ASCII characters
 
 
+def mark_buffer_changed():
+    """Record that text_buffer was modified so the editor panel redraws"""
+    global buffer_version, buffer_modified
+    buffer_version += 1
+    buffer_modified = True  # Loads clear this again right after
+
+
 # File operations
 def is_file_read_only(filename):
     """Determine if a file should be read-only based on its name.
@@ -159,38 +440,88 @@ def ensure_workspace_dir():
 
 def save_file():
     """Save current text buffer to current file if not read-only"""
-    global file_read_only, current_file
-    if file_read_only:
-        print(f"Cannot save: {current_file} is read-only")
-        return False
-    try:
-        ensure_workspace_dir()
-        file_path = os.path.join("workspace", current_file)
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(text_buffer))
-        print(f"Saved file: {current_file}")
-        return True
-    except Exception as e:
-        print(f"Error saving file: {e}")
-        return False
+    return save_current_file()
+
+
+def read_file_lines(file_path):
+    """Read a workspace file into a new LineRope.
+
+    Files over LARGE_FILE_THRESHOLD are memory-mapped: only the first chunk
+    is indexed here and continue_large_file_load appends the rest frame by
+    frame, with lines decoded as the editor first shows them. The map is
+    closed once indexing completes; lines not shown yet are then read from
+    the file by offset (see large_file.py).
+    """
+    global large_file
+    if os.path.getsize(file_path) <= LARGE_FILE_THRESHOLD:
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        close_large_file()  # Only once the read worked: the old buffer may still need it
+        return LineRope(content.split("\n")) if content else LineRope([""])
+
+    source = MappedLineFile(file_path)
+    while source.line_count == 0:  # A huge first line needs more than one chunk
+        source.index_more(LARGE_FILE_FIRST_CHUNK)
+    lines = LineRope()
+    lines.append_lazy(source, 0, source.line_count)
+    close_large_file()
+    if source.complete:
+        source.close()  # Indexed already; the lazy leaves read from the file
+    else:
+        large_file = source
+    return lines
+
+
+def close_large_file():
+    """Stop indexing the large file being loaded and close its map.
+
+    Only call this when text_buffer no longer needs the file's lines: the
+    buffer is being replaced, or its text has already been read.
+    """
+    global large_file
+    if large_file is not None:
+        large_file.close()
+        large_file = None
+
+
+def continue_large_file_load():
+    """Index the next chunk of a large file and append its lines to the buffer"""
+    global large_file, file_read_only, saved_buffer_version, buffer_modified
+    if large_file is None:
+        return
+    indexed = large_file.line_count
+    large_file.index_more(LARGE_FILE_INDEX_BYTES)
+    text_buffer.append_lazy(large_file, indexed, large_file.line_count)
+    # Redraw only if the new lines show up in the editor, and once at the end
+    # (the scrollbar catches up then; the header already tracks large_file)
+    if large_file.complete or indexed < editor_scroll_offset + get_editor_max_visible_lines():
+        mark_buffer_changed()
+        saved_buffer_version = buffer_version
+        buffer_modified = False  # Still identical to the file on disk
+    if large_file.complete:
+        print(f"Indexed {large_file.line_count} lines of {current_file}")
+        large_file.close()  # Indexed; the lazy leaves read from the file from now on
+        large_file = None
+        file_read_only = is_file_read_only(current_file)
 
 
 def load_file():
     """Load text from the current level file if it exists"""
     global text_buffer, cursor_x, cursor_y, current_file, file_read_only, editor_scroll_offset
+    global saved_buffer_version, buffer_modified
     try:
         file_path = os.path.join("workspace", current_file)
         if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                if content:
-                    text_buffer = content.split("\n")
-                else:
-                    text_buffer = [""]
-                cursor_x, cursor_y = 0, 0
-                editor_scroll_offset = 0  # Reset scroll position
-                file_read_only = is_file_read_only(current_file)
-                return True
+            text_buffer = read_file_lines(file_path)
+            cursor_x, cursor_y = 0, 0
+            editor_scroll_offset = 0  # Reset scroll position
+            file_read_only = is_file_read_only(current_file) or large_file is not None
+            undo_history.clear()
+            mark_buffer_changed()
+            saved_buffer_version = buffer_version
+            buffer_modified = False
+            progress_store.set_setting("last_file", current_file)
+            return True
         return False
     except Exception as e:
         print(f"Error loading file: {e}")
@@ -198,56 +529,125 @@ def load_file():
 
 
 def new_file():
-    """Clear the text buffer for a new file"""
+    """Clear the text buffer for a new file (undoable unless the old text is too large)"""
     global text_buffer, cursor_x, cursor_y, editor_scroll_offset
-    text_buffer = [""]
+    # A large file still being indexed is only partly in the buffer, so it
+    # can't be restored by undo either
+    if large_file is None and undo_history.fits(text_buffer):
+        old_text = text_buffer.text()
+        if old_text:
+            undo_history.record("replace", 0, 0, old_text, "", (cursor_x, cursor_y), (0, 0))
+    else:
+        undo_history.clear()  # One record would blow the budget; earlier ones are moot
+    close_large_file()  # Stop indexing a large file into the new buffer
+    text_buffer = LineRope([""])
     cursor_x, cursor_y = 0, 0
     editor_scroll_offset = 0  # Reset scroll position
     clear_selection()
+    mark_buffer_changed()
+    scan_workspace_files()
+
+
+def get_workspace_mtime():
+    """Return the workspace directory mtime in nanoseconds, or None if missing"""
+    try:
+        return os.stat("workspace").st_mtime_ns
+    except OSError:
+        return None
 
 
 def scan_workspace_files():
-    """Scan workspace directory for .sv and .s files"""
-    global workspace_files
-    workspace_files = []
+    """Rescan workspace directory for .sv and .s files and update the cached index"""
+    global workspace_files, workspace_dir_mtime
+    files = []
 
     try:
         ensure_workspace_dir()
+        # Record the mtime before listing so a change made during the scan
+        # is still picked up by the watcher on its next check
+        workspace_dir_mtime = get_workspace_mtime()
         if os.path.exists("workspace"):
             for filename in sorted(os.listdir("workspace")):
                 if filename.endswith((".sv", ".s")):
                     file_path = os.path.join("workspace", filename)
                     if os.path.isfile(file_path):
-                        workspace_files.append(filename)
+                        files.append(filename)
     except Exception as e:
         print(f"Error scanning workspace: {e}")
 
     # Ensure current file is in the list
-    if current_file not in workspace_files and current_file:
-        workspace_files.insert(0, current_file)
+    if current_file not in files and current_file:
+        files.insert(0, current_file)
+
+    workspace_files = files
+
+
+def workspace_watcher_loop():
+    """Background poll of the workspace directory mtime with exponential backoff.
+
+    Only the cheap stat() runs on this thread; the actual rescan happens on the
+    main thread when it sees workspace_index_changed set.
+    """
+    interval = WORKSPACE_POLL_MIN_INTERVAL
+    last_seen = workspace_dir_mtime
+    while not workspace_watcher_stop.wait(interval):
+        mtime = get_workspace_mtime()
+        if mtime != last_seen:
+            last_seen = mtime
+            workspace_index_changed.set()
+            wake_main_loop()
+            interval = WORKSPACE_POLL_MIN_INTERVAL
+        else:
+            interval = min(WORKSPACE_POLL_MAX_INTERVAL, interval * 2)
+
+
+def start_workspace_watcher():
+    """Start the background workspace watcher thread if it isn't running"""
+    global workspace_watcher_thread
+    if workspace_watcher_thread and workspace_watcher_thread.is_alive():
+        return
+    workspace_watcher_stop.clear()
+    workspace_watcher_thread = threading.Thread(
+        target=workspace_watcher_loop, name="workspace-watcher", daemon=True
+    )
+    workspace_watcher_thread.start()
+
+
+def stop_workspace_watcher():
+    """Signal the workspace watcher thread to exit"""
+    workspace_watcher_stop.set()
+
+
+def refresh_workspace_index_if_changed():
+    """Rescan the workspace if the watcher reported a directory change"""
+    if workspace_index_changed.is_set():
+        workspace_index_changed.clear()
+        if get_workspace_mtime() != workspace_dir_mtime:
+            scan_workspace_files()
 
 
 def load_file_by_name(filename):
     """Load a specific file by name"""
     global text_buffer, cursor_x, cursor_y, current_file, file_read_only, editor_scroll_offset
+    global saved_buffer_version, buffer_modified
     try:
         ensure_workspace_dir()
         file_path = os.path.join("workspace", filename)
         if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                if content:
-                    text_buffer = content.split("\n")
-                else:
-                    text_buffer = [""]
-                cursor_x, cursor_y = 0, 0
-                editor_scroll_offset = 0  # Reset scroll position
-                current_file = filename
-                file_read_only = is_file_read_only(filename)
-                clear_selection()
-                readonly_status = " (read-ONLY)" if file_read_only else ""
-                print(f"Loaded file: {filename}{readonly_status}")
-                return True
+            text_buffer = read_file_lines(file_path)
+            cursor_x, cursor_y = 0, 0
+            editor_scroll_offset = 0  # Reset scroll position
+            current_file = filename
+            file_read_only = is_file_read_only(filename) or large_file is not None
+            clear_selection()
+            undo_history.clear()
+            mark_buffer_changed()
+            saved_buffer_version = buffer_version
+            buffer_modified = False
+            progress_store.set_setting("last_file", filename)
+            readonly_status = " (read-ONLY)" if file_read_only else ""
+            print(f"Loaded file: {filename}{readonly_status}")
+            return True
         else:
             print(f"File not found: {filename}")
             return False
@@ -256,45 +656,322 @@ def load_file_by_name(filename):
         return False
 
 
-def save_current_file():
-    """Save current text buffer to the current file if not read-only"""
-    global current_file, file_read_only
+def save_current_file(verify=True):
+    """Queue the current buffer to be saved in the background if not read-only.
+
+    The result is reported by drain_save_results; with `verify` the level is
+    verified once the file is on disk.
+    """
+    global saved_buffer_version, buffer_modified, next_autosave_time, save_status
     if file_read_only:
         print(f"Cannot save: {current_file} is read-only")
         return False
+    with save_lock:
+        pending = save_pending.get(current_file)
+        save_pending[current_file] = {
+            "lines": text_buffer.snapshot(),
+            "version": buffer_version,
+            "verify": verify or bool(pending and pending["verify"]),
+        }
+    saved_buffer_version = buffer_version
+    buffer_modified = False
+    next_autosave_time = None
+    save_status = "Saving..."
+    start_save_worker()
+    save_wakeup.set()
+    return True
+
+
+def write_file_atomic(path, lines):
+    """Write lines to path via a fsynced temp file renamed over the target"""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
     try:
-        ensure_workspace_dir()
-        file_path = os.path.join("workspace", current_file)
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(text_buffer))
-        print(f"Saved file: {current_file}")
-        return True
-    except Exception as e:
-        print(f"Error saving file {current_file}: {e}")
-        return False
+        # Keep the permissions of the file being replaced
+        try:
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            os.chmod(temp_path, NEW_FILE_MODE)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for index, line in enumerate(lines):
+                if index:
+                    f.write("\n")
+                f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    # Make the rename itself durable (not supported on every platform)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+
+def save_worker_loop():
+    """Write queued saves one file at a time until asked to stop"""
+    while True:
+        save_wakeup.wait()
+        with save_lock:
+            if not save_pending:
+                save_wakeup.clear()
+                if save_stopping:
+                    return
+                continue
+            filename = next(iter(save_pending))
+            job = save_pending.pop(filename)
+
+        result = {"filename": filename, "version": job["version"], "verify": job["verify"]}
+        try:
+            ensure_workspace_dir()
+            write_file_atomic(os.path.join("workspace", filename), job["lines"])
+            result["error"] = None
+            if job["verify"]:
+                result["source"] = job["lines"].text()
+        except OSError as e:
+            result["error"] = str(e)
+        save_results.put(result)
+        wake_main_loop()
+
+
+def start_save_worker():
+    """Start the background save thread if it isn't running"""
+    global save_thread
+    if save_thread and save_thread.is_alive():
+        return
+    save_thread = threading.Thread(target=save_worker_loop, name="save-writer", daemon=True)
+    save_thread.start()
+
+
+def stop_save_worker(timeout=5.0):
+    """Finish writing queued saves, then stop the save thread"""
+    global save_stopping
+    save_stopping = True
+    save_wakeup.set()
+    if save_thread and save_thread.is_alive():
+        save_thread.join(timeout)
+
+
+def drain_save_results():
+    """Apply results posted by the save thread (called every frame)"""
+    global save_status, buffer_modified
+    saved_any = False
+    while True:
+        try:
+            result = save_results.get_nowait()
+        except queue.Empty:
+            break
+        filename = result["filename"]
+        if result["error"]:
+            print(f"Error saving file {filename}: {result['error']}")
+            save_status = "Save failed"
+            if filename == current_file and saved_buffer_version == result["version"]:
+                buffer_modified = True  # No newer save is queued; autosave will retry
+            continue
+        print(f"Saved file: {filename}")
+        save_status = "Saved"
+        saved_any = True
+        if result["verify"] and filename == current_file:
+            request_verification(result["source"])
+    if saved_any:
+        scan_workspace_files()  # A save may have created the file
+
+
+def update_autosave():
+    """Autosave the buffer once it has been modified for AUTOSAVE_INTERVAL ms"""
+    global next_autosave_time
+    if file_read_only or not buffer_modified:
+        next_autosave_time = None
+        return
+    now = pygame.time.get_ticks()
+    if next_autosave_time is None:
+        next_autosave_time = now + AUTOSAVE_INTERVAL
+    elif now >= next_autosave_time:
+        save_current_file(verify=False)
+
+
+def request_verification(source):
+    """Queue verification of the current level; cancels any job still running.
+
+    `source` is the text just saved to current_file. The level file is
+    verified from it directly; other saved files are picked up from disk.
+    """
+    global verification_generation, verification_status
+    if current_level not in LEVEL_GOALS:
+        return
+    verification_generation += 1
+    level_file = f"{current_level}.sv"
+    level_source = source if current_file == level_file else None
+    verification_jobs.put((verification_generation, current_level, level_file, level_source))
+    verification_status = "Verifying..."
+    start_verification_worker()
+
+
+def get_vector_pool():
+    """The session's VectorPool; its worker processes start on the first wide check"""
+    global vector_pool
+    if vector_pool is None:
+        vector_pool = VectorPool()
+    return vector_pool
+
+
+def stop_vector_pool():
+    """Shut down the VectorPool's worker processes; the next wide check starts a new pool"""
+    global vector_pool
+    if vector_pool is not None:
+        vector_pool.close()
+        vector_pool = None
+
+
+def run_verification(generation, level, level_file, level_source):
+    """Verify a level design; returns a result dict, or None if superseded"""
+    goal = LEVEL_GOALS[level]
+    result = {"generation": generation, "level": level, "passed": False, "nand_count": None}
+
+    def should_cancel():
+        return generation != verification_generation
+
+    try:
+        modules, hashes = module_cache.load_library("workspace", level_file, level_source)
+        design = module_cache.get_design(modules, hashes, goal["module"])
+        if should_cancel():
+            return None
+        if len(design.netlist.input_bits) > MAX_TRUTH_TABLE_INPUTS:
+            # Too wide for a truth table: check vectors on every core instead
+            # (goal["expected"] must then be a module-level function)
+            outcome = check_vectors(
+                design.netlist, goal["expected"], should_cancel=should_cancel, pool=get_vector_pool()
+            )
+            mismatches = outcome.mismatches
+        else:
+            table = module_cache.get_truth_table(design, should_cancel)
+            mismatches = find_mismatches(table, goal["expected"], limit=1)
+    except SimulationCancelled:
+        return None
+    except BrokenProcessPool:
+        # A worker process died (killed, out of memory); start fresh next time
+        stop_vector_pool()
+        result["message"] = f"Level {level} ERROR: vector check workers stopped; save to retry"
+        result["summary"] = "ERROR"
+        return result
+    except (SimulatorError, OSError) as e:
+        result["message"] = f"Level {level} ERROR: {e}"
+        result["summary"] = "ERROR"
+        return result
+
+    result["nand_count"] = design.nand_count
+    if mismatches:
+        inputs, expected, actual = mismatches[0]
+        input_names = [name for name, _ in design.netlist.inputs]
+        output_names = [name for name, _ in design.netlist.outputs]
+        row = ", ".join(f"{n}={v}" for n, v in zip(input_names, inputs))
+        wanted = ", ".join(f"{n}={v}" for n, v in zip(output_names, expected))
+        got = ", ".join(f"{n}={v}" for n, v in zip(output_names, actual))
+        result["message"] = f"Level {level} FAIL: {row} expected {wanted}, got {got}"
+        result["summary"] = "FAIL"
+    else:
+        result["passed"] = True
+        result["message"] = f"Level {level} PASS: {design.nand_count} NAND gates"
+        result["breakdown"] = gate_counter.count(modules, hashes, goal["module"]).format()
+        result["summary"] = f"PASS ({design.nand_count} NAND)"
+    return result
+
+
+def verification_worker_loop():
+    """Run queued verification jobs, always skipping ahead to the newest one"""
+    while True:
+        job = verification_jobs.get()
+        while job is not None:
+            try:
+                job = verification_jobs.get_nowait()
+            except queue.Empty:
+                break
+        if job is None:
+            return
+        try:
+            result = run_verification(*job)
+        except Exception as e:
+            # Anything unexpected (a non-UTF-8 file, a bug in an expected-value
+            # function) fails this job only; the worker keeps running
+            generation, level = job[0], job[1]
+            result = {
+                "generation": generation,
+                "level": level,
+                "passed": False,
+                "nand_count": None,
+                "message": f"Level {level} ERROR: {type(e).__name__}: {e}",
+                "summary": "ERROR",
+            }
+        if result is not None:
+            verification_results.put(result)
+            wake_main_loop()
+
+
+def start_verification_worker():
+    """Start the background verification thread if it isn't running"""
+    global verification_thread
+    if verification_thread and verification_thread.is_alive():
+        return
+    verification_thread = threading.Thread(
+        target=verification_worker_loop, name="verification-worker", daemon=True
+    )
+    verification_thread.start()
+
+
+def stop_verification_worker():
+    """Cancel any running job and signal the verification thread to exit"""
+    global verification_generation
+    verification_generation += 1
+    verification_jobs.put(None)
+
+
+def drain_verification_results():
+    """Apply results posted by the verification worker (called every frame)"""
+    global verification_status, gate_report
+    while True:
+        try:
+            result = verification_results.get_nowait()
+        except queue.Empty:
+            return
+        if result["generation"] != verification_generation:
+            continue  # A newer save is already being verified
+        verification_status = result["summary"]
+        print(result["message"])
+        if "breakdown" in result:
+            print(result["breakdown"])
+            gate_report = f"{result['message']}\n\n{result['breakdown']}"
+        if result["passed"]:
+            level, nand_count = result["level"], result["nand_count"]
+            if progress_store.record_level_result(level, nand_count):
+                print(f"New best for level {level}: {nand_count} NAND gates")
 
 
 def load_emails_for_level(level):
     """Load email messages from files for the specified level"""
     global emails
     emails = []
+    preview_layout_cache.clear()
 
-    email_dir = os.path.join("emails", str(level))
+    email_dir = email_store.level_dir(level)
     if not os.path.exists(email_dir):
         print(f"Email directory not found: {email_dir}")
         return False
 
     try:
-        # Get all .txt files in the level directory and sort them
-        email_files = [f for f in os.listdir(email_dir) if f.endswith(".txt")]
-        email_files.sort()
-
-        for filename in email_files:
-            file_path = os.path.join(email_dir, filename)
-            email = parse_email_file(file_path)
-            if email:
-                emails.append(email)
-
+        emails = email_store.load_level(level)
+        for email in emails:
+            email["read"] = email["read"] or progress_store.is_email_read(email["id"])
         print(f"Loaded {len(emails)} emails for level {level}")
         return True
 
@@ -303,42 +980,6 @@ def load_emails_for_level(level):
         return False
 
 
-def parse_email_file(file_path):
-    """Parse an individual email file"""
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-
-        lines = content.split("\n")
-        email = {"from": "", "date": "", "subject": "", "read": False, "content": ""}
-
-        # Parse header fields
-        content_start = 0
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if line.startswith("From: "):
-                email["from"] = line[6:]
-            elif line.startswith("Date: "):
-                email["date"] = line[6:]
-            elif line.startswith("Subject: "):
-                email["subject"] = line[9:]
-            elif line.startswith("Read: "):
-                email["read"] = line[6:].lower() == "true"
-            elif line == "" and i > 0:  # First empty line after headers
-                content_start = i + 1
-                break
-
-        # Everything after the headers is content
-        if content_start < len(lines):
-            email["content"] = "\n".join(lines[content_start:])
-
-        return email
-
-    except Exception as e:
-        print(f"Error parsing email file {file_path}: {e}")
-        return None
-
-
 def switch_panel(panel_name):
     """Switch to a different panel"""
     global active_panel
@@ -352,10 +993,13 @@ def switch_panel(panel_name):
 def show_email_modal_dialog(email_index):
     """Show full email content in modal dialog"""
     global show_email_modal, email_modal_content, email_modal_scroll_offset, email_modal_content_lines
+    global email_modal_title
     if email_index < len(emails):
         email = emails[email_index]
         email["read"] = True  # Mark as read when opened
+        progress_store.mark_email_read(email["id"])
         show_email_modal = True
+        email_modal_title = "EMAIL MESSAGE"
         email_modal_scroll_offset = 0  # Reset scroll position
 
         email_modal_content = f"""From: {email['from']}
@@ -364,7 +1008,7 @@ Subject: {email['subject']}
 
 {'-' * 50}
 
-{email['content']}
+{email_store.get_body(email)}
 
 {'-' * 50}"""
 
@@ -373,6 +1017,19 @@ Subject: {email['subject']}
         print(f"Opened email: {email['subject']}")
 
 
+def show_gate_report():
+    """Show the last passing design's gate count breakdown in the modal"""
+    global show_email_modal, email_modal_content, email_modal_scroll_offset, email_modal_title
+    if not gate_report:
+        print("No gate report yet - save a level design that passes")
+        return
+    show_email_modal = True
+    email_modal_title = "GATE REPORT"
+    email_modal_scroll_offset = 0
+    email_modal_content = gate_report
+    prepare_modal_content_for_scrolling()
+
+
 def close_email_modal():
     """Close the email modal dialog"""
     global show_email_modal, email_modal_content, email_modal_scroll_offset, email_modal_content_lines
@@ -393,9 +1050,7 @@ def prepare_modal_content_for_scrolling():
     available_width = modal_width - 40
     available_height = modal_height - header_height - 20
 
-    modal_font = pygame.font.Font(
-        pygame.font.match_font("couriernew"), max(14, int(font_size * 0.8))
-    )
+    modal_font = SMALL_FONT
     line_height = font_size + 2
     email_modal_max_visible_lines = available_height // line_height
 
@@ -562,8 +1217,7 @@ def get_selected_text():
         selected_lines.append(text_buffer[start_y][start_x:])
 
         # Middle lines (full lines)
-        for y in range(start_y + 1, end_y):
-            selected_lines.append(text_buffer[y])
+        selected_lines.extend(text_buffer[start_y + 1 : end_y])
 
         # Last line (from beginning to end_x)
         selected_lines.append(text_buffer[end_y][:end_x])
@@ -571,15 +1225,29 @@ def get_selected_text():
         return "\n".join(selected_lines)
 
 
-def delete_selected_text():
-    """Delete the currently selected text and return the cursor to selection start"""
-    global text_buffer, cursor_x, cursor_y
-    bounds = get_selection_bounds()
-    if not bounds:
-        return False
+def insert_text_at(x, y, text):
+    """Insert (possibly multi-line) text at a position with a single buffer splice.
 
-    start_x, start_y, end_x, end_y = bounds
+    Returns the (x, y) position just past the inserted text.
+    """
+    lines = text.split("\n")
+    line = text_buffer[y]
+
+    if len(lines) == 1:
+        text_buffer[y] = line[:x] + text + line[x:]
+        return x + len(text), y
+
+    end_x = len(lines[-1])
+    # First line: text before position + first inserted line
+    # Last line: last inserted line + text after position
+    lines[0] = line[:x] + lines[0]
+    lines[-1] += line[x:]
+    text_buffer[y : y + 1] = lines
+    return end_x, y + len(lines) - 1
 
+
+def delete_text_range(start_x, start_y, end_x, end_y):
+    """Delete the text between two positions (start before end) with a single splice"""
     if start_y == end_y:
         # Single line deletion
         line = text_buffer[start_y]
@@ -589,15 +1257,36 @@ def delete_selected_text():
         # Combine the remaining parts of first and last lines
         combined_line = text_buffer[start_y][:start_x] + text_buffer[end_y][end_x:]
 
-        # Remove all lines in selection
-        del text_buffer[start_y : end_y + 1]
+        # Replace all lines in the selection with the combined line in one splice
+        text_buffer[start_y : end_y + 1] = [combined_line]
+
+
+def delete_selected_text(record_undo=True):
+    """Delete the currently selected text and return the cursor to selection start"""
+    global text_buffer, cursor_x, cursor_y
+    bounds = get_selection_bounds()
+    if not bounds:
+        return False
+
+    start_x, start_y, end_x, end_y = bounds
+    if record_undo:
+        undo_history.record(
+            "delete",
+            start_x,
+            start_y,
+            get_selected_text(),
+            "",
+            (cursor_x, cursor_y),
+            (start_x, start_y),
+        )
 
-        # Insert the combined line
-        text_buffer.insert(start_y, combined_line)
+    delete_text_range(start_x, start_y, end_x, end_y)
 
     # Position cursor at selection start
     cursor_x, cursor_y = start_x, start_y
     clear_selection()
+    mark_buffer_changed()
+    ensure_cursor_visible()
     return True
 
 
@@ -630,41 +1319,72 @@ def paste_from_clipboard():
         print("Clipboard is empty")
         return False
 
-    # If there's a selection, delete it first
+    cursor_before = (cursor_x, cursor_y)
+
+    # If there's a selection, delete it first (recorded together with the paste)
+    removed = ""
     if selection_active:
-        delete_selected_text()
+        removed = get_selected_text()
+        delete_selected_text(record_undo=False)
+
+    # Insert all clipboard lines with a single splice, cursor ends after them
+    paste_x, paste_y = cursor_x, cursor_y
+    cursor_x, cursor_y = insert_text_at(paste_x, paste_y, clipboard)
+    undo_history.record(
+        "paste",
+        paste_x,
+        paste_y,
+        removed,
+        clipboard,
+        cursor_before,
+        (cursor_x, cursor_y),
+    )
 
-    # Split clipboard content into lines
-    clipboard_lines = clipboard.split("\n")
+    mark_buffer_changed()
+    ensure_cursor_visible()
+    print(f"Pasted: {clipboard[:50]}{'...' if len(clipboard) > 50 else ''}")
+    return True
 
-    if len(clipboard_lines) == 1:
-        # Single line paste
-        line = text_buffer[cursor_y]
-        text_buffer[cursor_y] = line[:cursor_x] + clipboard + line[cursor_x:]
-        cursor_x += len(clipboard)
-    else:
-        # Multi-line paste
-        current_line = text_buffer[cursor_y]
-        before_cursor = current_line[:cursor_x]
-        after_cursor = current_line[cursor_x:]
 
-        # First line: before cursor + first clipboard line
-        text_buffer[cursor_y] = before_cursor + clipboard_lines[0]
+def undo():
+    """Revert the most recent edit"""
+    global cursor_x, cursor_y
+    if file_read_only:
+        print(f"Cannot undo: {current_file} is read-only")
+        return False
+    record = undo_history.pop_undo()
+    if record is None:
+        print("Nothing to undo")
+        return False
 
-        # Middle lines: insert full lines
-        for i, line in enumerate(clipboard_lines[1:-1], 1):
-            text_buffer.insert(cursor_y + i, line)
+    end_x, end_y = text_end_position(record.x, record.y, record.inserted)
+    delete_text_range(record.x, record.y, end_x, end_y)
+    insert_text_at(record.x, record.y, record.removed)
+    cursor_x, cursor_y = record.cursor_before
+    clear_selection()
+    mark_buffer_changed()
+    ensure_cursor_visible()
+    return True
 
-        # Last line: last clipboard line + after cursor
-        text_buffer.insert(
-            cursor_y + len(clipboard_lines) - 1, clipboard_lines[-1] + after_cursor
-        )
 
-        # Update cursor position to end of paste
-        cursor_y += len(clipboard_lines) - 1
-        cursor_x = len(clipboard_lines[-1])
+def redo():
+    """Re-apply the most recently undone edit"""
+    global cursor_x, cursor_y
+    if file_read_only:
+        print(f"Cannot redo: {current_file} is read-only")
+        return False
+    record = undo_history.pop_redo()
+    if record is None:
+        print("Nothing to redo")
+        return False
 
-    print(f"Pasted: {clipboard[:50]}{'...' if len(clipboard) > 50 else ''}")
+    end_x, end_y = text_end_position(record.x, record.y, record.removed)
+    delete_text_range(record.x, record.y, end_x, end_y)
+    insert_text_at(record.x, record.y, record.inserted)
+    cursor_x, cursor_y = record.cursor_after
+    clear_selection()
+    mark_buffer_changed()
+    ensure_cursor_visible()
     return True
 
 
@@ -755,7 +1475,7 @@ def handle_menu_action(menu, item_index):
                 print("Switched to files panel - select a file to open")
             elif action == "Save File":
                 if save_current_file():
-                    print(f"Saved current file: {current_file}")
+                    print(f"Saving current file: {current_file}")
                 else:
                     print("Error saving file")
             elif action == "Exit":
@@ -777,6 +1497,10 @@ def handle_menu_action(menu, item_index):
                     print(f"Cannot paste: {current_file} is read-only")
                 elif not paste_from_clipboard():
                     print("Nothing to paste (clipboard empty)")
+            elif action == "Undo":
+                undo()
+            elif action == "Redo":
+                redo()
     elif menu == "F3":
         menu_items = menus["F3"]
         if item_index < len(menu_items):
@@ -787,10 +1511,102 @@ def handle_menu_action(menu, item_index):
                 switch_panel("inbox")
             elif action == "Editor Panel":
                 switch_panel("editor")
+            elif action == "Eco Mode":
+                toggle_eco_mode()
+            elif action == "Gate Report":
+                show_gate_report()
 
     return True  # Continue running
 
 
+def wake_main_loop():
+    """Wake the main loop if it is blocked waiting for events (thread-safe)"""
+    try:
+        pygame.event.post(pygame.event.Event(WAKE_EVENT))
+    except pygame.error:
+        pass  # Display already shut down
+
+
+def toggle_eco_mode():
+    """Switch between full frame rate and the power-saving eco mode"""
+    global eco_mode
+    eco_mode = not eco_mode
+    print(f"Eco mode {'on' if eco_mode else 'off'}")
+
+
+def get_frame_interval():
+    """Milliseconds between animation frames under the current FPS cap"""
+    return 1000 // (ECO_MAX_FPS if eco_mode else MAX_FPS)
+
+
+def is_cursor_animating():
+    """Whether the editor cursor fade needs frames"""
+    if not boot_done or active_panel != "editor" or show_email_modal:
+        return False
+    timeout = ECO_CURSOR_IDLE_TIMEOUT if eco_mode else CURSOR_IDLE_TIMEOUT
+    return pygame.time.get_ticks() - last_input_time < timeout
+
+
+def get_next_key_repeat_deadline():
+    """Return the pygame ticks when the next key repeat is due, or None"""
+    if not boot_done or active_menu:
+        return None
+    deadline = None
+    for key_data in key_states.values():
+        if key_data["repeating"]:
+            due = key_data["last_repeat"] + KEY_REPEAT_INTERVAL
+        else:
+            due = key_data["start_time"] + KEY_REPEAT_DELAY
+        if deadline is None or due < deadline:
+            deadline = due
+    return deadline
+
+
+def get_event_wait_timeout():
+    """Milliseconds the main loop may block waiting for events.
+
+    Returns None when nothing is animating, meaning block until input (or a
+    WAKE_EVENT from a background thread) arrives.
+    """
+    now = pygame.time.get_ticks()
+    deadlines = []
+
+    if not boot_done:
+        if boot_index >= len(boot_lines):
+            deadlines.append(now)
+        else:
+            # Next boot line is due once boot_timer reaches boot_speed
+            deadlines.append(now + int((boot_speed - boot_timer) * 1000))
+    if is_cursor_animating():
+        deadlines.append(next_frame_time)
+
+    repeat_deadline = get_next_key_repeat_deadline()
+    if repeat_deadline is not None:
+        deadlines.append(repeat_deadline)
+    if next_autosave_time is not None:
+        deadlines.append(next_autosave_time)
+    if large_file is not None:
+        deadlines.append(now)  # Keep indexing every frame until the file is loaded
+
+    if not deadlines:
+        return None
+    # Never exceed the frame cap, even for overdue deadlines
+    return max(0, min(deadlines) - now, next_frame_time - now)
+
+
+def wait_for_events():
+    """Block until input arrives or the next animation deadline, then drain the queue"""
+    timeout = get_event_wait_timeout()
+    if timeout is None:
+        events = [pygame.event.wait()]
+    elif timeout > 0:
+        events = [pygame.event.wait(timeout)]
+    else:
+        events = []
+    events.extend(pygame.event.get())
+    return events
+
+
 def draw_boot_screen():
     screen.fill(BLACK)
     # Scale spacing based on screen size
@@ -800,15 +1616,13 @@ def draw_boot_screen():
 
     for i in range(boot_index):
         line = boot_lines[i]
-        text = FONT.render(line, True, GREEN)
+        text = render_text(FONT, line, True, GREEN)
         screen.blit(text, (x_margin, y_start + i * line_spacing))
 
     # Show skip instruction in bottom-right corner
     skip_text = "Press ENTER or ESC to skip"
-    skip_font = pygame.font.Font(
-        pygame.font.match_font("couriernew"), max(14, int(font_size * 0.8))
-    )
-    skip_surface = skip_font.render(skip_text, True, GREEN)
+    skip_font = SMALL_FONT
+    skip_surface = render_text(skip_font, skip_text, True, GREEN)
     skip_rect = skip_surface.get_rect()
     skip_rect.bottomright = (WIDTH - 10, HEIGHT - 10)
     screen.blit(skip_surface, skip_rect)
@@ -816,60 +1630,285 @@ def draw_boot_screen():
     pygame.display.flip()
 
 
-def draw_workspace():
-    """Draw the multi-column workspace layout"""
-    screen.fill(BLACK)
+def get_menu_height():
+    """Height of the menu bar across the top of the workspace"""
+    return font_size + 14
 
-    # Scale UI elements based on screen size
-    menu_height = font_size + 14
-    line_height = font_size + 4
 
-    # Draw menu bar across full width
-    draw_menu_bar(menu_height)
+def get_inbox_separator_y(y_start, y_end, line_height):
+    """Y position of the line splitting the inbox list from the message preview"""
+    header_height = line_height + 4
+    inbox_total_height = y_end - y_start - header_height - 5
+    email_list_height = inbox_total_height // 2
+    return y_start + header_height + 5 + email_list_height
 
-    # Draw vertical separator lines
-    pygame.draw.line(
-        screen, GREEN, (LEFT_PANEL_WIDTH, menu_height), (LEFT_PANEL_WIDTH, HEIGHT), 1
-    )
-    pygame.draw.line(
-        screen,
-        GREEN,
-        (0, FILE_BROWSER_HEIGHT),
-        (LEFT_PANEL_WIDTH, FILE_BROWSER_HEIGHT),
-        1,
+
+def get_modal_rect():
+    """Screen rect of the email modal (80% of screen, centered)"""
+    modal_width = int(WIDTH * 0.8)
+    modal_height = int(HEIGHT * 0.8)
+    return pygame.Rect(
+        (WIDTH - modal_width) // 2, (HEIGHT - modal_height) // 2, modal_width, modal_height
     )
 
-    # Draw file browser (top-left)
-    draw_file_browser(menu_height, FILE_BROWSER_HEIGHT, line_height)
 
-    # Draw email inbox (bottom-left, above status bar)
-    draw_email_inbox(FILE_BROWSER_HEIGHT, HEIGHT - STATUS_BAR_HEIGHT, line_height)
+def get_dropdown_rect():
+    """Screen rect of the open dropdown menu, including its shadow"""
+    idx = ["F1", "F2", "F3"].index(active_menu)
+    x = WIDTH // 50 + (WIDTH // 8) * idx
+    menu_item_height = font_size + 8
+    total_menu_height = len(menus[active_menu]) * menu_item_height
+    # +2 on each axis for the drop shadow
+    return pygame.Rect(x, get_menu_height(), WIDTH // 8 + 2, total_menu_height + 2)
+
 
-    # Draw text editor (right two-thirds, adjusted for status bar)
-    editor_height = HEIGHT - menu_height - STATUS_BAR_HEIGHT
-    draw_text_editor(
-        EDITOR_X_OFFSET, menu_height, EDITOR_WIDTH, editor_height, line_height
-    )
-    
-    # Draw status bar (only if no modal is open)
-    if not show_email_modal:
-        draw_status_bar()
+def build_panels():
+    """Create the retained panel surfaces for the workspace compositor"""
+    global panels
+    menu_height = get_menu_height()
+    line_height = font_size + 4
+    inbox_end = HEIGHT - STATUS_BAR_HEIGHT
+    preview_y = get_inbox_separator_y(FILE_BROWSER_HEIGHT, inbox_end, line_height) + 2
+
+    rects = {
+        "menu": pygame.Rect(0, 0, WIDTH, menu_height),
+        "files": pygame.Rect(
+            0, menu_height, LEFT_PANEL_WIDTH, FILE_BROWSER_HEIGHT - menu_height
+        ),
+        "inbox": pygame.Rect(
+            0, FILE_BROWSER_HEIGHT, LEFT_PANEL_WIDTH, preview_y - FILE_BROWSER_HEIGHT
+        ),
+        "preview": pygame.Rect(0, preview_y, LEFT_PANEL_WIDTH, inbox_end - preview_y),
+        "editor": pygame.Rect(
+            EDITOR_X_OFFSET, menu_height, EDITOR_WIDTH, inbox_end - menu_height
+        ),
+        "status": pygame.Rect(0, inbox_end, WIDTH, STATUS_BAR_HEIGHT),
+        "modal": get_modal_rect(),
+        "dropdown": pygame.Rect(0, 0, 0, 0),  # Sized when a menu opens
+    }
+
+    panels = {}
+    for name in PANEL_ORDER:
+        rect = rects[name]
+        panels[name] = {
+            "rect": rect,
+            "surface": pygame.Surface(rect.size) if rect.width and rect.height else None,
+            "visible": False,
+            "inputs": None,  # Inputs the surface was last drawn with
+            "dirty": True,
+        }
 
-    # Draw email modal if active (on top of everything)
-    draw_email_modal()
-    
-    # Draw dropdown menus last so they appear above everything else
-    if active_menu:
-        x_margin = WIDTH // 50
-        menu_spacing = WIDTH // 8
-        draw_dropdown_menu(menu_height, x_margin, menu_spacing)
 
-    pygame.display.flip()
+def mark_all_panels_dirty():
+    """Force every panel to redraw and the whole screen to be pushed next frame"""
+    global workspace_full_redraw
+    for panel in panels.values():
+        panel["dirty"] = True
+    workspace_full_redraw = True
+
+
+def is_panel_visible(name):
+    """Whether a panel is currently shown"""
+    if name == "modal":
+        return show_email_modal and bool(email_modal_content_lines)
+    elif name == "dropdown":
+        return active_menu is not None
+    return True
+
+
+def get_panel_inputs(name):
+    """Return the state a panel's contents depend on; a change triggers a redraw"""
+    if name == "menu":
+        return ()
+    elif name == "files":
+        return (
+            tuple(workspace_files),
+            selected_file_index,
+            active_panel == "files",
+            current_file,
+        )
+    elif name == "inbox":
+        return (
+            tuple((email["subject"], email["read"]) for email in emails),
+            selected_email_index,
+            active_panel == "inbox",
+        )
+    elif name == "preview":
+        email = emails[selected_email_index] if selected_email_index < len(emails) else None
+        return (
+            (email["id"], email["from"], email["date"], email["subject"])
+            if email
+            else None
+        )
+    elif name == "editor":
+        return (
+            buffer_version,
+            current_file,
+            file_read_only,
+            large_file is not None,
+            active_panel == "editor",
+            editor_scroll_offset,
+            get_selection_bounds() if selection_active else None,
+        )
+    elif name == "status":
+        return (
+            show_email_modal,
+            current_file,
+            file_read_only,
+            large_file is not None,
+            active_panel,
+            cursor_y,
+            len(text_buffer),
+            editor_scroll_offset,
+            save_status,
+            verification_status,
+        )
+    elif name == "modal":
+        return (email_modal_title, email_modal_content, email_modal_scroll_offset)
+    elif name == "dropdown":
+        return (active_menu,)
+
+
+def draw_panel(name, surface):
+    """Redraw a panel's offscreen surface in panel-local coordinates"""
+    rect = panels[name]["rect"]
+    if name == "dropdown":
+        # The drop shadow leaves two corners uncovered; let the panels show through
+        surface.set_colorkey(COLORKEY)
+        surface.fill(COLORKEY)
+    else:
+        surface.fill(BLACK)
+    line_height = font_size + 4
 
+    if name == "menu":
+        draw_menu_bar(surface, rect.height)
+    elif name == "files":
+        draw_file_browser(surface, 0, rect.height, line_height)
+    elif name == "inbox":
+        # Horizontal separator between file browser and inbox
+        pygame.draw.line(surface, GREEN, (0, 0), (LEFT_PANEL_WIDTH, 0), 1)
+        draw_email_inbox(surface, 0, HEIGHT - STATUS_BAR_HEIGHT - rect.y, line_height)
+    elif name == "preview":
+        draw_message_preview(surface, 0, rect.height, line_height)
+    elif name == "editor":
+        # Vertical separator between left panels and editor
+        pygame.draw.line(surface, GREEN, (0, 0), (0, rect.height), 1)
+        draw_text_editor(surface, 0, 0, rect.width, rect.height, line_height)
+    elif name == "status":
+        # Status bar is hidden while the email modal is open, leaving the
+        # vertical panel separator running to the bottom of the screen
+        if show_email_modal:
+            pygame.draw.line(
+                surface, GREEN, (LEFT_PANEL_WIDTH, 0), (LEFT_PANEL_WIDTH, rect.height), 1
+            )
+        else:
+            draw_status_bar(surface)
+    elif name == "modal":
+        draw_email_modal(surface)
+    elif name == "dropdown":
+        draw_dropdown_menu(surface)
+
+
+def composite_rect(rect):
+    """Rebuild a screen region from the visible panel surfaces in z-order"""
+    screen.fill(BLACK, rect)
+    for name in PANEL_ORDER:
+        panel = panels[name]
+        if not panel["visible"] or panel["surface"] is None:
+            continue
+        clip = rect.clip(panel["rect"])
+        if clip.width and clip.height:
+            area = clip.move(-panel["rect"].x, -panel["rect"].y)
+            screen.blit(panel["surface"], clip.topleft, area)
+
+
+def update_workspace():
+    """Per-frame housekeeping before the workspace is drawn"""
+    # Pick up workspace changes reported by the watcher and load emails on first run
+    refresh_workspace_index_if_changed()
+    continue_large_file_load()
+    drain_save_results()
+    drain_verification_results()
+    update_autosave()
+    if not emails:  # Load emails only once
+        load_emails_for_level(current_level)
 
-def draw_menu_bar(menu_height):
+
+def draw_workspace():
+    """Draw the multi-column workspace layout, pushing only changed regions"""
+    global workspace_full_redraw, cursor_rect
+    if not panels:
+        build_panels()
+
+    dirty_rects = []
+    panel_draw_times.clear()
+    for name in PANEL_ORDER:
+        panel = panels[name]
+        visible = is_panel_visible(name)
+
+        if name == "dropdown" and visible:
+            # The dropdown moves and resizes with the open menu
+            rect = get_dropdown_rect()
+            if rect != panel["rect"]:
+                if panel["visible"]:
+                    dirty_rects.append(panel["rect"])
+                panel["rect"] = rect
+                panel["surface"] = pygame.Surface(rect.size)
+                panel["dirty"] = True
+
+        if visible != panel["visible"]:
+            # Showing or hiding an overlay exposes/covers what's beneath it
+            panel["visible"] = visible
+            dirty_rects.append(panel["rect"])
+        if not visible:
+            continue
+
+        inputs = get_panel_inputs(name)
+        if panel["dirty"] or inputs != panel["inputs"]:
+            draw_start = time.perf_counter()
+            draw_panel(name, panel["surface"])
+            panel_draw_times[name] = time.perf_counter() - draw_start
+            panel["inputs"] = inputs
+            panel["dirty"] = False
+            dirty_rects.append(panel["rect"])
+
+    if workspace_full_redraw:
+        dirty_rects = [screen.get_rect()]
+
+    # Restore whatever was under last frame's cursor, then composite the
+    # changed panels (and any overlays above them) back onto the screen
+    if cursor_rect:
+        dirty_rects.append(cursor_rect)
+    for rect in dirty_rects:
+        composite_rect(rect)
+
+    # Draw cursor (only if editor is active) directly on the screen
+    cursor_rect = None
+    if active_panel == "editor":
+        editor_rect = panels["editor"]["rect"]
+        line_height = font_size + 4
+        cursor_rect = draw_cursor(
+            editor_rect.x + 10, editor_rect.y + line_height + 4 + 5, line_height
+        )
+        if cursor_rect:
+            # Don't draw over overlays: recomposite if the cursor is hidden by one
+            for name in ("modal", "dropdown"):
+                panel = panels[name]
+                if panel["visible"] and cursor_rect.colliderect(panel["rect"]):
+                    composite_rect(cursor_rect)
+                    break
+            dirty_rects.append(cursor_rect)
+
+    if workspace_full_redraw:
+        pygame.display.flip()
+        workspace_full_redraw = False
+    elif dirty_rects:
+        pygame.display.update(dirty_rects)
+
+
+def draw_menu_bar(surface, menu_height):
     """Draw the menu bar across the top"""
-    pygame.draw.rect(screen, MENU_BG, (0, 0, WIDTH, menu_height))
+    pygame.draw.rect(surface, MENU_BG, (0, 0, WIDTH, menu_height))
 
     # Update menu labels to reflect new functionality
     fkeys = ["F1-File", "F2-Edit", "F3-View"]
@@ -878,17 +1917,15 @@ def draw_menu_bar(menu_height):
     x = x_margin
 
     for label in fkeys:
-        txt = FONT.render(label, True, GREEN)
-        screen.blit(txt, (x, (menu_height - font_size) // 2))
+        txt = render_text(FONT, label, True, GREEN)
+        surface.blit(txt, (x, (menu_height - font_size) // 2))
         x += menu_spacing
 
 
-def draw_dropdown_menu(menu_height, x_margin, menu_spacing):
-    """Draw dropdown menu with enhanced visibility"""
+def draw_dropdown_menu(surface):
+    """Draw dropdown menu with enhanced visibility onto its own panel surface"""
     menu_items = menus[active_menu]
-    idx = ["F1", "F2", "F3"].index(active_menu)
-    x = x_margin + menu_spacing * idx
-    y = menu_height
+    x, y = 0, 0
     menu_item_height = font_size + 8
     menu_item_width = WIDTH // 8
     
@@ -897,37 +1934,37 @@ def draw_dropdown_menu(menu_height, x_margin, menu_spacing):
     
     # Draw subtle shadow (offset by 2 pixels)
     shadow_color = (20, 20, 20)  # Very dark shadow
-    pygame.draw.rect(screen, shadow_color, (x + 2, y + 2, menu_item_width, total_menu_height))
+    pygame.draw.rect(surface, shadow_color, (x + 2, y + 2, menu_item_width, total_menu_height))
     
     # Draw menu background
-    pygame.draw.rect(screen, BLACK, (x, y, menu_item_width, total_menu_height))
+    pygame.draw.rect(surface, BLACK, (x, y, menu_item_width, total_menu_height))
     
     # Draw menu border
-    pygame.draw.rect(screen, GREEN, (x, y, menu_item_width, total_menu_height), 2)
+    pygame.draw.rect(surface, GREEN, (x, y, menu_item_width, total_menu_height), 2)
 
     # Draw menu items
     current_y = y
     for i, item in enumerate(menu_items):
         # Draw item background (darker gray for individual items)
-        pygame.draw.rect(screen, GRAY, (x + 2, current_y + 2, menu_item_width - 4, menu_item_height - 2))
+        pygame.draw.rect(surface, GRAY, (x + 2, current_y + 2, menu_item_width - 4, menu_item_height - 2))
         
         # Draw item text
         fkey_text = f"F{i+1}-{item}"
-        t = FONT.render(fkey_text, True, GREEN)
-        screen.blit(t, (x + 8, current_y + (menu_item_height - font_size) // 2))
+        t = render_text(FONT, fkey_text, True, GREEN)
+        surface.blit(t, (x + 8, current_y + (menu_item_height - font_size) // 2))
         
         current_y += menu_item_height
 
 
-def draw_file_browser(y_start, y_end, line_height):
+def draw_file_browser(surface, y_start, y_end, line_height):
     """Draw the file browser panel"""
     # Panel header
     header_height = line_height + 4
     header_bg = MENU_BG if active_panel == "files" else GRAY
-    pygame.draw.rect(screen, header_bg, (0, y_start, LEFT_PANEL_WIDTH, header_height))
+    pygame.draw.rect(surface, header_bg, (0, y_start, LEFT_PANEL_WIDTH, header_height))
 
-    header_text = FONT.render("FILES (.sv/.s)", True, GREEN)
-    screen.blit(header_text, (5, y_start + 2))
+    header_text = render_text(FONT, "FILES (.sv/.s)", True, GREEN)
+    surface.blit(header_text, (5, y_start + 2))
 
     # File list
     y = y_start + header_height + 5
@@ -937,7 +1974,7 @@ def draw_file_browser(y_start, y_end, line_height):
         if i == selected_file_index and active_panel == "files":
             # Highlight selected file
             pygame.draw.rect(
-                screen, SELECTION_BG, (2, y - 2, LEFT_PANEL_WIDTH - 4, line_height)
+                surface, SELECTION_BG, (2, y - 2, LEFT_PANEL_WIDTH - 4, line_height)
             )
 
         # Show file type icon with better detection
@@ -950,45 +1987,38 @@ def draw_file_browser(y_start, y_end, line_height):
         else:
             icon = "?"
 
-        icon_text = FONT.render(f"[{icon}]", True, GREEN)
-        screen.blit(icon_text, (5, y))
+        icon_text = render_text(FONT, f"[{icon}]", True, GREEN)
+        surface.blit(icon_text, (5, y))
 
         # Show filename (truncate if too long) - account for icon width
         icon_width = FONT.size(f"[{icon}] ")[0]
         max_name_width = LEFT_PANEL_WIDTH - icon_width - 25
-        name_text = filename
-        if FONT.size(name_text)[0] > max_name_width:
-            while (
-                FONT.size(name_text + "...")[0] > max_name_width and len(name_text) > 0
-            ):
-                name_text = name_text[:-1]
-            name_text += "..."
+        name_text = fit_text(FONT, filename, max_name_width)
 
-        file_text = FONT.render(name_text, True, GREEN)
-        screen.blit(file_text, (5 + icon_width, y))
+        file_text = render_text(FONT, name_text, True, GREEN)
+        surface.blit(file_text, (5 + icon_width, y))
 
         # Mark current file
         if filename == current_file:
-            current_marker = FONT.render("*", True, GREEN)
-            screen.blit(current_marker, (LEFT_PANEL_WIDTH - 15, y))
+            current_marker = render_text(FONT, "*", True, GREEN)
+            surface.blit(current_marker, (LEFT_PANEL_WIDTH - 15, y))
 
         y += line_height
 
 
-def draw_email_inbox(y_start, y_end, line_height):
-    """Draw the email inbox panel with message preview"""
+def draw_email_inbox(surface, y_start, y_end, line_height):
+    """Draw the email inbox list (the message preview is its own panel)"""
     # Panel header
     header_height = line_height + 4
     header_bg = MENU_BG if active_panel == "inbox" else GRAY
-    pygame.draw.rect(screen, header_bg, (0, y_start, LEFT_PANEL_WIDTH, header_height))
+    pygame.draw.rect(surface, header_bg, (0, y_start, LEFT_PANEL_WIDTH, header_height))
 
-    header_text = FONT.render("INBOX", True, GREEN)
-    screen.blit(header_text, (5, y_start + 2))
+    header_text = render_text(FONT, "INBOX", True, GREEN)
+    surface.blit(header_text, (5, y_start + 2))
 
     # Calculate split: top half for email list, bottom half for message preview
-    inbox_total_height = y_end - y_start - header_height - 5
-    email_list_height = inbox_total_height // 2
-    message_preview_height = inbox_total_height - email_list_height
+    separator_y = get_inbox_separator_y(y_start, y_end, line_height)
+    email_list_height = separator_y - (y_start + header_height + 5)
 
     # Email list (top half)
     y = y_start + header_height + 5
@@ -998,150 +2028,115 @@ def draw_email_inbox(y_start, y_end, line_height):
         if i == selected_email_index and active_panel == "inbox":
             # Highlight selected email
             pygame.draw.rect(
-                screen, SELECTION_BG, (2, y - 2, LEFT_PANEL_WIDTH - 4, line_height)
+                surface, SELECTION_BG, (2, y - 2, LEFT_PANEL_WIDTH - 4, line_height)
             )
 
         # Show read/unread status
         status = " " if email["read"] else "●"
-        status_text = FONT.render(status, True, GREEN)
-        screen.blit(status_text, (5, y))
+        status_text = render_text(FONT, status, True, GREEN)
+        surface.blit(status_text, (5, y))
 
         # Show subject (truncate if too long)
         max_subject_width = LEFT_PANEL_WIDTH - 25
-        subject = email["subject"]
-        if FONT.size(subject)[0] > max_subject_width:
-            while (
-                FONT.size(subject + "...")[0] > max_subject_width and len(subject) > 0
-            ):
-                subject = subject[:-1]
-            subject += "..."
+        subject = fit_text(FONT, email["subject"], max_subject_width)
 
-        subject_text = FONT.render(subject, True, GREEN)
-        screen.blit(subject_text, (15, y))
+        subject_text = render_text(FONT, subject, True, GREEN)
+        surface.blit(subject_text, (15, y))
 
         y += line_height
 
     # Separator line between email list and message preview
-    separator_y = y_start + header_height + 5 + email_list_height
     pygame.draw.line(
-        screen, GREEN, (0, separator_y), (LEFT_PANEL_WIDTH, separator_y), 1
+        surface, GREEN, (0, separator_y), (LEFT_PANEL_WIDTH, separator_y), 1
     )
 
-    # Message preview (bottom half)
-    draw_message_preview(separator_y + 2, y_end, line_height)
+
+def wrap_preview_line(line, max_width):
+    """Word-wrap one content line to max_width pixels; words too long to fit are cut with '...'"""
+    if FONT.size(line)[0] <= max_width:
+        return [line]
+    wrapped = []
+    current_line = ""
+    for word in line.split(" "):
+        test_line = current_line + (" " if current_line else "") + word
+        if FONT.size(test_line)[0] <= max_width:
+            current_line = test_line
+        else:
+            if current_line:
+                wrapped.append(current_line)
+            # If single word is too long, truncate it
+            current_line = fit_text(FONT, word, max_width, 1)
+    if current_line:
+        wrapped.append(current_line)
+    return wrapped
+
+
+def build_preview_layout(email, max_width, max_lines):
+    """Wrap and render an email's preview once: header lines, content lines, truncated flag"""
+    header = []
+    for label, min_length in (("From", 5), ("Date", 5), ("Subject", 8)):
+        header_line = fit_text(
+            FONT, f"{label}: {email[label.lower()]}", max_width, min_length
+        )
+        header.append(render_text(FONT, header_line, True, GREEN))
+
+    content_lines = email_store.get_body(email).split("\n")
+    lines = []
+    for content_line in content_lines:
+        if len(lines) >= max_lines:
+            break
+        lines.extend(wrap_preview_line(content_line, max_width))
+    truncated = len(lines) >= max_lines or len(content_lines) > len(lines)
+    del lines[max_lines:]
+
+    return {
+        "header": header,
+        "lines": [render_text(FONT, line, True, GREEN) for line in lines],
+        "truncated": truncated,
+    }
+
+
+def get_preview_layout(email, max_width, max_lines):
+    """Return the cached preview layout for an email, building it on first use"""
+    key = (email["id"], max_width, max_lines, FONT)
+    layout = preview_layout_cache.get(key)
+    if layout is None:
+        layout = build_preview_layout(email, max_width, max_lines)
+        preview_layout_cache[key] = layout
+        while len(preview_layout_cache) > PREVIEW_LAYOUT_CACHE_SIZE:
+            preview_layout_cache.popitem(last=False)
+    else:
+        preview_layout_cache.move_to_end(key)
+    return layout
 
 
-def draw_message_preview(y_start, y_end, line_height):
+def draw_message_preview(surface, y_start, y_end, line_height):
     """Draw the selected message content preview"""
     if selected_email_index < len(emails):
         email = emails[selected_email_index]
 
-        # Message header
+        # Header takes three lines plus a gap; reserve space for the
+        # "ENTER for full message" hint below the content
         preview_y = y_start + 5
-
-        # From line (truncate if too long)
-        from_line = f"From: {email['from']}"
-        max_preview_width = LEFT_PANEL_WIDTH - 15
-        if FONT.size(from_line)[0] > max_preview_width:
-            while (
-                FONT.size(from_line + "...")[0] > max_preview_width
-                and len(from_line) > 5
-            ):
-                from_line = from_line[:-1]
-            from_line += "..."
-        from_text = FONT.render(from_line, True, GREEN)
-        screen.blit(from_text, (5, preview_y))
-        preview_y += line_height
-
-        # Date line (truncate if too long)
-        date_line = f"Date: {email['date']}"
-        if FONT.size(date_line)[0] > max_preview_width:
-            while (
-                FONT.size(date_line + "...")[0] > max_preview_width
-                and len(date_line) > 5
-            ):
-                date_line = date_line[:-1]
-            date_line += "..."
-        date_text = FONT.render(date_line, True, GREEN)
-        screen.blit(date_text, (5, preview_y))
-        preview_y += line_height
-
-        # Subject line (truncate if too long)
-        subject_line = f"Subject: {email['subject']}"
-        if FONT.size(subject_line)[0] > max_preview_width:
-            while (
-                FONT.size(subject_line + "...")[0] > max_preview_width
-                and len(subject_line) > 8
-            ):
-                subject_line = subject_line[:-1]
-            subject_line += "..."
-        subject_text = FONT.render(subject_line, True, GREEN)
-        screen.blit(subject_text, (5, preview_y))
-        preview_y += line_height + 5
-
-        # Message content (wrap and truncate to fit) - reserve space for hint
-        hint_space = (
-            line_height + 10
-        )  # Reserve space for the "ENTER for full message" hint
-        available_height = y_end - preview_y - hint_space
+        content_y = preview_y + 3 * line_height + 5
+        hint_space = line_height + 10
+        available_height = y_end - content_y - hint_space
         max_lines = max(1, available_height // line_height)  # Ensure at least 1 line
+        layout = get_preview_layout(email, LEFT_PANEL_WIDTH - 15, max_lines)
 
-        content_lines = email["content"].split("\n")
-        lines_shown = 0
-
-        for content_line in content_lines:
-            if lines_shown >= max_lines:
-                break
-
-            # Word wrap long lines - constrain to panel width
-            max_content_width = LEFT_PANEL_WIDTH - 15
+        for header_surface in layout["header"]:
+            surface.blit(header_surface, (5, preview_y))
+            preview_y += line_height
+        preview_y += 5
 
-            # Check if line fits within panel width
-            if FONT.size(content_line)[0] <= max_content_width:
-                # Line fits as-is
-                line_text = FONT.render(content_line, True, GREEN)
-                screen.blit(line_text, (5, preview_y))
-                preview_y += line_height
-                lines_shown += 1
-            else:
-                # Wrap line by pixels, not characters
-                words = content_line.split(" ")
-                current_line = ""
-
-                for word in words:
-                    test_line = current_line + (" " if current_line else "") + word
-                    if FONT.size(test_line)[0] <= max_content_width:
-                        current_line = test_line
-                    else:
-                        # Output current line and start new one
-                        if current_line:
-                            line_text = FONT.render(current_line, True, GREEN)
-                            screen.blit(line_text, (5, preview_y))
-                            preview_y += line_height
-                            lines_shown += 1
-                            if lines_shown >= max_lines:
-                                break
-                        current_line = word
-
-                        # If single word is too long, truncate it
-                        if FONT.size(current_line)[0] > max_content_width:
-                            while (
-                                FONT.size(current_line + "...")[0] > max_content_width
-                                and len(current_line) > 1
-                            ):
-                                current_line = current_line[:-1]
-                            current_line += "..."
-
-                # Output final line if any
-                if current_line and lines_shown < max_lines:
-                    line_text = FONT.render(current_line, True, GREEN)
-                    screen.blit(line_text, (5, preview_y))
-                    lines_shown += 1
+        for line_surface in layout["lines"]:
+            surface.blit(line_surface, (5, preview_y))
+            preview_y += line_height
 
         # Show "Press ENTER for full message" hint if message was truncated
-        if lines_shown >= max_lines or len(content_lines) > lines_shown:
+        if layout["truncated"]:
             hint_y = y_end - line_height - 5
-            hint_text = FONT.render("[ENTER for full message]", True, GREEN)
+            hint_text = render_text(FONT, "[ENTER for full message]", True, GREEN)
 
             # Draw black background behind the hint to ensure visibility
             hint_rect = hint_text.get_rect()
@@ -1151,21 +2146,28 @@ def draw_message_preview(y_start, y_end, line_height):
                 hint_rect.width + 4, LEFT_PANEL_WIDTH - 10
             )  # Add padding, respect panel bounds
             hint_rect.height = hint_rect.height + 2  # Add padding
-            pygame.draw.rect(screen, BLACK, hint_rect)
+            pygame.draw.rect(surface, BLACK, hint_rect)
+
+            surface.blit(hint_text, (5, hint_y))
 
-            screen.blit(hint_text, (5, hint_y))
 
+def get_file_status_suffix():
+    """Suffix shown after the current file name in the editor header and status bar"""
+    if large_file is not None:
+        return " (LOADING)"
+    return " (READ-ONLY)" if file_read_only else ""
 
-def draw_text_editor(x_start, y_start, width, height, line_height):
-    """Draw the text editor panel with scrolling support"""
+
+def draw_text_editor(surface, x_start, y_start, width, height, line_height):
+    """Draw the text editor panel with scrolling support (the cursor is an overlay)"""
     # Panel header
     header_height = line_height + 4
     header_bg = MENU_BG if active_panel == "editor" else GRAY
-    pygame.draw.rect(screen, header_bg, (x_start, y_start, width, header_height))
+    pygame.draw.rect(surface, header_bg, (x_start, y_start, width, header_height))
 
-    readonly_status = " (READ-ONLY)" if file_read_only else ""
-    header_text = FONT.render(f"EDITOR - {current_file}{readonly_status}", True, GREEN)
-    screen.blit(header_text, (x_start + 5, y_start + 2))
+    readonly_status = get_file_status_suffix()
+    header_text = render_text(FONT, f"EDITOR - {current_file}{readonly_status}", True, GREEN)
+    surface.blit(header_text, (x_start + 5, y_start + 2))
 
     # Text area (reserve space for status bar)
     text_y_start = y_start + header_height + 5
@@ -1184,8 +2186,14 @@ def draw_text_editor(x_start, y_start, width, height, line_height):
         else None
     )
 
-    for display_y, buffer_y in enumerate(range(start_line, end_line)):
-        line = text_buffer[buffer_y]
+    # Fetch the visible lines with a single rope traversal
+    visible_lines = text_buffer[start_line:end_line]
+    if current_file.endswith(".sv"):
+        visible_spans = editor_highlighter.highlight(text_buffer, start_line, end_line)
+    else:
+        visible_spans = [((0, len(line), "text"),) for line in visible_lines]
+    for display_y, line in enumerate(visible_lines):
+        buffer_y = start_line + display_y
         line_y = text_y_start + display_y * line_height
 
         # Draw selection background if this line is selected
@@ -1193,58 +2201,30 @@ def draw_text_editor(x_start, y_start, width, height, line_height):
             start_x, start_y, end_x, end_y = bounds
             if start_y <= buffer_y <= end_y:
                 # Calculate selection bounds for this line
-                if buffer_y == start_y and buffer_y == end_y:
-                    sel_start = (
-                        text_x_margin + FONT.size(line[:start_x])[0]
-                        if line
-                        else text_x_margin
-                    )
-                    sel_end = (
-                        text_x_margin + FONT.size(line[:end_x])[0]
-                        if line
-                        else text_x_margin
-                    )
-                elif buffer_y == start_y:
-                    sel_start = (
-                        text_x_margin + FONT.size(line[:start_x])[0]
-                        if line
-                        else text_x_margin
-                    )
-                    sel_end = (
-                        text_x_margin + FONT.size(line)[0] if line else text_x_margin
-                    )
-                elif buffer_y == end_y:
-                    sel_start = text_x_margin
-                    sel_end = (
-                        text_x_margin + FONT.size(line[:end_x])[0]
-                        if line
-                        else text_x_margin
-                    )
-                else:
-                    sel_start = text_x_margin
-                    sel_end = (
-                        text_x_margin + FONT.size(line)[0] if line else text_x_margin
-                    )
+                sel_start = text_x_margin
+                if buffer_y == start_y:
+                    sel_start += EDITOR_METRICS.column_x(line, start_x)
+                sel_end = text_x_margin + EDITOR_METRICS.column_x(
+                    line, end_x if buffer_y == end_y else len(line)
+                )
 
                 sel_width = max(10, sel_end - sel_start)
                 pygame.draw.rect(
-                    screen, SELECTION_BG, (sel_start, line_y, sel_width, line_height)
+                    surface, SELECTION_BG, (sel_start, line_y, sel_width, line_height)
                 )
 
-        # Draw text
-        text = FONT.render(line, True, GREEN)
-        screen.blit(text, (text_x_margin, line_y))
+        # Draw text as one cached surface per colored run
+        for run_start, run_end, kind in visible_spans[display_y]:
+            text = render_text(FONT, line[run_start:run_end], True, SYNTAX_COLORS[kind])
+            run_x = text_x_margin + EDITOR_METRICS.column_x(line, run_start)
+            surface.blit(text, (run_x, line_y))
     
     # Draw scroll indicators if there's more content than visible
     if len(text_buffer) > max_lines:
-        draw_editor_scroll_indicators(x_start, y_start, width, height, header_height, max_lines)
+        draw_editor_scroll_indicators(surface, x_start, y_start, width, height, header_height, max_lines)
 
-    # Draw cursor (only if editor is active)
-    if active_panel == "editor":
-        draw_cursor(text_x_margin, text_y_start, line_height)
 
-
-def draw_editor_scroll_indicators(x_start, y_start, width, height, header_height, max_visible_lines):
+def draw_editor_scroll_indicators(surface, x_start, y_start, width, height, header_height, max_visible_lines):
     """Draw scroll indicators for the text editor"""
     # Scroll bar area (right side of editor, above status bar)
     scroll_bar_x = x_start + width - 20
@@ -1253,7 +2233,7 @@ def draw_editor_scroll_indicators(x_start, y_start, width, height, header_height
     scroll_bar_height = height - header_height - 10 - STATUS_BAR_HEIGHT
     
     # Draw scroll bar background
-    pygame.draw.rect(screen, GRAY, (scroll_bar_x, scroll_bar_y, scroll_bar_width, scroll_bar_height))
+    pygame.draw.rect(surface, GRAY, (scroll_bar_x, scroll_bar_y, scroll_bar_width, scroll_bar_height))
     
     # Calculate scroll thumb position and size
     total_lines = len(text_buffer)
@@ -1266,28 +2246,32 @@ def draw_editor_scroll_indicators(x_start, y_start, width, height, header_height
             thumb_y = scroll_bar_y + scroll_bar_height - thumb_height
         
         # Draw scroll thumb
-        pygame.draw.rect(screen, GREEN, (scroll_bar_x, thumb_y, scroll_bar_width, thumb_height))
+        pygame.draw.rect(surface, GREEN, (scroll_bar_x, thumb_y, scroll_bar_width, thumb_height))
 
 
-def draw_status_bar():
-    """Draw the status bar at the bottom of the screen"""
-    status_y = HEIGHT - STATUS_BAR_HEIGHT
+def draw_status_bar(surface):
+    """Draw the status bar onto its panel surface"""
+    status_y = 0
     
     # Draw status bar background
-    pygame.draw.rect(screen, MENU_BG, (0, status_y, WIDTH, STATUS_BAR_HEIGHT))
-    pygame.draw.line(screen, GREEN, (0, status_y), (WIDTH, status_y), 1)  # Top border
+    pygame.draw.rect(surface, MENU_BG, (0, status_y, WIDTH, STATUS_BAR_HEIGHT))
+    pygame.draw.line(surface, GREEN, (0, status_y), (WIDTH, status_y), 1)  # Top border
     
     # Left side: File info
-    readonly_status = " (READ-ONLY)" if file_read_only else ""
+    readonly_status = get_file_status_suffix()
     file_info = f"File: {current_file}{readonly_status}"
-    file_surface = FONT.render(file_info, True, GREEN)
-    screen.blit(file_surface, (10, status_y + 4))
+    if save_status:
+        file_info += f" [{save_status}]"
+    if verification_status:
+        file_info += f" [{verification_status}]"
+    file_surface = render_text(FONT, file_info, True, GREEN)
+    surface.blit(file_surface, (10, status_y + 4))
     
     # Center: Panel info
     panel_info = f"Panel: {active_panel.title()}"
-    panel_surface = FONT.render(panel_info, True, GREEN)
+    panel_surface = render_text(FONT, panel_info, True, GREEN)
     panel_x = (WIDTH - panel_surface.get_width()) // 2
-    screen.blit(panel_surface, (panel_x, status_y + 4))
+    surface.blit(panel_surface, (panel_x, status_y + 4))
     
     # Right side: Editor scroll info (only if editor is active and has scrollable content)
     if active_panel == "editor" and len(text_buffer) > get_editor_max_visible_lines():
@@ -1298,118 +2282,159 @@ def draw_status_bar():
         visible_end = min(editor_scroll_offset + max_visible, total_lines)
         
         scroll_info = f"Line {current_line}/{total_lines} | View {visible_start}-{visible_end}"
-        scroll_surface = FONT.render(scroll_info, True, GREEN)
+        scroll_surface = render_text(FONT, scroll_info, True, GREEN)
         scroll_x = WIDTH - scroll_surface.get_width() - 10
-        screen.blit(scroll_surface, (scroll_x, status_y + 4))
+        surface.blit(scroll_surface, (scroll_x, status_y + 4))
     elif active_panel == "editor":
         # Show simple line info when not scrollable
         current_line = cursor_y + 1
         total_lines = len(text_buffer)
         line_info = f"Line {current_line}/{total_lines}"
-        line_surface = FONT.render(line_info, True, GREEN)
+        line_surface = render_text(FONT, line_info, True, GREEN)
         line_x = WIDTH - line_surface.get_width() - 10
-        screen.blit(line_surface, (line_x, status_y + 4))
+        surface.blit(line_surface, (line_x, status_y + 4))
+
+
+def bake_animation(name, cycle_ms, steps, render_frame):
+    """Pre-render a looping animation; render_frame(phase) draws phase 0.0-1.0"""
+    animations[name] = {
+        "cycle_ms": cycle_ms,
+        "frames": [render_frame(step / steps) for step in range(steps)],
+    }
+
+
+def get_animation_frame(name, elapsed_ms):
+    """Return the baked frame of an animation for a time into its cycle"""
+    animation = animations[name]
+    frames = animation["frames"]
+    cycle_ms = animation["cycle_ms"]
+    return frames[int(elapsed_ms % cycle_ms * len(frames) // cycle_ms)]
+
+
+def get_cursor_fade_opacity(phase):
+    """Cursor opacity at a point in the fade cycle (1.0 -> 0.05 -> 1.0)"""
+    if phase <= 0.5:
+        # First half: fade out with a cosine ease
+        eased_progress = (1 - math.cos(phase * 2 * math.pi)) / 2
+        opacity = 1.0 - (eased_progress * 0.95)
+    else:
+        # Second half: fade back in
+        eased_progress = (1 - math.cos((phase - 0.5) * 2 * math.pi)) / 2
+        opacity = 0.05 + (eased_progress * 0.95)
+    return max(0.05, min(opacity, 1.0))
+
+
+def render_cursor_frame(phase):
+    """Render the cursor outline and its glow at one point of the fade cycle"""
+    opacity = get_cursor_fade_opacity(phase)
+    cursor_width = max(2, font_size // 9) * 5
+    frame = pygame.Surface((cursor_width + 2, font_size + 2))
+    frame.fill(COLORKEY)
+    frame.set_colorkey(COLORKEY)
+
+    # Slightly larger, dimmer outline behind the cursor for a glow, only
+    # while the cursor is relatively bright
+    if opacity > 0.3:
+        glow_opacity = opacity * 0.3  # Glow is 30% of main cursor opacity
+        glow_color = tuple(int(channel * glow_opacity) for channel in GREEN)
+        pygame.draw.rect(frame, glow_color, (0, 0, cursor_width + 2, font_size + 2), 1)
+
+    faded_color = tuple(int(channel * opacity) for channel in GREEN)
+    pygame.draw.rect(frame, faded_color, (1, 1, cursor_width, font_size), 1)
+    return frame
+
+
+def bake_cursor_animation():
+    """(Re)build the cursor fade frames for the current font size"""
+    bake_animation("cursor", CURSOR_FADE_CYCLE_MS, CURSOR_FADE_STEPS, render_cursor_frame)
+
+
+def get_editor_position_at(screen_x, screen_y):
+    """Map a screen pixel to the nearest (column, line) in the text buffer.
+
+    Returns None outside the editor's text area. Intended for mouse support.
+    """
+    editor_rect = panels["editor"]["rect"] if panels else None
+    if editor_rect is None or not editor_rect.collidepoint(screen_x, screen_y):
+        return None
+    line_height = font_size + 4
+    text_y_start = editor_rect.y + line_height + 4 + 5
+    if screen_y < text_y_start:
+        return None
+    row = editor_scroll_offset + (screen_y - text_y_start) // line_height
+    row = min(row, len(text_buffer) - 1)
+    column = EDITOR_METRICS.column_at_x(text_buffer[row], screen_x - (editor_rect.x + 10))
+    return column, row
 
 
 def draw_cursor(text_x_margin, text_y_start, line_height):
-    """Draw the text cursor with CRT-style fade effect"""
+    """Draw the text cursor with CRT-style fade effect directly on the screen.
+
+    Returns the screen rect it covered (None if not drawn) so the compositor
+    can restore that area next frame.
+    """
     global cursor_timer
     
     if cursor_y >= len(text_buffer):
-        return
+        return None
     
     # Check if cursor is in visible area
     max_visible_lines = get_editor_max_visible_lines()
     if cursor_y < editor_scroll_offset or cursor_y >= editor_scroll_offset + max_visible_lines:
-        return  # Cursor is not visible, don't draw it
+        return None  # Cursor is not visible, don't draw it
         
-    # Update cursor timer
-    cursor_timer += clock.get_time()
-    
-    # Full fade cycle: 1200ms for slower, more CRT-like timing
-    fade_cycle_duration = 1200
-    fade_duration = 600  # Time for fade out or fade in
+    # Update cursor timer (hold the cursor solid while the fade is paused)
+    if is_cursor_animating():
+        cursor_timer += clock.get_time()
+    else:
+        cursor_timer = 0
     
     # Reset timer after full cycle
-    if cursor_timer >= fade_cycle_duration:
+    if cursor_timer >= CURSOR_FADE_CYCLE_MS:
         cursor_timer = 0
-    
+
     # Calculate cursor position (adjusted for scroll)
-    cx = text_x_margin + FONT.size(text_buffer[cursor_y][:cursor_x])[0]
+    cx = text_x_margin + EDITOR_METRICS.column_x(text_buffer[cursor_y], cursor_x)
     cy = text_y_start + (cursor_y - editor_scroll_offset) * line_height
-    cursor_width = max(2, font_size // 9)
-    
-    # Calculate fade opacity with smoother easing
-    if cursor_timer <= fade_duration:
-        # First half: fade out (1.0 -> 0.05) with ease-in
-        progress = cursor_timer / fade_duration
-        # Use sine wave for smoother transition
-        eased_progress = (1 - __import__('math').cos(progress * __import__('math').pi)) / 2
-        opacity = 1.0 - (eased_progress * 0.95)  # Fade from 1.0 to 0.05
-    else:
-        # Second half: fade in (0.05 -> 1.0) with ease-out
-        progress = (cursor_timer - fade_duration) / fade_duration
-        # Use sine wave for smoother transition
-        eased_progress = (1 - __import__('math').cos(progress * __import__('math').pi)) / 2
-        opacity = 0.05 + (eased_progress * 0.95)  # Fade from 0.05 to 1.0
-    
-    # Ensure opacity stays in valid range
-    opacity = max(0.05, min(opacity, 1.0))
-    
-    # Calculate faded color
-    faded_color = (
-        int(GREEN[0] * opacity),
-        int(GREEN[1] * opacity),
-        int(GREEN[2] * opacity),
-    )
-    
-    # Draw cursor with faded color and slight glow effect
-    # Draw a slightly larger, more transparent cursor behind for glow
-    if opacity > 0.3:  # Only add glow when cursor is relatively bright
-        glow_opacity = opacity * 0.3  # Glow is 30% of main cursor opacity
-        glow_color = (
-            int(GREEN[0] * glow_opacity),
-            int(GREEN[1] * glow_opacity),
-            int(GREEN[2] * glow_opacity),
-        )
-        # Draw glow (larger, more transparent)
-        pygame.draw.rect(screen, glow_color, (cx - 1, cy - 1, cursor_width * 5 + 2, font_size + 2), 1)
-    
-    # Draw main cursor
-    pygame.draw.rect(screen, faded_color, (cx, cy, cursor_width * 5, font_size), 1)
 
+    if "cursor" not in animations:
+        bake_cursor_animation()
+    frame = get_animation_frame("cursor", cursor_timer)
+    screen.blit(frame, (cx - 1, cy - 1))
 
-def draw_email_modal():
-    """Draw the full email modal dialog with scrolling support"""
+    # Area covered by cursor and glow
+    return frame.get_rect(topleft=(cx - 1, cy - 1))
+
+
+def draw_email_modal(surface):
+    """Draw the full email modal dialog with scrolling support onto its panel surface"""
     if not show_email_modal or not email_modal_content_lines:
         return
 
-    # Modal dimensions (80% of screen)
-    modal_width = int(WIDTH * 0.8)
-    modal_height = int(HEIGHT * 0.8)
-    modal_x = (WIDTH - modal_width) // 2
-    modal_y = (HEIGHT - modal_height) // 2
+    # Modal dimensions (80% of screen), drawn at the panel's origin
+    modal_width, modal_height = surface.get_size()
+    modal_x, modal_y = 0, 0
 
     # Draw modal background with border
-    pygame.draw.rect(screen, BLACK, (modal_x, modal_y, modal_width, modal_height))
-    pygame.draw.rect(screen, GREEN, (modal_x, modal_y, modal_width, modal_height), 2)
+    pygame.draw.rect(surface, BLACK, (modal_x, modal_y, modal_width, modal_height))
+    pygame.draw.rect(surface, GREEN, (modal_x, modal_y, modal_width, modal_height), 2)
 
     # Draw modal header
     header_height = font_size + 10
-    pygame.draw.rect(screen, MENU_BG, (modal_x, modal_y, modal_width, header_height))
+    pygame.draw.rect(surface, MENU_BG, (modal_x, modal_y, modal_width, header_height))
 
-    header_text = "EMAIL MESSAGE - UP/DOWN or PgUp/PgDn to scroll, HOME/END to jump, any key to close"
-    header_surface = FONT.render(header_text, True, GREEN)
+    header_text = (
+        f"{email_modal_title} - UP/DOWN or PgUp/PgDn to scroll, HOME/END to jump, any key to close"
+    )
+    header_surface = render_text(FONT, header_text, True, GREEN)
     header_x = modal_x + (modal_width - header_surface.get_width()) // 2
-    screen.blit(header_surface, (header_x, modal_y + 5))
+    surface.blit(header_surface, (header_x, modal_y + 5))
 
     # Draw scrolling content
     content_y = modal_y + header_height + 10
     content_x = modal_x + 20
 
-    modal_font = pygame.font.Font(
-        pygame.font.match_font("couriernew"), max(14, int(font_size * 0.8))
-    )
+    modal_font = SMALL_FONT
     line_height = font_size + 2
 
     # Render visible lines based on scroll offset
@@ -1420,8 +2445,8 @@ def draw_email_modal():
 
     for i in range(start_line, end_line):
         line = email_modal_content_lines[i]
-        line_surface = modal_font.render(line, True, GREEN)
-        screen.blit(line_surface, (content_x, content_y))
+        line_surface = render_text(modal_font, line, True, GREEN)
+        surface.blit(line_surface, (content_x, content_y))
         content_y += line_height
 
     # Draw scroll indicators if content is scrollable
@@ -1433,7 +2458,7 @@ def draw_email_modal():
 
         # Scroll bar background
         pygame.draw.rect(
-            screen,
+            surface,
             GRAY,
             (scroll_indicator_x, scroll_indicator_y, 10, scroll_indicator_height),
         )
@@ -1447,18 +2472,18 @@ def draw_email_modal():
         thumb_y = scroll_indicator_y + int(
             scroll_indicator_height * email_modal_scroll_offset / total_lines
         )
-        pygame.draw.rect(screen, GREEN, (scroll_indicator_x, thumb_y, 10, thumb_height))
+        pygame.draw.rect(surface, GREEN, (scroll_indicator_x, thumb_y, 10, thumb_height))
 
         # Show scroll hints
         if email_modal_scroll_offset > 0:
-            up_hint = modal_font.render("↑ UP", True, GREEN)
-            screen.blit(
+            up_hint = render_text(modal_font, "↑ UP", True, GREEN)
+            surface.blit(
                 up_hint, (modal_x + modal_width - 60, modal_y + header_height + 5)
             )
 
         if email_modal_scroll_offset < total_lines - email_modal_max_visible_lines:
-            down_hint = modal_font.render("↓ DOWN", True, GREEN)
-            screen.blit(
+            down_hint = render_text(modal_font, "↓ DOWN", True, GREEN)
+            surface.blit(
                 down_hint, (modal_x + modal_width - 70, modal_y + modal_height - 25)
             )
 
@@ -1467,10 +2492,9 @@ def handle_text_input(event):
     global cursor_x, cursor_y, file_read_only
     line = text_buffer[cursor_y]
 
-    # Get modifier keys
-    keys = pygame.key.get_pressed()
-    shift_pressed = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
-    ctrl_pressed = keys[pygame.K_LCTRL] or keys[pygame.K_RCTRL]
+    # Modifiers come from the event so replayed and repeated keys keep theirs
+    shift_pressed = bool(event.mod & pygame.KMOD_SHIFT)
+    ctrl_pressed = bool(event.mod & pygame.KMOD_CTRL)
 
     # Handle clipboard shortcuts first
     if ctrl_pressed:
@@ -1489,6 +2513,16 @@ def handle_text_input(event):
                 return
             paste_from_clipboard()
             return
+        elif event.key == pygame.K_z:
+            # Ctrl+Shift+Z also redoes
+            if shift_pressed:
+                redo()
+            else:
+                undo()
+            return
+        elif event.key == pygame.K_y:
+            redo()
+            return
         elif event.key == pygame.K_a:
             # Select all
             if text_buffer:
@@ -1505,18 +2539,38 @@ def handle_text_input(event):
 
     # Store old cursor position for selection update
     old_cursor_x, old_cursor_y = cursor_x, cursor_y
+    edited = False  # Only edits, not cursor moves, change text_buffer
 
     if event.key == pygame.K_BACKSPACE:
         if file_read_only:
             print(f"Cannot edit: {current_file} is read-only")
             return
+        edited = selection_active or cursor_x > 0 or cursor_y > 0
         if selection_active:
             delete_selected_text()
         elif cursor_x > 0:
+            undo_history.record(
+                "delete",
+                cursor_x - 1,
+                cursor_y,
+                line[cursor_x - 1],
+                "",
+                (cursor_x, cursor_y),
+                (cursor_x - 1, cursor_y),
+            )
             text_buffer[cursor_y] = line[: cursor_x - 1] + line[cursor_x:]
             cursor_x -= 1
         elif cursor_y > 0:
             prev_len = len(text_buffer[cursor_y - 1])
+            undo_history.record(
+                "delete",
+                prev_len,
+                cursor_y - 1,
+                "\n",
+                "",
+                (cursor_x, cursor_y),
+                (prev_len, cursor_y - 1),
+            )
             text_buffer[cursor_y - 1] += line
             text_buffer.pop(cursor_y)
             cursor_y -= 1
@@ -1525,24 +2579,56 @@ def handle_text_input(event):
         if file_read_only:
             print(f"Cannot edit: {current_file} is read-only")
             return
+        edited = selection_active or cursor_x < len(line) or cursor_y < len(text_buffer) - 1
         if selection_active:
             delete_selected_text()
         elif cursor_x < len(line):
+            undo_history.record(
+                "delete",
+                cursor_x,
+                cursor_y,
+                line[cursor_x],
+                "",
+                (cursor_x, cursor_y),
+                (cursor_x, cursor_y),
+            )
             text_buffer[cursor_y] = line[:cursor_x] + line[cursor_x + 1 :]
         elif cursor_y < len(text_buffer) - 1:
+            undo_history.record(
+                "delete",
+                cursor_x,
+                cursor_y,
+                "\n",
+                "",
+                (cursor_x, cursor_y),
+                (cursor_x, cursor_y),
+            )
             text_buffer[cursor_y] += text_buffer[cursor_y + 1]
             text_buffer.pop(cursor_y + 1)
     elif event.key == pygame.K_RETURN:
         if file_read_only:
             print(f"Cannot edit: {current_file} is read-only")
             return
+        cursor_before = (cursor_x, cursor_y)
+        removed = ""
         if selection_active:
-            delete_selected_text()
+            removed = get_selected_text()
+            delete_selected_text(record_undo=False)
             line = text_buffer[cursor_y]
+        undo_history.record(
+            "newline",
+            cursor_x,
+            cursor_y,
+            removed,
+            "\n",
+            cursor_before,
+            (0, cursor_y + 1),
+        )
         text_buffer.insert(cursor_y + 1, line[cursor_x:])
         text_buffer[cursor_y] = line[:cursor_x]
         cursor_y += 1
         cursor_x = 0
+        edited = True
     elif event.key == pygame.K_LEFT:
         if cursor_x > 0:
             cursor_x -= 1
@@ -1583,11 +2669,29 @@ def handle_text_input(event):
         if file_read_only:
             print(f"Cannot edit: {current_file} is read-only")
             return
+        cursor_before = (cursor_x, cursor_y)
+        removed = ""
         if selection_active:
-            delete_selected_text()
+            removed = get_selected_text()
+            delete_selected_text(record_undo=False)
             line = text_buffer[cursor_y]
+        # Consecutive typed characters coalesce into one undo record
+        undo_history.record(
+            "type",
+            cursor_x,
+            cursor_y,
+            removed,
+            event.unicode,
+            cursor_before,
+            (cursor_x + 1, cursor_y),
+        )
         text_buffer[cursor_y] = line[:cursor_x] + event.unicode + line[cursor_x:]
         cursor_x += 1
+        edited = True
+
+    # Moving the cursor ends the current run of typing for undo purposes
+    if event.key in NAVIGATION_KEYS:
+        undo_history.seal()
 
     # Update selection if Shift is pressed
     if shift_pressed and selection_active:
@@ -1596,7 +2700,13 @@ def handle_text_input(event):
         # Clear selection if Shift is not pressed and cursor moved
         if (cursor_x != old_cursor_x or cursor_y != old_cursor_y) and selection_active:
             clear_selection()
-    
+
+    # Edits modify text_buffer in place; bump the version so the editor redraws.
+    # A plain cursor move only moves the caret overlay (and the selection, which
+    # is part of the editor panel's inputs).
+    if edited:
+        mark_buffer_changed()
+
     # Ensure cursor is visible after any movement
     if cursor_x != old_cursor_x or cursor_y != old_cursor_y:
         ensure_cursor_visible()
@@ -1643,9 +2753,8 @@ def process_key_event(event):
                 return
 
         # Check for Alt+F4 or Escape to exit
-        keys = pygame.key.get_pressed()
         if (
-            event.key == pygame.K_F4 and keys[pygame.K_LALT]
+            event.key == pygame.K_F4 and event.mod & pygame.KMOD_ALT
         ) or event.key == pygame.K_ESCAPE:
             running = False
         elif event.key >= pygame.K_F1 and event.key <= pygame.K_F12:
@@ -1679,21 +2788,36 @@ def process_key_event(event):
 
 def main():
     global boot_index, boot_done, boot_timer, active_menu, running
+    global last_input_time, next_frame_time
     running = True
+    init_app()
 
-    # Initialize workspace and try to load current level file
+    # Initialize workspace and reopen the last file, else the current level file
     ensure_workspace_dir()
-    if not load_file():  # Try to load the current level file
+    last_file = progress_store.get_setting("last_file")
+    if last_file and os.path.exists(os.path.join("workspace", last_file)):
+        load_file_by_name(last_file)
+    elif not load_file():  # Try to load the current level file
         # If file doesn't exist, create it with default content
         print(f"Creating new file: {current_file}")
+    scan_workspace_files()
+    start_workspace_watcher()
+    app.timer.mark("workspace")
+    startup_reported = False
     while running:
-        dt = clock.tick(30) / 1000.0
+        # Sleep until input or the next animation/key-repeat deadline
+        events = wait_for_events()
+        dt = clock.tick() / 1000.0
 
         # Process regular events
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                # The window contents were lost; repaint everything
+                mark_all_panels_dirty()
             elif event.type == pygame.KEYDOWN:
+                last_input_time = pygame.time.get_ticks()
                 # Handle the key press and start tracking for repeats
                 processed_event = handle_key_press(event.key, event)
                 process_key_event(processed_event)
@@ -1715,14 +2839,24 @@ def main():
             elif boot_index >= len(boot_lines):
                 pygame.time.wait(500)
                 boot_done = True
+                last_input_time = pygame.time.get_ticks()  # Fade the cursor for a while
             draw_boot_screen()
         else:
-            # Update file list and load emails on first run
-            scan_workspace_files()
-            if not emails:  # Load emails only once
-                load_emails_for_level(current_level)
+            update_workspace()
             draw_workspace()
 
+        if not startup_reported:
+            app.timer.mark("first frame")
+            print(app.timer.report())
+            startup_reported = True
+
+        next_frame_time = pygame.time.get_ticks() + get_frame_interval()
+
+    stop_workspace_watcher()
+    stop_save_worker()
+    stop_verification_worker()
+    stop_vector_pool()
+    progress_store.close()
     pygame.quit()
     sys.exit()
 
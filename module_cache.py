@@ -0,0 +1,298 @@
+"""Content-hash cache of parsed and flattened SystemVerilog modules.
+
+Every .sv file is identified by the SHA-256 of its contents, so a file is
+parsed once per distinct version no matter how often it is loaded. Each
+module then gets a design key: a hash of its own file hash plus the design
+keys of every module it instantiates. Editing a gate therefore changes the
+key of everything built on top of it, which is all the invalidation the
+cache needs - stale entries are simply never looked up again.
+
+Parsed files and designs (flattened netlist, NAND count, truth table) are
+kept in memory and pickled to a cache directory so a restart starts warm.
+So are compiled kernels (netlist_compiler.py), keyed by design key and
+Python version.
+
+Since stale entries are never looked up again, nothing ever invalidates
+them either: both caches are bounded instead. The in-memory dicts drop
+their least recently used entries, and prune_disk() (run at startup) deletes
+pickles from older CACHE_VERSIONs, then pickles unused for MAX_DISK_AGE_DAYS,
+then the least recently used ones until the directory fits MAX_DISK_BYTES.
+A disk hit touches the pickle's mtime, so mtime is its last use.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from netlist_compiler import CODE_TAG, compile_netlist
+from simulator import (
+    MAX_TRUTH_TABLE_INPUTS,
+    evaluate_truth_table,
+    flatten,
+    is_level_file,
+    parse_source,
+)
+
+CACHE_VERSION = 2  # Bump when Module/Netlist/TruthTable change shape
+DEFAULT_CACHE_DIR = ".bitworks_cache"
+MAX_MEMORY_DESIGNS = 256  # Designs kept in memory (least recently used dropped)
+MAX_MEMORY_PARSED = 1024  # Parsed file versions kept in memory
+MAX_DISK_BYTES = 256 * 1024 * 1024  # Pickles kept on disk (least recently used deleted)
+MAX_DISK_AGE_DAYS = 30  # Pickles unused for longer are deleted
+
+
+def hash_source(text):
+    """SHA-256 hex digest of a source file's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CachedDesign:
+    """A flattened module, its NAND count and (once computed) its truth table"""
+
+    __slots__ = ("key", "netlist", "nand_count", "truth_table")
+
+    def __init__(self, key, netlist, truth_table=None):
+        self.key = key
+        self.netlist = netlist
+        self.nand_count = netlist.nand_count
+        self.truth_table = truth_table
+
+
+class ModuleCache:
+    """Parsed files keyed by content hash, designs keyed by dependency hash"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.lock = threading.RLock()
+        self.file_hashes = {}  # path -> ((mtime_ns, size), sha) so unchanged files aren't re-read
+        self.parsed = OrderedDict()  # sha -> [Module]
+        self.designs = OrderedDict()  # design key -> CachedDesign
+        self.kernels = OrderedDict()  # design key -> CompiledKernel of its outputs
+        self.parse_count = 0  # Files actually parsed (cache misses)
+        self.flatten_count = 0  # Designs actually flattened (cache misses)
+        self.compile_count = 0  # Kernels actually compiled (cache misses)
+
+    # -- disk ------------------------------------------------------------
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, f"v{CACHE_VERSION}", kind, f"{key}.pickle")
+
+    def _load(self, kind, key):
+        path = self._path(kind, key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, AttributeError, ImportError):
+            return None  # Missing or unreadable entries are just misses
+        try:
+            os.utime(path)  # Mark it recently used for prune_disk
+        except OSError:
+            pass
+        return value
+
+    def _store(self, kind, key, value):
+        path = self._path(kind, key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError:
+            pass  # The cache is an optimisation; a read-only disk must not break it
+
+    def prune_disk(self, max_bytes=MAX_DISK_BYTES, max_age_days=MAX_DISK_AGE_DAYS):
+        """Delete old-version, unused and least recently used pickles; returns bytes freed"""
+        entries = []  # (mtime, size, path)
+        freed = 0
+        cutoff = time.time() - max_age_days * 86400
+        try:
+            versions = [name for name in os.listdir(self.cache_dir) if re.fullmatch(r"v\d+", name)]
+        except OSError:
+            return 0  # No cache yet
+        for version in versions:
+            stale = version != f"v{CACHE_VERSION}"
+            for root, _, files in os.walk(os.path.join(self.cache_dir, version), topdown=False):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if stale or stat.st_mtime < cutoff:
+                        freed += self._remove(path, stat.st_size)
+                    else:
+                        entries.append((stat.st_mtime, stat.st_size, path))
+                if stale:
+                    try:
+                        os.rmdir(root)  # Children come first (topdown=False), so it's empty now
+                    except OSError:
+                        pass
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            freed += self._remove(path, size)
+            total -= size
+        return freed
+
+    @staticmethod
+    def _remove(path, size):
+        try:
+            os.remove(path)
+            return size
+        except OSError:
+            return 0
+
+    # -- parsing ---------------------------------------------------------
+
+    def _remember_parsed(self, sha, modules):
+        self.parsed[sha] = modules
+        self.parsed.move_to_end(sha)
+        while len(self.parsed) > MAX_MEMORY_PARSED:
+            self.parsed.popitem(last=False)
+
+    def parse(self, text, filename):
+        """Return (sha, [Module]) for source text, parsing only on a cache miss"""
+        sha = hash_source(text)
+        with self.lock:
+            modules = self.parsed.get(sha)
+            if modules is None:
+                modules = self._load("parsed", sha)
+                if modules is None:
+                    modules = parse_source(text, filename)
+                    self.parse_count += 1
+                    self._store("parsed", sha, modules)
+            self._remember_parsed(sha, modules)
+        return sha, modules
+
+    def parse_file(self, path):
+        """Parse a file by path; unchanged files (same mtime and size) aren't even re-read"""
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            known = self.file_hashes.get(path)
+            if known and known[0] == signature and known[1] in self.parsed:
+                self.parsed.move_to_end(known[1])
+                return known[1], self.parsed[known[1]]
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        sha, modules = self.parse(text, os.path.basename(path))
+        with self.lock:
+            self.file_hashes[path] = (signature, sha)
+        return sha, modules
+
+    def load_library(self, workspace_dir="workspace", primary_file=None, primary_source=None):
+        """Cached equivalent of simulator.load_workspace_library.
+
+        Returns (modules, hashes): {name: Module} and {name: sha of the file
+        the module came from}.
+        """
+        modules = {}
+        hashes = {}
+        for filename in sorted(os.listdir(workspace_dir)):
+            if filename.endswith(".sv") and not is_level_file(filename):
+                sha, parsed = self.parse_file(os.path.join(workspace_dir, filename))
+                for module in parsed:
+                    if module.name not in modules:
+                        modules[module.name] = module
+                        hashes[module.name] = sha
+
+        if primary_file:
+            if primary_source is None:
+                sha, parsed = self.parse_file(os.path.join(workspace_dir, primary_file))
+            else:
+                sha, parsed = self.parse(primary_source, primary_file)
+            for module in parsed:
+                modules[module.name] = module
+                hashes[module.name] = sha
+        return modules, hashes
+
+    # -- designs ---------------------------------------------------------
+
+    def design_key(self, modules, hashes, top, memo=None):
+        """Hash of a module's source and, transitively, every module below it"""
+        if memo is None:
+            memo = {}
+        if top in memo:
+            return memo[top]
+        memo[top] = None  # Recursive instantiation: flatten() reports the error
+        module = modules.get(top)
+        digest = hashlib.sha256(f"{CACHE_VERSION}:{top}:".encode("utf-8"))
+        if module is None:
+            digest.update(b"missing")
+        else:
+            digest.update(hashes[top].encode("ascii"))
+            for dependency in module.dependencies():
+                key = self.design_key(modules, hashes, dependency, memo)
+                digest.update(f":{dependency}={key}".encode("utf-8"))
+        memo[top] = digest.hexdigest()
+        return memo[top]
+
+    def _remember(self, design):
+        self.designs[design.key] = design
+        self.designs.move_to_end(design.key)
+        while len(self.designs) > MAX_MEMORY_DESIGNS:
+            self.designs.popitem(last=False)
+
+    def get_design(self, modules, hashes, top):
+        """Return the CachedDesign for `top`, flattening only on a cache miss"""
+        key = self.design_key(modules, hashes, top)
+        with self.lock:
+            design = self.designs.get(key)
+            if design is None:
+                design = self._load("designs", key)
+            if design is not None:
+                self._remember(design)
+                return design
+
+        netlist = flatten(modules, top)
+        design = CachedDesign(key, netlist)
+        with self.lock:
+            self.flatten_count += 1
+            self._remember(design)
+            self._store("designs", key, design)
+        return design
+
+    def get_kernel(self, design):
+        """Return the compiled kernel of a design's outputs, compiling only on a cache miss"""
+        key = f"{design.key}-{CODE_TAG}"
+        with self.lock:
+            kernel = self.kernels.get(key)
+            if kernel is None:
+                kernel = self._load("kernels", key)
+            if kernel is None:
+                kernel = compile_netlist(design.netlist)
+                self.compile_count += 1
+                self._store("kernels", key, kernel)
+            self.kernels[key] = kernel
+            self.kernels.move_to_end(key)
+            while len(self.kernels) > MAX_MEMORY_DESIGNS:
+                self.kernels.popitem(last=False)
+        return kernel
+
+    def get_truth_table(self, design, should_cancel=None):
+        """Return a design's truth table, evaluating and storing it if missing"""
+        if design.truth_table is None:
+            netlist = design.netlist
+            if netlist.flops or len(netlist.input_bits) > MAX_TRUTH_TABLE_INPUTS:
+                return evaluate_truth_table(netlist)  # Raises SimulatorError
+            kernel = self.get_kernel(design)
+            table = evaluate_truth_table(design.netlist, should_cancel, kernel)
+            with self.lock:
+                design.truth_table = table
+                self._store("designs", design.key, design)
+        return design.truth_table
+
+    def clear(self):
+        """Forget everything held in memory (the disk cache is kept)"""
+        with self.lock:
+            self.file_hashes.clear()
+            self.parsed.clear()
+            self.designs.clear()
+            self.kernels.clear()
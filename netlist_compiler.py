@@ -0,0 +1,376 @@
+"""Compile flattened NAND netlists into straight-line Python functions.
+
+evaluate_columns() interprets a netlist: for every gate it indexes the gate
+list, unpacks a tuple and indexes the value list three times. A compiled
+kernel does the same work as one generated function with a local variable
+per net, so each gate is a single `n7 = m ^ (n3 & n5)` statement:
+
+    def kernel(inputs, m, should_cancel):
+        n2, n3, = inputs
+        n4 = m ^ (n2 & n3)
+        n5 = m ^ n4
+        return [n5]
+
+Values keep the simulator's bit-parallel layout (bit r of every net is its
+value in row r, m has every row bit set), so one call still evaluates up to
+2^CHUNK_INPUT_BITS rows. Gates that cannot reach a requested output are
+dropped and gates with constant inputs are folded before code generation.
+
+Kernels are compiled once; ModuleCache keeps them by design key (the content
+hash of the module and everything it instantiates) and stores the marshalled
+code object on disk, like a .pyc.
+
+compile_cycle_loop() compiles a clocked netlist's whole simulation loop for
+one lane, with the gates rewritten into one-bit operations (see
+_ScalarBuilder). sequential.py uses it for single-stream simulation.
+"""
+
+import marshal
+import sys
+
+from simulator import CONST0, CONST1, SimulationCancelled, SimulatorError
+
+CANCEL_CHECK_GATES = 1024  # Gates between should_cancel checks in generated code
+CODE_TAG = sys.implementation.cache_tag  # Marshalled code only loads on the same Python
+
+
+def topological_gates(gates, net_count):
+    """Order gates so every gate comes after the gates driving its inputs.
+
+    Nets no gate drives (inputs, constants, register outputs) are ready from
+    the start. Raises SimulatorError on a combinational loop.
+    """
+    driver = {}
+    for gate in gates:
+        driver[gate[2]] = gate
+    ready = [net not in driver for net in range(net_count)]
+
+    ordered = []
+    visiting = set()
+    for gate in gates:
+        # Iterative depth-first walk so deep chains don't hit the recursion limit
+        stack = [(gate, False)]
+        while stack:
+            current, expanded = stack.pop()
+            out = current[2]
+            if ready[out]:
+                continue
+            if expanded:
+                ready[out] = True
+                visiting.discard(out)
+                ordered.append(current)
+                continue
+            if out in visiting:
+                raise SimulatorError(f"combinational loop through net {out}")
+            visiting.add(out)
+            stack.append((current, True))
+            for net in current[:2]:
+                if not ready[net]:
+                    stack.append((driver[net], False))
+    return ordered
+
+
+def live_gates(gates, output_nets):
+    """The gates (in order) that some net in output_nets depends on"""
+    needed = set(output_nets)
+    live = []
+    for gate in reversed(gates):
+        if gate[2] in needed:
+            live.append(gate)
+            needed.add(gate[0])
+            needed.add(gate[1])
+    live.reverse()
+    return live
+
+
+def generate_source(input_nets, output_nets, gates, name="kernel"):
+    """Python source of a function evaluating `gates` (topologically ordered)"""
+    names = {CONST0: "0", CONST1: "m"}  # Expression for each net's value
+    lines = [f"def {name}(inputs, m, should_cancel=None):"]
+    if input_nets:
+        for net in input_nets:
+            names[net] = f"n{net}"
+        lines.append(f"    {', '.join(names[net] for net in input_nets)}, = inputs")
+
+    for index, (a, b, out) in enumerate(gates):
+        if index and not index % CANCEL_CHECK_GATES:
+            lines.append("    if should_cancel is not None and should_cancel():")
+            lines.append("        raise SimulationCancelled('simulation cancelled')")
+        a_value, b_value = names[a], names[b]
+        # Fold constants: ~(0 & x) = 1, ~(1 & x) = ~x, ~(x & x) = ~x
+        if a_value == "0" or b_value == "0":
+            names[out] = "m"
+            continue
+        if a_value == "m":
+            expression = f"m ^ {b_value}"
+        elif b_value == "m" or a_value == b_value:
+            expression = f"m ^ {a_value}"
+        else:
+            expression = f"m ^ ({a_value} & {b_value})"
+        names[out] = f"n{out}"
+        lines.append(f"    n{out} = {expression}")
+
+    lines.append(f"    return [{', '.join(names[net] for net in output_nets)}]")
+    return "\n".join(lines) + "\n"
+
+
+class CompiledKernel:
+    """A netlist compiled to a function of (input columns, mask, should_cancel).
+
+    Calling it returns one packed int per output net, in output_nets order.
+    Kernels pickle as marshalled code, so they can be cached on disk.
+    """
+
+    def __init__(self, code, input_nets, output_nets, gate_count):
+        self.code = code
+        self.input_nets = input_nets
+        self.output_nets = output_nets
+        self.gate_count = gate_count  # Gates left after dead-gate removal
+        namespace = {"SimulationCancelled": SimulationCancelled}
+        exec(code, namespace)
+        self.function = namespace["kernel"]
+
+    def __call__(self, input_columns, mask, should_cancel=None):
+        return self.function(input_columns, mask, should_cancel)
+
+    def __reduce__(self):
+        return (
+            _load_kernel,
+            (CODE_TAG, marshal.dumps(self.code), self.input_nets, self.output_nets, self.gate_count),
+        )
+
+
+def _load_kernel(code_tag, code_bytes, input_nets, output_nets, gate_count):
+    if code_tag != CODE_TAG:
+        raise ImportError(f"kernel was compiled for {code_tag}")  # Treated as a cache miss
+    return CompiledKernel(marshal.loads(code_bytes), input_nets, output_nets, gate_count)
+
+
+def compile_netlist(netlist, output_nets=None, extra_inputs=()):
+    """Compile a Netlist, by default to a function of its inputs returning its outputs.
+
+    `output_nets` picks which nets the kernel returns (any net, not just
+    ports). `extra_inputs` are further undriven nets, such as register
+    outputs, whose values the kernel takes after the input ports'.
+    """
+    input_nets = list(netlist.input_bits) + list(extra_inputs)
+    if output_nets is None:
+        output_nets = netlist.output_bits
+    output_nets = list(output_nets)
+    gates = topological_gates(netlist.gates, netlist.net_count)
+    gates = live_gates(gates, output_nets)
+    source = generate_source(input_nets, output_nets, gates)
+    code = compile(source, f"<netlist {netlist.name}>", "exec")
+    return CompiledKernel(code, input_nets, output_nets, len(gates))
+
+
+# One-bit rewriting for compile_cycle_loop. A literal is (node id, inverted);
+# node 0 is constant 0, so ZERO and ONE are its two polarities.
+ZERO = (0, False)
+ONE = (0, True)
+
+
+def _invert(literal):
+    return literal[0], not literal[1]
+
+
+class _ScalarBuilder:
+    """Rebuilds NAND gates as one-bit and/or/xor/mux nodes with free inversions.
+
+    Hierarchical NAND designs are mostly a few idioms: NOT as nand(x, x),
+    AND as a NAND followed by a NOT, the 4-NAND XOR and the 4-NAND 2:1 mux.
+    Tracking inversion on the literal instead of computing it, and
+    recognizing the XOR and mux shapes, turns each idiom into a single
+    Python operation. Identical nodes are shared (structural hashing).
+    """
+
+    def __init__(self):
+        self.nodes = [("const",)]
+        self.known = {}  # (kind, args) -> node id
+
+    def node(self, kind, *args):
+        key = (kind,) + args
+        node = self.known.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self.known[key] = node
+        return node
+
+    def input(self, net):
+        return (self.node("input", net), False)
+
+    def nand_inputs(self, literal):
+        """The two literals L is the NAND of, if it was built as one"""
+        node, inverted = literal
+        kind = self.nodes[node][0]
+        if inverted and kind == "and":
+            return self.nodes[node][1:]
+        if not inverted and kind == "or":
+            _, x, y = self.nodes[node]
+            return (x, True), (y, True)
+        return None
+
+    def make_and(self, a, b):
+        if a == ZERO or b == ZERO:
+            return ZERO
+        if a == ONE or a == b:
+            return b
+        if b == ONE:
+            return a
+        if a[0] == b[0]:
+            return ZERO  # x & ~x
+        if a[1] and b[1]:
+            x, y = sorted((a[0], b[0]))
+            return (self.node("or", x, y), True)  # ~x & ~y = ~(x | y)
+        if a[1] or (not b[1] and b[0] < a[0]):
+            a, b = b, a  # Positive literal first; two positives in id order
+        return (self.node("and", a, b), False)
+
+    def make_xor(self, a, b):
+        if a[0] == 0:
+            return _invert(b) if a == ONE else b
+        if b[0] == 0:
+            return _invert(a) if b == ONE else a
+        if a[0] == b[0]:
+            return ZERO if a == b else ONE
+        x, y = sorted((a[0], b[0]))
+        return (self.node("xor", x, y), a[1] != b[1])
+
+    def make_mux(self, select, low, high):
+        """select ? high : low"""
+        if select[1]:
+            select, low, high = _invert(select), high, low
+        if low == high:
+            return low
+        if select[0] == 0:
+            return high if select == ONE else low
+        if low[0] == 0 or high[0] == 0:
+            # A constant data input makes it an AND or OR with the select
+            if low == ZERO:
+                return self.make_and(select, high)
+            if high == ZERO:
+                return self.make_and(_invert(select), low)
+            if low == ONE:
+                return _invert(self.make_and(select, _invert(high)))
+            return _invert(self.make_and(_invert(select), _invert(low)))
+        if low[1] and high[1]:
+            return (self.node("mux", select[0], _invert(low), _invert(high)), True)
+        return (self.node("mux", select[0], low, high), False)
+
+    def make_nand(self, a, b):
+        x = self.nand_inputs(a)
+        y = self.nand_inputs(b)
+        if x is not None and y is not None:
+            # nand(nand(x0, x1), nand(y0, y1)) = (x0 & x1) | (y0 & y1)
+            for i in (0, 1):
+                for j in (0, 1):
+                    if x[i][0] == y[j][0] and x[i][1] != y[j][1]:
+                        return self.make_mux(y[j], x[1 - i], y[1 - j])
+                    if x[i] == y[j]:
+                        shared = self.nand_inputs(x[i])
+                        if shared is not None and set(shared) == {x[1 - i], y[1 - j]}:
+                            return self.make_xor(x[1 - i], y[1 - j])
+        return _invert(self.make_and(a, b))
+
+    def code(self, literal):
+        node, inverted = literal
+        if node == 0:
+            return "1" if inverted else "0"
+        return f"(1 ^ v{node})" if inverted else f"v{node}"
+
+    def expression(self, node):
+        kind, *args = self.nodes[node]
+        if kind == "and":
+            a, b = args
+            op = ">" if b[1] else "&"  # a & ~b is a > b for 0/1 values
+            return f"v{a[0]} {op} v{b[0]}"
+        if kind == "or":
+            return f"v{args[0]} | v{args[1]}"
+        if kind == "xor":
+            return f"v{args[0]} ^ v{args[1]}"
+        select, low, high = args
+        return f"{self.code(high)} if v{select} else {self.code(low)}"
+
+    def needed(self, literals):
+        """Ids of the non-input nodes the literals depend on, in build (topological) order"""
+        seen = set()
+        stack = [node for node, _ in literals]
+        while stack:
+            node = stack.pop()
+            if node in seen or node == 0:
+                continue
+            seen.add(node)
+            for arg in self.nodes[node][1:]:
+                if isinstance(arg, tuple):
+                    stack.append(arg[0])
+                elif self.nodes[node][0] != "input":
+                    stack.append(arg)
+        return sorted(seen)
+
+
+def compile_cycle_loop(netlist, data_inputs, clock_nets=(), watch=()):
+    """Compile a single-lane clocked netlist's whole cycle loop into one function.
+
+    Returns cycle_loop(stimulus, state, samples). `stimulus` yields one tuple
+    of data_inputs port values per cycle, `state` is the tuple of flip-flop
+    q values and the final state is returned. For each cycle the values of
+    the `watch` ports, sampled before the clock edge, are appended to
+    `samples` as a tuple.
+
+    Unlike compile_netlist() this works on one lane of 0/1 values, which
+    lets _ScalarBuilder collapse each gate idiom into one operation and
+    keeps every net and register in a local variable across cycles.
+    """
+    builder = _ScalarBuilder()
+    literals = {CONST0: ZERO, CONST1: ONE}
+    for net in clock_nets:
+        literals[net] = ZERO  # The clock only acts through the edge
+    for _, nets in data_inputs:
+        for net in nets:
+            literals[net] = builder.input(net)
+    flop_d = [d for _, d, _ in netlist.flops]
+    flop_q = [q for _, _, q in netlist.flops]
+    for q in flop_q:
+        literals[q] = builder.input(q)
+    for a, b, out in topological_gates(netlist.gates, netlist.net_count):
+        literals[out] = builder.make_nand(literals[a], literals[b])
+
+    next_state = [literals[d] for d in flop_d]
+    sampled = [[literals[net] for net in nets] for _, nets in watch]
+    needed = builder.needed(next_state + [lit for bits in sampled for lit in bits])
+    needed_set = set(needed)
+    state_names = [builder.code(literals[q]) for q in flop_q]
+
+    lines = ["def cycle_loop(stimulus, state, samples):"]
+    if state_names:
+        lines.append(f"    {', '.join(state_names)}, = state")
+    ports = [f"p{index}" for index in range(len(data_inputs))]
+    lines.append(f"    for {', '.join(ports) + ',' if ports else '_'} in stimulus:")
+    loop_start = len(lines)
+    for port, (_, nets) in zip(ports, data_inputs):
+        for bit, net in enumerate(nets):
+            node = literals[net][0]
+            if node in needed_set:
+                shifted = f"{port} >> {bit}" if bit else port
+                lines.append(f"        v{node} = {shifted} & 1")
+    for node in needed:
+        if builder.nodes[node][0] != "input":
+            lines.append(f"        v{node} = {builder.expression(node)}")
+    if watch:
+        values = [
+            " | ".join(f"{builder.code(lit)} << {bit}" for bit, lit in enumerate(bits)) or "0"
+            for bits in sampled
+        ]
+        lines.append(f"        samples.append(({', '.join(values)},))")
+    if state_names:
+        next_values = ", ".join(builder.code(literal) for literal in next_state)
+        lines.append(f"        {', '.join(state_names)}, = {next_values},")
+    if len(lines) == loop_start:
+        lines.append("        pass")  # Nothing to compute: no registers and nothing watched
+    lines.append(f"    return ({', '.join(state_names) + ',' if state_names else ''})")
+    namespace = {}
+    exec(compile("\n".join(lines) + "\n", f"<cycle loop {netlist.name}>", "exec"), namespace)
+    cycle_loop = namespace["cycle_loop"]
+    cycle_loop.operations = sum(builder.nodes[node][0] != "input" for node in needed)
+    return cycle_loop
@@ -0,0 +1,206 @@
+"""Persistent player progress: read emails, level results, last open file.
+
+Progress lives in a single SQLite database in write-ahead-log mode, so each
+batch of changes is one atomic transaction and a crash mid-write leaves the
+previous state intact. The game never waits on the disk: reads are answered
+from an in-memory copy loaded at startup, and changes are queued for a
+background writer thread that commits them in batches.
+"""
+
+import sqlite3
+import threading
+import time
+
+DEFAULT_FLUSH_INTERVAL = 1.0  # Seconds the writer waits to batch up changes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_read (
+    email_id TEXT PRIMARY KEY,
+    read_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS level_progress (
+    level INTEGER PRIMARY KEY,
+    completed INTEGER NOT NULL DEFAULT 0,
+    best_nand_count INTEGER,
+    completed_at REAL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=5.0)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # With WAL, NORMAL may lose the last commits on power loss but never corrupts
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class ProgressStore:
+    """In-memory progress state with batched, background SQLite writes"""
+
+    def __init__(self, path="progress.db", flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.read_emails = set()
+        self.levels = {}  # level -> {"completed": bool, "best_nand_count": int or None}
+        self.settings = {}
+        self.lock = threading.Lock()
+        self.pending = []  # (sql, params) waiting for the writer
+        self.has_work = threading.Event()  # Set when changes are queued
+        self.flush_now = threading.Event()  # Cuts the batching delay short
+        self.stopping = False
+        self.thread = None
+        self._load()
+
+    def _load(self):
+        try:
+            connection = _connect(self.path)
+            try:
+                rows = connection.execute("SELECT email_id FROM email_read")
+                self.read_emails = {row[0] for row in rows}
+                for level, completed, best in connection.execute(
+                    "SELECT level, completed, best_nand_count FROM level_progress"
+                ):
+                    self.levels[level] = {
+                        "completed": bool(completed),
+                        "best_nand_count": best,
+                    }
+                rows = connection.execute("SELECT key, value FROM settings")
+                self.settings = dict(rows)
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            print(f"Error loading progress from {self.path}: {e}")
+
+    # -- reads (memory only) ---------------------------------------------
+
+    def is_email_read(self, email_id):
+        return email_id in self.read_emails
+
+    def get_level(self, level):
+        """Return {"completed", "best_nand_count"} for a level"""
+        progress = self.levels.get(level, {"completed": False, "best_nand_count": None})
+        return dict(progress)
+
+    def get_setting(self, key, default=None):
+        return self.settings.get(key, default)
+
+    # -- writes (queued) -------------------------------------------------
+
+    def _queue(self, sql, params):
+        with self.lock:
+            self.pending.append((sql, params))
+        self.has_work.set()
+        self._start_writer()
+
+    def mark_email_read(self, email_id):
+        if email_id in self.read_emails:
+            return
+        self.read_emails.add(email_id)
+        self._queue(
+            "INSERT OR IGNORE INTO email_read (email_id, read_at) VALUES (?, ?)",
+            (email_id, time.time()),
+        )
+
+    def record_level_result(self, level, nand_count):
+        """Mark a level completed, keeping the lowest NAND count seen.
+
+        Returns True if this is a new best.
+        """
+        progress = self.levels.setdefault(
+            level, {"completed": False, "best_nand_count": None}
+        )
+        best = progress["best_nand_count"]
+        improved = best is None or nand_count < best
+        if not improved and progress["completed"]:
+            return False
+        progress["completed"] = True
+        if improved:
+            progress["best_nand_count"] = nand_count
+        self._queue(
+            """
+            INSERT INTO level_progress (level, completed, best_nand_count, completed_at)
+            VALUES (?, 1, ?, ?)
+            ON CONFLICT(level) DO UPDATE SET
+                completed = 1,
+                best_nand_count = MIN(
+                    COALESCE(best_nand_count, excluded.best_nand_count),
+                    excluded.best_nand_count
+                ),
+                completed_at = COALESCE(completed_at, excluded.completed_at)
+            """,
+            (level, progress["best_nand_count"], time.time()),
+        )
+        return improved
+
+    def set_setting(self, key, value):
+        if self.settings.get(key) == value:
+            return
+        self.settings[key] = value
+        self._queue(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    # -- writer thread ---------------------------------------------------
+
+    def _start_writer(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(
+            target=self._writer_loop, name="progress-writer", daemon=True
+        )
+        self.thread.start()
+
+    def _writer_loop(self):
+        connection = None
+        try:
+            connection = _connect(self.path)
+            while True:
+                # Block while idle, then wait a moment so changes made
+                # together land in one transaction
+                self.has_work.wait()
+                self.flush_now.wait(self.flush_interval)
+                self.flush_now.clear()
+                self.has_work.clear()
+                self._write_batch(connection)
+                if self.stopping and not self.pending:
+                    return
+        except sqlite3.Error as e:
+            print(f"Error writing progress to {self.path}: {e}")
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def _write_batch(self, connection):
+        with self.lock:
+            batch = self.pending
+            self.pending = []
+        if not batch:
+            return
+        try:
+            with connection:  # One transaction: all of the batch or none of it
+                for sql, params in batch:
+                    connection.execute(sql, params)
+        except sqlite3.Error:
+            with self.lock:
+                self.pending = batch + self.pending  # Retry on the next pass
+            raise
+
+    def flush(self):
+        """Ask the writer to commit pending changes now"""
+        self.flush_now.set()
+
+    def close(self, timeout=2.0):
+        """Commit everything still pending and stop the writer thread"""
+        self.stopping = True
+        if self.pending:
+            self._start_writer()
+        self.has_work.set()
+        self.flush_now.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout)
@@ -0,0 +1,988 @@
+"""In-process simulator for the structural SystemVerilog used in BitWorks.
+
+Parses the subset of SystemVerilog the workspace modules are written in
+(ANSI module ports, logic/wire declarations, module instances with named or
+positional connections, plain assigns, the `~(a & b)` NAND assign that
+defines nand_gate and the `always_ff @(posedge clk) q <= d;` register that
+defines dff), flattens a design's hierarchy down to a list of two-input NAND
+gates plus D flip-flops, and evaluates a combinational design's complete
+truth table bit-parallel. sequential.py steps designs with flip-flops.
+
+Bit-parallel evaluation: every net holds one Python int whose bit r is the
+net's value in truth-table row r. Input columns are fixed bit patterns, so a
+single pass of `~(a & b)` over the gate list computes all 2^n rows at once.
+
+    python simulator.py workspace/xor_gate.sv
+"""
+
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+
+MAX_TRUTH_TABLE_INPUTS = 20  # Largest input count evaluated exhaustively
+CHUNK_INPUT_BITS = 16  # Rows evaluated per pass are 2^CHUNK_INPUT_BITS at most
+
+CONST0 = 0  # Net id of constant 0 in every netlist
+CONST1 = 1  # Net id of constant 1 in every netlist
+
+
+class SimulatorError(Exception):
+    """A design could not be parsed, flattened or evaluated"""
+
+
+class SimulationCancelled(SimulatorError):
+    """Evaluation was stopped by its should_cancel callback"""
+
+
+# ----------------------------------------------------------------------------
+# Parsed design (AST)
+# ----------------------------------------------------------------------------
+
+
+@dataclass
+class Port:
+    name: str
+    direction: str  # "input" or "output"
+    msb: int = 0
+    lsb: int = 0
+
+    @property
+    def width(self):
+        return abs(self.msb - self.lsb) + 1
+
+
+@dataclass
+class Instance:
+    module_name: str
+    instance_name: str
+    # Named connections map port name -> expression (None if left open);
+    # positional connections are stored under the port's index instead
+    connections: dict
+    line: int = 0
+
+
+@dataclass
+class Module:
+    name: str
+    filename: str = ""
+    ports: list = field(default_factory=list)
+    nets: dict = field(default_factory=dict)  # name -> (msb, lsb) for internal nets
+    assigns: list = field(default_factory=list)  # (lhs expr, rhs expr, line)
+    instances: list = field(default_factory=list)
+    registers: list = field(default_factory=list)  # (clock expr, q expr, d expr, line)
+
+    def port(self, name):
+        for port in self.ports:
+            if port.name == name:
+                return port
+        return None
+
+    def dependencies(self):
+        """Names of the modules this module instantiates"""
+        return sorted({instance.module_name for instance in self.instances})
+
+
+# Expressions are tuples:
+#   ("ref", name, msb, lsb)  - whole signal when msb is None
+#   ("const", width, value)  - width None for unsized literals
+#   ("concat", [expr, ...])  - first item is most significant
+#   ("nand", a_expr, b_expr) - ~(a & b), only on the right of an assign
+
+
+# ----------------------------------------------------------------------------
+# Parser
+# ----------------------------------------------------------------------------
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<number>\d*\s*'[sS]?[bBdDhHoO]\s*[0-9a-fA-F_]+|\d+)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<symbol><=|[()\[\]{};:,.=~&|^#@])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+DIRECTIONS = ("input", "output")
+NET_TYPES = ("logic", "wire", "reg")
+SIGNEDNESS = ("signed", "unsigned")
+
+
+def tokenize(text, filename="<source>"):
+    """Split source text into (kind, value, line) tokens, dropping comments"""
+    tokens = []
+    line = 1
+    pos = 0
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match:
+            raise SimulatorError(f"{filename}:{line}: unexpected character {text[pos]!r}")
+        kind = match.lastgroup
+        value = match.group()
+        if kind in ("number", "ident", "symbol"):
+            tokens.append((kind, value, line))
+        line += value.count("\n")
+        pos = match.end()
+    tokens.append(("eof", "", line))
+    return tokens
+
+
+def parse_number(literal):
+    """Return (width or None, value) for a Verilog number literal"""
+    literal = literal.replace("_", "").replace(" ", "")
+    if "'" not in literal:
+        return None, int(literal)
+    width, rest = literal.split("'")
+    rest = rest.lstrip("sS")
+    base = {"b": 2, "o": 8, "d": 10, "h": 16}[rest[0].lower()]
+    value = int(rest[1:], base)
+    return (int(width) if width else None), value
+
+
+class _Parser:
+    def __init__(self, text, filename):
+        self.filename = filename
+        self.tokens = tokenize(text, filename)
+        self.pos = 0
+
+    def error(self, message, line=None):
+        if line is None:
+            line = self.tokens[self.pos][2]
+        return SimulatorError(f"{self.filename}:{line}: {message}")
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos = min(self.pos + 1, len(self.tokens) - 1)
+        return token
+
+    def accept(self, value):
+        if self.peek()[1] == value and self.peek()[0] != "eof":
+            return self.next()
+        return None
+
+    def expect(self, value):
+        token = self.peek()
+        if token[1] != value or token[0] == "eof":
+            found = token[1] or "end of file"
+            raise self.error(f"expected '{value}' but found '{found}'")
+        return self.next()
+
+    def expect_ident(self):
+        token = self.peek()
+        if token[0] != "ident":
+            raise self.error(f"expected a name but found '{token[1] or 'end of file'}'")
+        return self.next()[1]
+
+    def expect_int(self):
+        token = self.peek()
+        if token[0] != "number" or "'" in token[1]:
+            raise self.error(f"expected a number but found '{token[1]}'")
+        return int(self.next()[1])
+
+    # -- modules ---------------------------------------------------------
+
+    def parse_modules(self):
+        modules = []
+        while self.peek()[0] != "eof":
+            if self.peek()[1] != "module":
+                raise self.error(f"expected 'module' but found '{self.peek()[1]}'")
+            modules.append(self.parse_module())
+        return modules
+
+    def parse_range(self):
+        """Parse an optional [msb:lsb]; returns (msb, lsb)"""
+        if not self.accept("["):
+            return 0, 0
+        msb = self.expect_int()
+        self.expect(":")
+        lsb = self.expect_int()
+        self.expect("]")
+        return msb, lsb
+
+    def parse_module(self):
+        self.expect("module")
+        module = Module(self.expect_ident(), filename=self.filename)
+        if self.peek()[1] == "#":
+            raise self.error("module parameters are not supported")
+
+        header_names = []  # Non-ANSI style: port names now, directions in the body
+        self.expect("(")
+        direction = None
+        while not self.accept(")"):
+            if self.peek()[1] in DIRECTIONS:
+                direction = self.next()[1]
+                self.accept_net_type()
+                msb, lsb = self.parse_range()
+            elif direction is None:
+                header_names.append(self.expect_ident())
+                if not self.accept(","):
+                    self.expect(")")
+                    break
+                continue
+            elif self.peek()[1] in NET_TYPES or self.peek()[1] == "[":
+                self.accept_net_type()
+                msb, lsb = self.parse_range()
+            name = self.expect_ident()
+            if module.port(name):
+                raise self.error(f"port '{name}' declared twice")
+            module.ports.append(Port(name, direction, msb, lsb))
+            if not self.accept(","):
+                self.expect(")")
+                break
+        self.expect(";")
+
+        while not self.accept("endmodule"):
+            if self.peek()[0] == "eof":
+                raise self.error(f"module '{module.name}' is missing 'endmodule'")
+            self.parse_item(module, header_names)
+
+        # Non-ANSI ports keep the order of the module header
+        if header_names:
+            declared = {port.name: port for port in module.ports}
+            missing = [name for name in header_names if name not in declared]
+            if missing:
+                raise self.error(f"port '{missing[0]}' has no input/output declaration")
+            module.ports = [declared[name] for name in header_names]
+        return module
+
+    def accept_net_type(self):
+        self.accept("logic") or self.accept("wire") or self.accept("reg")
+        if self.peek()[1] in SIGNEDNESS:
+            self.next()
+
+    def parse_item(self, module, header_names):
+        token = self.peek()
+        keyword = token[1]
+
+        if keyword in DIRECTIONS:
+            self.next()
+            self.accept_net_type()
+            msb, lsb = self.parse_range()
+            while True:
+                name = self.expect_ident()
+                if name not in header_names:
+                    raise self.error(f"'{name}' is not listed in the module header")
+                module.ports.append(Port(name, keyword, msb, lsb))
+                if not self.accept(","):
+                    break
+            self.expect(";")
+        elif keyword in NET_TYPES:
+            self.next()
+            if self.peek()[1] in SIGNEDNESS:
+                self.next()
+            msb, lsb = self.parse_range()
+            while True:
+                name = self.expect_ident()
+                if name in module.nets:
+                    raise self.error(f"'{name}' declared twice")
+                if not module.port(name):
+                    module.nets[name] = (msb, lsb)
+                if not self.accept(","):
+                    break
+            self.expect(";")
+        elif keyword == "assign":
+            self.next()
+            lhs = self.parse_expr()
+            self.expect("=")
+            rhs = self.parse_assign_rhs()
+            self.expect(";")
+            module.assigns.append((lhs, rhs, token[2]))
+        elif keyword == "always_ff":
+            self.parse_always_ff(module)
+        elif token[0] == "ident":
+            module.instances.append(self.parse_instance())
+        else:
+            raise self.error(f"unexpected '{keyword}'")
+
+    def parse_always_ff(self, module):
+        """Parse `always_ff @(posedge clk) q <= d;` (or several in begin/end)"""
+        self.expect("always_ff")
+        self.expect("@")
+        self.expect("(")
+        self.expect("posedge")
+        clock = self.parse_expr()
+        self.expect(")")
+        block = self.accept("begin")
+        while True:
+            line = self.peek()[2]
+            lhs = self.parse_expr()
+            if self.peek()[1] == "=":
+                raise self.error("use a nonblocking assignment (<=) in always_ff")
+            self.expect("<=")
+            rhs = self.parse_expr()
+            if self.peek()[1] != ";":
+                raise self.error("only q <= d is allowed in always_ff; build logic from nand_gate")
+            self.next()
+            module.registers.append((clock, lhs, rhs, line))
+            if not block or self.accept("end"):
+                break
+
+    def parse_instance(self):
+        line = self.peek()[2]
+        module_name = self.expect_ident()
+        if self.peek()[1] == "#":
+            raise self.error("instance parameters are not supported")
+        instance_name = self.expect_ident()
+        connections = {}
+        self.expect("(")
+        index = 0
+        while not self.accept(")"):
+            if self.accept("."):
+                port = self.expect_ident()
+                if port in connections:
+                    raise self.error(f"port '{port}' connected twice")
+                if self.accept("("):
+                    connections[port] = None if self.accept(")") else self.parse_expr()
+                    if connections[port] is not None:
+                        self.expect(")")
+                else:
+                    # .name shorthand connects to the signal of the same name
+                    connections[port] = ("ref", port, None, None)
+            else:
+                connections[index] = self.parse_expr()
+            index += 1
+            if not self.accept(","):
+                self.expect(")")
+                break
+        self.expect(";")
+        if any(isinstance(key, int) for key in connections) and any(
+            isinstance(key, str) for key in connections
+        ):
+            raise self.error("cannot mix named and positional connections", line)
+        return Instance(module_name, instance_name, connections, line)
+
+    # -- expressions -----------------------------------------------------
+
+    def parse_assign_rhs(self):
+        """Parse an assign right-hand side: a plain expression or ~(a & b)"""
+        if self.accept("~"):
+            self.expect("(")
+            a = self.parse_expr()
+            self.expect("&")
+            b = self.parse_expr()
+            self.expect(")")
+            return ("nand", a, b)
+        if self.peek()[1] in ("&", "|", "^"):
+            raise self.error("only ~(a & b) is allowed; build other logic from nand_gate")
+        expr = self.parse_expr()
+        if self.peek()[1] in ("&", "|", "^", "~"):
+            raise self.error("only ~(a & b) is allowed; build other logic from nand_gate")
+        return expr
+
+    def parse_expr(self):
+        token = self.peek()
+        if token[0] == "number":
+            self.next()
+            width, value = parse_number(token[1])
+            return ("const", width, value)
+        if self.accept("{"):
+            items = [self.parse_expr()]
+            while self.accept(","):
+                items.append(self.parse_expr())
+            self.expect("}")
+            return ("concat", items)
+        if self.accept("("):
+            expr = self.parse_expr()
+            self.expect(")")
+            return expr
+        name = self.expect_ident()
+        if self.accept("["):
+            msb = self.expect_int()
+            lsb = self.expect_int() if self.accept(":") else msb
+            self.expect("]")
+            return ("ref", name, msb, lsb)
+        return ("ref", name, None, None)
+
+
+def parse_source(text, filename="<source>"):
+    """Parse SystemVerilog source text into a list of Modules"""
+    return _Parser(text, filename).parse_modules()
+
+
+def parse_file(path):
+    """Parse a .sv file into a list of Modules"""
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_source(f.read(), os.path.basename(path))
+
+
+def is_level_file(filename):
+    """Level files (1.sv, 2.sv, ...) hold player solutions, not library modules"""
+    return filename[:1].isdigit()
+
+
+def load_workspace_library(workspace_dir="workspace", primary_file=None, primary_source=None):
+    """Parse the workspace's reference modules plus one primary file.
+
+    Reference modules are the letter-prefixed .sv files. Modules defined in
+    the primary file (a level solution, say) override library modules of the
+    same name. `primary_source` supplies the primary file's text directly,
+    e.g. an unsaved editor buffer. Returns {module name: Module}.
+    """
+    modules = {}
+    for filename in sorted(os.listdir(workspace_dir)):
+        if filename.endswith(".sv") and not is_level_file(filename):
+            for module in parse_file(os.path.join(workspace_dir, filename)):
+                modules.setdefault(module.name, module)
+
+    if primary_file:
+        if primary_source is None:
+            primary_modules = parse_file(os.path.join(workspace_dir, primary_file))
+        else:
+            primary_modules = parse_source(primary_source, primary_file)
+        for module in primary_modules:
+            modules[module.name] = module
+    return modules
+
+
+# ----------------------------------------------------------------------------
+# Flattening
+# ----------------------------------------------------------------------------
+
+
+@dataclass
+class Netlist:
+    """A design flattened to two-input NAND gates.
+
+    Net 0 is constant 0 and net 1 is constant 1. Port bit lists are
+    LSB-first. Gates are (input a, input b, output) in evaluation order.
+    Flip-flops are (clock, d, q): q takes d's value on each rising clock
+    edge, so gates see q as an input that only changes between cycles.
+    """
+
+    name: str
+    inputs: list  # [(port name, [net ids])]
+    outputs: list  # [(port name, [net ids])]
+    gates: list
+    net_count: int
+    net_names: list
+    flops: list = field(default_factory=list)
+
+    @property
+    def nand_count(self):
+        return len(self.gates)
+
+    @property
+    def input_bits(self):
+        """Input net ids, most significant first (first port's MSB leads)"""
+        return [net for _, nets in self.inputs for net in reversed(nets)]
+
+    @property
+    def output_bits(self):
+        """Output net ids, most significant first"""
+        return [net for _, nets in self.outputs for net in reversed(nets)]
+
+
+class _Flattener:
+    def __init__(self, modules):
+        self.modules = modules
+        self.parent = [CONST0, CONST1]  # Union-find over net ids
+        self.names = ["1'b0", "1'b1"]
+        self.gates = []
+        self.flops = []
+        self.stack = []
+
+    def new_net(self, name):
+        self.parent.append(len(self.parent))
+        self.names.append(name)
+        return len(self.parent) - 1
+
+    def find(self, net):
+        root = net
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[net] != root:
+            self.parent[net], net = root, self.parent[net]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            # Keep constants (lowest ids) as roots
+            if a < b:
+                self.parent[b] = a
+            else:
+                self.parent[a] = b
+
+    def error(self, module, line, message):
+        where = f"{module.filename}:{line}: " if module.filename else ""
+        return SimulatorError(f"{where}{message}")
+
+    def resolve(self, module, scope, expr, line, width=None):
+        """Return an expression's net ids, LSB-first"""
+        kind = expr[0]
+        if kind == "const":
+            const_width = expr[1] if expr[1] is not None else (width or 1)
+            value = expr[2]
+            return [CONST1 if (value >> i) & 1 else CONST0 for i in range(const_width)]
+        if kind == "concat":
+            bits = []
+            for item in reversed(expr[1]):
+                bits.extend(self.resolve(module, scope, item, line))
+            return bits
+        if kind == "nand":
+            raise self.error(module, line, "~(a & b) is only allowed on the right of an assign")
+
+        _, name, msb, lsb = expr
+        if name not in scope:
+            raise self.error(module, line, f"'{name}' is not declared in module '{module.name}'")
+        bits, (decl_msb, decl_lsb) = scope[name]
+        if msb is None:
+            return list(bits)
+        step = 1 if decl_msb >= decl_lsb else -1
+        low, high = sorted((decl_lsb, decl_msb))
+        for index in (msb, lsb):
+            if not low <= index <= high:
+                raise self.error(module, line, f"index {index} is out of range for '{name}'")
+        offsets = [abs(i - decl_lsb) for i in range(lsb, msb + step, step)] if (
+            (msb - lsb) * step >= 0
+        ) else None
+        if offsets is None:
+            raise self.error(module, line, f"part-select of '{name}' is reversed")
+        return [bits[offset] for offset in offsets]
+
+    def instantiate(self, module, port_nets, path):
+        if module.name in self.stack:
+            chain = " -> ".join(self.stack + [module.name])
+            raise SimulatorError(f"module instantiates itself: {chain}")
+        self.stack.append(module.name)
+
+        scope = {}
+        for port in module.ports:
+            bits = port_nets.get(port.name)
+            if bits is None:
+                bits = [self.new_net(f"{path}{port.name}[{i}]") for i in range(port.width)]
+            scope[port.name] = (bits, (port.msb, port.lsb))
+        for name, (msb, lsb) in module.nets.items():
+            width = abs(msb - lsb) + 1
+            scope[name] = ([self.new_net(f"{path}{name}[{i}]") for i in range(width)], (msb, lsb))
+
+        for lhs, rhs, line in module.assigns:
+            lhs_bits = self.resolve(module, scope, lhs, line)
+            if any(bit in (CONST0, CONST1) for bit in lhs_bits):
+                raise self.error(module, line, "cannot assign to a constant")
+            if rhs[0] == "nand":
+                a_bits = self.resolve(module, scope, rhs[1], line, len(lhs_bits))
+                b_bits = self.resolve(module, scope, rhs[2], line, len(lhs_bits))
+                if not len(a_bits) == len(b_bits) == len(lhs_bits):
+                    raise self.error(module, line, "NAND operands and result must be the same width")
+                self.gates.extend(zip(a_bits, b_bits, lhs_bits))
+            else:
+                rhs_bits = self.resolve(module, scope, rhs, line, len(lhs_bits))
+                if len(rhs_bits) != len(lhs_bits):
+                    raise self.error(
+                        module,
+                        line,
+                        f"assign width mismatch ({len(lhs_bits)} vs {len(rhs_bits)} bits)",
+                    )
+                for lhs_bit, rhs_bit in zip(lhs_bits, rhs_bits):
+                    self.union(lhs_bit, rhs_bit)
+
+        for clock, lhs, rhs, line in module.registers:
+            clock_bits = self.resolve(module, scope, clock, line)
+            if len(clock_bits) != 1:
+                raise self.error(module, line, "the clock must be a single bit")
+            q_bits = self.resolve(module, scope, lhs, line)
+            if any(bit in (CONST0, CONST1) for bit in q_bits):
+                raise self.error(module, line, "cannot assign to a constant")
+            d_bits = self.resolve(module, scope, rhs, line, len(q_bits))
+            if len(d_bits) != len(q_bits):
+                raise self.error(
+                    module,
+                    line,
+                    f"register width mismatch ({len(q_bits)} vs {len(d_bits)} bits)",
+                )
+            self.flops.extend((clock_bits[0], d, q) for d, q in zip(d_bits, q_bits))
+
+        for instance in module.instances:
+            child = self.modules.get(instance.module_name)
+            if child is None:
+                raise self.error(
+                    module, instance.line, f"unknown module '{instance.module_name}'"
+                )
+            child_nets = {}
+            for key, expr in instance.connections.items():
+                if isinstance(key, int):
+                    if key >= len(child.ports):
+                        raise self.error(
+                            module, instance.line, f"too many connections to '{child.name}'"
+                        )
+                    port = child.ports[key]
+                else:
+                    port = child.port(key)
+                    if port is None:
+                        raise self.error(
+                            module,
+                            instance.line,
+                            f"module '{child.name}' has no port '{key}'",
+                        )
+                if expr is None:
+                    continue
+                bits = self.resolve(module, scope, expr, instance.line, port.width)
+                if len(bits) != port.width:
+                    raise self.error(
+                        module,
+                        instance.line,
+                        f"port '{port.name}' of {instance.instance_name} is {port.width} "
+                        f"bits but is connected to {len(bits)} bits",
+                    )
+                if port.direction == "output" and any(b in (CONST0, CONST1) for b in bits):
+                    raise self.error(
+                        module,
+                        instance.line,
+                        f"output '{port.name}' of {instance.instance_name} drives a constant",
+                    )
+                child_nets[port.name] = bits
+            for port in child.ports:
+                if port.direction == "input" and port.name not in child_nets:
+                    raise self.error(
+                        module,
+                        instance.line,
+                        f"input '{port.name}' of {instance.instance_name} is not connected",
+                    )
+            self.instantiate(child, child_nets, f"{path}{instance.instance_name}.")
+
+        self.stack.pop()
+
+
+def flatten(modules, top):
+    """Flatten module `top` and everything below it into a NAND Netlist"""
+    if top not in modules:
+        raise SimulatorError(f"unknown module '{top}'")
+    module = modules[top]
+    flattener = _Flattener(modules)
+
+    port_nets = {}
+    for port in module.ports:
+        port_nets[port.name] = [
+            flattener.new_net(f"{port.name}[{i}]") for i in range(port.width)
+        ]
+    flattener.instantiate(module, port_nets, "")
+
+    find = flattener.find
+    inputs = [
+        (port.name, [find(n) for n in port_nets[port.name]])
+        for port in module.ports
+        if port.direction == "input"
+    ]
+    outputs = [
+        (port.name, [find(n) for n in port_nets[port.name]])
+        for port in module.ports
+        if port.direction == "output"
+    ]
+    gates = [(find(a), find(b), find(out)) for a, b, out in flattener.gates]
+    flops = [(find(clock), find(d), find(q)) for clock, d, q in flattener.flops]
+
+    # Every net needs exactly one driver: a constant, a primary input, a gate or a flip-flop
+    drivers = {CONST0: "constant", CONST1: "constant"}
+    for name, nets in inputs:
+        for net in nets:
+            if net in drivers:
+                raise SimulatorError(
+                    f"input '{name}' is shorted to another input or constant"
+                )
+            drivers[net] = "input"
+    for a, b, out in gates:
+        if out in drivers:
+            raise SimulatorError(f"net '{flattener.names[out]}' has multiple drivers")
+        drivers[out] = "gate"
+    for _, _, q in flops:
+        if q in drivers:
+            raise SimulatorError(f"net '{flattener.names[q]}' has multiple drivers")
+        drivers[q] = "flop"
+    for clock, d, _ in flops:
+        for net in (clock, d):
+            if net not in drivers:
+                raise SimulatorError(f"net '{flattener.names[net]}' is used but never driven")
+
+    # Flip-flop outputs count as ready, so loops through a register are fine
+    gates = _topological_order(gates, drivers, flattener.names)
+    for name, nets in outputs:
+        for net in nets:
+            if net not in drivers:
+                raise SimulatorError(f"output '{name}' is never driven")
+
+    # Renumber nets densely in evaluation order
+    numbering = {CONST0: CONST0, CONST1: CONST1}
+    for _, nets in inputs:
+        for net in nets:
+            numbering.setdefault(net, len(numbering))
+    for _, _, q in flops:
+        numbering[q] = len(numbering)
+    for _, _, out in gates:
+        numbering[out] = len(numbering)
+    for _, nets in outputs:
+        for net in nets:
+            numbering.setdefault(net, len(numbering))  # Undriven-but-unused can't happen
+
+    net_names = [""] * len(numbering)
+    for old, new in numbering.items():
+        net_names[new] = flattener.names[old]
+
+    return Netlist(
+        name=top,
+        inputs=[(name, [numbering[n] for n in nets]) for name, nets in inputs],
+        outputs=[(name, [numbering[n] for n in nets]) for name, nets in outputs],
+        gates=[(numbering[a], numbering[b], numbering[out]) for a, b, out in gates],
+        net_count=len(numbering),
+        net_names=net_names,
+        flops=[(numbering[clock], numbering[d], numbering[q]) for clock, d, q in flops],
+    )
+
+
+def _topological_order(gates, drivers, names):
+    """Order gates so every gate comes after the gates driving its inputs"""
+    ready = {net for net, kind in drivers.items() if kind != "gate"}
+    waiting = {}  # net -> gates blocked on it
+    ordered = []
+    pending = []
+    for gate in gates:
+        a, b, _ = gate
+        if a not in drivers or b not in drivers:
+            floating = a if a not in drivers else b
+            raise SimulatorError(f"net '{names[floating]}' is used but never driven")
+        pending.append(gate)
+
+    def release(gate):
+        stack = [gate]
+        while stack:
+            gate = stack.pop()
+            ordered.append(gate)
+            out = gate[2]
+            ready.add(out)
+            for blocked in waiting.pop(out, ()):
+                if blocked[0] in ready and blocked[1] in ready:
+                    stack.append(blocked)
+
+    for gate in pending:
+        a, b, _ = gate
+        if a in ready and b in ready:
+            release(gate)
+        else:
+            waiting.setdefault(a if a not in ready else b, []).append(gate)
+
+    if len(ordered) != len(gates):
+        stuck = next(gate for gate in gates if gate[2] not in ready)
+        raise SimulatorError(
+            f"combinational loop through net '{names[stuck[2]]}'"
+        )
+    return ordered
+
+
+# ----------------------------------------------------------------------------
+# Bit-parallel evaluation
+# ----------------------------------------------------------------------------
+
+
+def input_pattern(bit, row_bits):
+    """Truth-table column for row-index bit `bit` over 2^row_bits rows.
+
+    Bit r of the result is (r >> bit) & 1.
+    """
+    half = 1 << bit
+    pattern = ((1 << half) - 1) << half
+    width = half * 2
+    total = 1 << row_bits
+    while width < total:
+        pattern |= pattern << width
+        width *= 2
+    return pattern
+
+
+def evaluate_columns(netlist, input_columns, mask, should_cancel=None):
+    """Evaluate every gate once on packed input columns.
+
+    `input_columns` gives one int per entry of netlist.input_bits. Returns
+    the list of net values (one packed int per net).
+    """
+    values = [0] * netlist.net_count
+    values[CONST1] = mask
+    for net, column in zip(netlist.input_bits, input_columns):
+        values[net] = column
+    for index, (a, b, out) in enumerate(netlist.gates):
+        values[out] = mask ^ (values[a] & values[b])
+        if should_cancel and not index & 0x3FF and should_cancel():
+            raise SimulationCancelled("simulation cancelled")
+    return values
+
+
+@dataclass
+class TruthTable:
+    """Exhaustive truth table; each output bit is a packed column of rows"""
+
+    inputs: list  # [(name, width)]
+    outputs: list  # [(name, width)]
+    row_count: int
+    output_columns: list  # One int per output bit, most significant first
+
+    def row(self, index):
+        """Return (input values, output values) for a row as tuples of ints"""
+        input_values = []
+        shift = sum(width for _, width in self.inputs)
+        for _, width in self.inputs:
+            shift -= width
+            input_values.append((index >> shift) & ((1 << width) - 1))
+        output_values = []
+        bit = 0
+        for _, width in self.outputs:
+            value = 0
+            for _ in range(width):
+                value = (value << 1) | ((self.output_columns[bit] >> index) & 1)
+                bit += 1
+            output_values.append(value)
+        return tuple(input_values), tuple(output_values)
+
+    def rows(self):
+        for index in range(self.row_count):
+            yield self.row(index)
+
+    def format(self, max_rows=64):
+        """Render as text in the same layout as the workspace comments"""
+        names = [name for name, _ in self.inputs] + [name for name, _ in self.outputs]
+        header = " | ".join(names)
+        lines = [header]
+        for index, (ins, outs) in enumerate(self.rows()):
+            if index >= max_rows:
+                lines.append(f"... {self.row_count - max_rows} more rows")
+                break
+            widths = [w for _, w in self.inputs] + [w for _, w in self.outputs]
+            cells = [
+                format(value, f"0{width}b").center(len(name))
+                for value, width, name in zip(ins + outs, widths, names)
+            ]
+            lines.append(" | ".join(cells))
+        return "\n".join(lines)
+
+
+def evaluate_truth_table(netlist, should_cancel=None, kernel=None):
+    """Evaluate all 2^n input combinations of a netlist bit-parallel.
+
+    Rows are ordered like the comment tables in the workspace: the first
+    input port is the most significant part of the row index. Tables with
+    more than CHUNK_INPUT_BITS inputs are evaluated in chunks of rows with
+    the high input bits held constant, keeping each packed int small.
+
+    `kernel` is an optional compiled form of the netlist (see
+    netlist_compiler.py) used instead of interpreting the gate list.
+    """
+    if netlist.flops:
+        raise SimulatorError(
+            f"{netlist.name} has {len(netlist.flops)} flip-flops; truth tables are for "
+            f"combinational designs"
+        )
+    input_bits = netlist.input_bits
+    n = len(input_bits)
+    if n > MAX_TRUTH_TABLE_INPUTS:
+        raise SimulatorError(
+            f"{netlist.name} has {n} input bits; exhaustive tables stop at "
+            f"{MAX_TRUTH_TABLE_INPUTS}"
+        )
+
+    chunk_bits = min(n, CHUNK_INPUT_BITS)
+    chunk_rows = 1 << chunk_bits
+    mask = (1 << chunk_rows) - 1
+    low_patterns = [input_pattern(bit, chunk_bits) for bit in range(chunk_bits)]
+    output_bits = netlist.output_bits
+    output_columns = [0] * len(output_bits)
+
+    for chunk in range(1 << (n - chunk_bits)):
+        # Input j (MSB first) is row-index bit n-1-j; the high bits come from the chunk
+        columns = []
+        for j in range(n):
+            bit = n - 1 - j
+            if bit < chunk_bits:
+                columns.append(low_patterns[bit])
+            else:
+                columns.append(mask if (chunk >> (bit - chunk_bits)) & 1 else 0)
+        if kernel is not None:
+            outputs = kernel(columns, mask, should_cancel)
+        else:
+            values = evaluate_columns(netlist, columns, mask, should_cancel)
+            outputs = [values[net] for net in output_bits]
+        shift = chunk * chunk_rows
+        for i, column in enumerate(outputs):
+            output_columns[i] |= column << shift
+
+    return TruthTable(
+        inputs=[(name, len(nets)) for name, nets in netlist.inputs],
+        outputs=[(name, len(nets)) for name, nets in netlist.outputs],
+        row_count=1 << n,
+        output_columns=output_columns,
+    )
+
+
+def find_mismatches(table, expected, limit=8):
+    """Compare a TruthTable with expected rows.
+
+    `expected` is a list of (input values, output values) tuples, one per
+    row in table order, or a callable taking the input values and returning
+    the output values. Returns up to `limit` (inputs, expected, actual)
+    tuples.
+    """
+    if callable(expected):
+        expected_rows = (expected(*table.row(i)[0]) for i in range(table.row_count))
+    else:
+        if len(expected) != table.row_count:
+            raise SimulatorError(
+                f"expected {len(expected)} rows but the design has {table.row_count}"
+            )
+        expected_rows = (outs for _, outs in expected)
+
+    # Pack the expected outputs into columns and diff them all at once
+    output_widths = [width for _, width in table.outputs]
+    expected_columns = [0] * len(table.output_columns)
+    for index, outs in enumerate(expected_rows):
+        bit = 0
+        for value, width in zip(outs, output_widths):
+            for shift in range(width - 1, -1, -1):
+                if (value >> shift) & 1:
+                    expected_columns[bit] |= 1 << index
+                bit += 1
+    diff = 0
+    for actual, wanted in zip(table.output_columns, expected_columns):
+        diff |= actual ^ wanted
+
+    mismatches = []
+    while diff and len(mismatches) < limit:
+        index = (diff & -diff).bit_length() - 1
+        diff &= diff - 1
+        ins, actual = table.row(index)
+        wanted = []
+        bit = 0
+        for width in output_widths:
+            value = 0
+            for _ in range(width):
+                value = (value << 1) | ((expected_columns[bit] >> index) & 1)
+                bit += 1
+            wanted.append(value)
+        mismatches.append((ins, tuple(wanted), actual))
+    return mismatches
+
+
+def main(argv):
+    if len(argv) < 2:
+        print("usage: python simulator.py FILE.sv [TOP_MODULE]")
+        return 2
+    path = argv[1]
+    workspace_dir = os.path.dirname(path) or "."
+    filename = os.path.basename(path)
+    try:
+        modules = load_workspace_library(workspace_dir, filename)
+        tops = [module.name for module in parse_file(path)]
+        top = argv[2] if len(argv) > 2 else tops[-1]
+        netlist = flatten(modules, top)
+        table = evaluate_truth_table(netlist)
+    except SimulatorError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Module: {top}  NAND gates: {netlist.nand_count}")
+    print(table.format())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,211 @@
+"""Incremental SystemVerilog syntax highlighting for the editor.
+
+lex_line() splits one line into colored spans given the lexer state at its
+start - the only state that carries across lines is being inside a
+/* block comment */. SyntaxHighlighter keeps the start state of every line
+and an LRU of lexed lines keyed by (state, text), so each line is tokenized
+once and drawing a frame only looks spans up.
+
+When the buffer changes, the highlighter diffs it against the snapshot it
+last saw (LineRope.changed_range) and re-scans states from the first changed
+line only until they converge with the states it already had: typing inside
+a module touches one line, while opening a /* re-scans until the comment is
+closed again.
+"""
+
+import re
+from collections import OrderedDict
+
+# Lexer states at the start/end of a line
+NORMAL = 0
+BLOCK_COMMENT = 1
+
+# Span kinds (the editor maps each to a color)
+TEXT = "text"
+KEYWORD = "keyword"
+TYPE = "type"
+COMMENT = "comment"
+NUMBER = "number"
+STRING = "string"
+DIRECTIVE = "directive"
+
+KEYWORDS = frozenset(
+    """
+    module endmodule assign always always_comb always_ff always_latch begin end
+    if else case casez casex endcase default for while repeat forever
+    generate endgenerate genvar parameter localparam function endfunction
+    task endtask return initial posedge negedge or and nand nor xor xnor not
+    buf typedef enum struct union packed import export package endpackage
+    interface endinterface modport automatic unique priority
+    """.split()
+)
+
+TYPES = frozenset(
+    """
+    input output inout logic wire reg bit byte int integer shortint longint
+    signed unsigned tri supply0 supply1 wand wor
+    """.split()
+)
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<line_comment>//)
+    | (?P<block_comment>/\*)
+    | (?P<string>"(?:[^"\\]|\\.)*"?)
+    | (?P<number>
+        \d[\d_]*\s*'[sS]?[bBoOdDhH]\s*[0-9a-fA-FxXzZ?_]+
+        | '[sS]?[bBoOdDhH][0-9a-fA-FxXzZ?_]+
+        | '[01xXzZ](?!\w)
+        | \d[\d_]*(?:\.\d[\d_]*)?
+      )
+    | (?P<directive>`[A-Za-z_]\w*|\$[A-Za-z_][\w$]*)
+    | (?P<word>[A-Za-z_][\w$]*)
+    """,
+    re.VERBOSE,
+)
+
+DEFAULT_CACHE_LINES = 4096  # Lexed lines kept in the span cache
+SCAN_CHUNK_LINES = 1024  # Lines fetched from the rope at a time while scanning states
+
+
+def lex_line(line, state=NORMAL):
+    """Split a line into spans.
+
+    Returns (spans, end_state) where spans is a tuple of (start, end, kind)
+    covering the whole line, with neighbouring spans of one kind merged.
+    """
+    spans = []
+
+    def add(start, end, kind):
+        if start >= end:
+            return
+        if spans and spans[-1][2] == kind:
+            spans[-1] = (spans[-1][0], end, kind)
+        else:
+            spans.append((start, end, kind))
+
+    pos = 0
+    if state == BLOCK_COMMENT:
+        close = line.find("*/")
+        if close < 0:
+            add(0, len(line), COMMENT)
+            return tuple(spans), BLOCK_COMMENT
+        pos = close + 2
+        add(0, pos, COMMENT)
+
+    while True:
+        match = TOKEN_RE.search(line, pos)
+        if match is None:
+            add(pos, len(line), TEXT)
+            return tuple(spans), NORMAL
+        start, end = match.span()
+        add(pos, start, TEXT)
+        kind = match.lastgroup
+        if kind == "line_comment":
+            add(start, len(line), COMMENT)
+            return tuple(spans), NORMAL
+        if kind == "block_comment":
+            close = line.find("*/", end)
+            if close < 0:
+                add(start, len(line), COMMENT)
+                return tuple(spans), BLOCK_COMMENT
+            end = close + 2
+            add(start, end, COMMENT)
+        elif kind == "word":
+            word = match.group()
+            add(start, end, KEYWORD if word in KEYWORDS else TYPE if word in TYPES else TEXT)
+        else:
+            add(start, end, {"string": STRING, "number": NUMBER}.get(kind, DIRECTIVE))
+        pos = end
+
+
+def line_end_state(line, state=NORMAL):
+    """The lexer state after a line, without building its spans when possible"""
+    # Only a comment opener or closer can change the state
+    if state == NORMAL and "/*" not in line:
+        return NORMAL
+    if state == BLOCK_COMMENT and "*/" not in line:
+        return BLOCK_COMMENT
+    return lex_line(line, state)[1]
+
+
+class SyntaxHighlighter:
+    """Per-line lexer states for one buffer plus a shared cache of lexed lines"""
+
+    def __init__(self, cache_lines=DEFAULT_CACHE_LINES):
+        self.cache_lines = cache_lines
+        self.cache = OrderedDict()  # (state, line) -> (spans, end_state)
+        self.snapshot = None  # The LineRope the states below were computed for
+        self.states = [NORMAL]  # states[i] = lexer state at the start of line i
+        self.lex_count = 0  # Lines actually tokenized (cache misses)
+
+    def lex(self, line, state):
+        """lex_line through the cache"""
+        key = (state, line)
+        result = self.cache.get(key)
+        if result is not None:
+            self.cache.move_to_end(key)
+            return result
+        self.lex_count += 1
+        result = lex_line(line, state)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_lines:
+            self.cache.popitem(last=False)
+        return result
+
+    def sync(self, lines):
+        """Bring the line states up to date with `lines` after an edit"""
+        if self.snapshot is None:
+            self.snapshot = lines.snapshot()
+            self.states = [NORMAL]
+            return
+        start, stop, old_stop = lines.changed_range(self.snapshot)
+        self.snapshot = lines.snapshot()
+        if start == stop == old_stop:
+            return
+        known = len(self.states)  # States are known for lines [0, known)
+        if known <= start + 1:
+            return  # The edit is past everything scanned so far
+
+        # States after the edited lines still hold (shifted) if the state
+        # coming out of the edit is unchanged; re-scan until that happens.
+        old_states = self.states
+        shift = stop - old_stop
+        self.states = states = old_states[: start + 1]
+        for y, state in self._scan(lines, start, known + shift):
+            if y >= stop and state == old_states[y - shift]:
+                states.extend(old_states[y - shift :])
+                return
+            states.append(state)
+
+    def _scan(self, lines, y, stop):
+        """Yield (y + 1, state after line y) from line y until line `stop` starts"""
+        state = self.states[y]
+        stop = min(stop, len(lines) + 1)
+        while y + 1 < stop:
+            for line in lines[y : min(stop - 1, y + SCAN_CHUNK_LINES)]:
+                state = line_end_state(line, state)
+                y += 1
+                yield y, state
+
+    def _extend_states(self, lines, stop):
+        """Scan line states forward until states for lines [0, stop) are known"""
+        states = self.states
+        for _, state in self._scan(lines, len(states) - 1, stop):
+            states.append(state)
+
+    def highlight(self, lines, start, stop):
+        """Return the spans of lines [start, stop) as a list of span tuples"""
+        self.sync(lines)
+        stop = min(stop, len(lines))
+        self._extend_states(lines, stop)
+        states = self.states
+        return [
+            self.lex(line, states[y])[0]
+            for y, line in enumerate(lines[start:stop], start)
+        ]
+
+    def clear(self):
+        self.cache.clear()
+        self.snapshot = None
+        self.states = [NORMAL]
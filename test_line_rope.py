@@ -0,0 +1,150 @@
+"""LineRope against plain list behavior, snapshots and changed_range."""
+
+import random
+
+import pytest
+
+from large_file import MappedLineFile
+from line_rope import LEAF_MAX_LINES, LineRope
+
+
+def make_lines(count, prefix="line"):
+    return [f"{prefix} {i}" for i in range(count)]
+
+
+def test_matches_list_under_random_edits():
+    rng = random.Random(5)
+    expected = make_lines(300)
+    rope = LineRope(expected)
+    for step in range(2000):
+        length = len(expected)
+        op = rng.randrange(6)
+        if op == 0 and length:
+            index = rng.randrange(-length, length)
+            expected[index] = rope[index] = f"set {step}"
+        elif op == 1:
+            index = rng.randrange(-length - 2, length + 3)
+            expected.insert(index, f"ins {step}")
+            rope.insert(index, f"ins {step}")
+        elif op == 2 and length:
+            index = rng.randrange(-length, length)
+            assert rope.pop(index) == expected.pop(index)
+        elif op == 3:
+            start = rng.randrange(length + 1)
+            stop = rng.randrange(start, length + 1)
+            new = make_lines(rng.randrange(3 * LEAF_MAX_LINES), f"splice {step}")
+            expected[start:stop] = new
+            rope[start:stop] = new
+        elif op == 4 and length:
+            start = rng.randrange(length)
+            stop = rng.randrange(start, min(length, start + 100) + 1)
+            del expected[start:stop]
+            del rope[start:stop]
+        else:
+            expected.append(f"app {step}")
+            rope.append(f"app {step}")
+        assert len(rope) == len(expected)
+        if step % 50 == 0:
+            assert list(rope) == expected
+            start = rng.randrange(len(expected) + 1)
+            assert rope[start : start + 40] == expected[start : start + 40]
+    assert rope == expected
+    assert rope.text() == "\n".join(expected)
+
+
+def test_index_errors_match_list():
+    rope = LineRope(["a", "b"])
+    assert rope[-1] == "b"
+    with pytest.raises(IndexError):
+        rope[2]
+    with pytest.raises(IndexError):
+        rope[-3]
+    with pytest.raises(IndexError):
+        LineRope().pop()
+    with pytest.raises(ValueError):
+        rope[::2]
+
+
+def test_snapshot_is_isolated():
+    rope = LineRope(make_lines(500))
+    snapshot = rope.snapshot()
+    rope[10] = "changed"
+    rope.insert(0, "first")
+    del rope[200:300]
+    assert snapshot == make_lines(500)
+    snapshot[5] = "snapshot edit"
+    assert rope[6] == "line 5"
+
+
+def test_changed_range():
+    base = make_lines(1000)
+    old = LineRope(base)
+
+    rope = old.snapshot()
+    assert rope.changed_range(old) == (1000, 1000, 1000)
+
+    rope[500] = "edited"
+    assert rope.changed_range(old) == (500, 501, 501)
+
+    rope = old.snapshot()
+    rope[100:103] = ["a", "b", "c", "d", "e"]
+    assert rope.changed_range(old) == (100, 105, 103)
+
+    rope = old.snapshot()
+    del rope[700:900]
+    assert rope.changed_range(old) == (700, 700, 900)
+
+    rope = old.snapshot()
+    rope.append("tail")
+    assert rope.changed_range(old) == (1000, 1001, 1000)
+
+
+def test_changed_range_with_repeated_lines():
+    old = LineRope(["x"] * 200)
+    rope = old.snapshot()
+    rope.insert(50, "x")
+    start, stop, old_stop = rope.changed_range(old)
+    assert rope[:start] == old[:start]
+    assert rope[stop:] == old[old_stop:]
+    assert stop - old_stop == 1
+
+
+class CountingSource:
+    def __init__(self, lines):
+        self.lines = lines
+        self.reads = []
+
+    def read_lines(self, start, stop):
+        self.reads.append((start, stop))
+        return tuple(self.lines[start:stop])
+
+
+def test_lazy_leaves_read_on_first_access():
+    lines = make_lines(1000)
+    source = CountingSource(lines)
+    rope = LineRope()
+    rope.append_lazy(source, 0, 1000)
+    assert len(rope) == 1000
+    assert source.reads == []
+
+    assert rope[700] == "line 700"
+    assert len(source.reads) == 1
+    assert rope[701] == "line 701"
+    assert len(source.reads) == 1  # Same leaf, already loaded
+
+    rope[3] = "edited"
+    assert rope == ["line 0", "line 1", "line 2", "edited"] + lines[4:]
+
+
+def test_lazy_leaves_over_a_closed_mapped_file(tmp_path):
+    lines = make_lines(5000)
+    path = tmp_path / "big.sv"
+    path.write_bytes("\r\n".join(lines).encode("utf-8"))
+    source = MappedLineFile(str(path))
+    while not source.complete:
+        source.index_more(4096)
+    rope = LineRope()
+    rope.append_lazy(source, 0, source.line_count)
+    assert rope[10] == "line 10"
+    source.close()  # Remaining leaves now read by offset
+    assert rope == lines
@@ -0,0 +1,107 @@
+"""ModuleCache hits and invalidation through design keys."""
+
+import os
+import shutil
+
+import pytest
+
+from module_cache import ModuleCache
+
+WORKSPACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workspace")
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    path = tmp_path / "workspace"
+    shutil.copytree(WORKSPACE, path)
+    return str(path)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def test_parse_hits(workspace, cache_dir):
+    cache = ModuleCache(cache_dir)
+    cache.load_library(workspace)
+    parsed = cache.parse_count
+    assert parsed > 0
+    cache.load_library(workspace)
+    assert cache.parse_count == parsed
+
+    # Same text under another name is the same content hash
+    with open(os.path.join(workspace, "and_gate.sv"), encoding="utf-8") as f:
+        cache.parse(f.read(), "copy.sv")
+    assert cache.parse_count == parsed
+
+
+def test_design_hits_and_truth_table(workspace, cache_dir):
+    cache = ModuleCache(cache_dir)
+    modules, hashes = cache.load_library(workspace)
+    design = cache.get_design(modules, hashes, "xor_gate")
+    assert design.netlist.nand_count == 4
+    assert cache.get_design(modules, hashes, "xor_gate") is design
+    assert cache.flatten_count == 1
+
+    table = cache.get_truth_table(design)
+    assert [outs[0] for _, outs in table.rows()] == [0, 1, 1, 0]
+    assert cache.get_truth_table(design) is table
+    assert cache.compile_count == 1
+
+
+def test_editing_a_dependency_invalidates_dependents(workspace, cache_dir):
+    cache = ModuleCache(cache_dir)
+    modules, hashes = cache.load_library(workspace)
+    and_key = cache.design_key(modules, hashes, "and_gate")
+    xor_key = cache.design_key(modules, hashes, "xor_gate")
+    nor_key = cache.design_key(modules, hashes, "nor_gate")
+    cache.get_design(modules, hashes, "and_gate")
+
+    # and_gate is NAND + NOT, so editing not_gate must change its key
+    path = os.path.join(workspace, "not_gate.sv")
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text + "\n// edited\n")
+    os.utime(path, ns=(1, 1))  # Make sure the mtime changes
+
+    modules, hashes = cache.load_library(workspace)
+    assert cache.design_key(modules, hashes, "and_gate") != and_key
+    assert cache.design_key(modules, hashes, "xor_gate") == xor_key  # NAND only
+    uses_not = "not_gate" in modules["nor_gate"].dependencies()
+    assert (cache.design_key(modules, hashes, "nor_gate") != nor_key) == uses_not
+
+    flattened = cache.flatten_count
+    cache.get_design(modules, hashes, "and_gate")
+    assert cache.flatten_count == flattened + 1
+
+
+def test_restart_is_warm(workspace, cache_dir):
+    cache = ModuleCache(cache_dir)
+    modules, hashes = cache.load_library(workspace)
+    cache.get_truth_table(cache.get_design(modules, hashes, "or_gate"))
+
+    restarted = ModuleCache(cache_dir)
+    modules, hashes = restarted.load_library(workspace)
+    design = restarted.get_design(modules, hashes, "or_gate")
+    assert restarted.parse_count == 0
+    assert restarted.flatten_count == 0
+    assert design.truth_table is not None
+
+
+def test_primary_source_overrides_file(workspace, cache_dir):
+    cache = ModuleCache(cache_dir)
+    modules, hashes = cache.load_library(workspace)
+    key = cache.design_key(modules, hashes, "and_gate")
+    source = """
+    module and_gate (input logic inA, input logic inB, output logic outY);
+        logic n;
+        nand_gate u1 (.inA(inA), .inB(inB), .outY(n));
+        nand_gate u2 (.inA(n), .inB(n), .outY(outY));
+    endmodule
+    """
+    modules, hashes = cache.load_library(workspace, "and_gate.sv", source)
+    assert cache.design_key(modules, hashes, "and_gate") != key
+    design = cache.get_design(modules, hashes, "and_gate")
+    assert [outs[0] for _, outs in cache.get_truth_table(design).rows()] == [0, 0, 0, 1]
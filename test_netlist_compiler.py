@@ -0,0 +1,125 @@
+"""Compiled kernels and cycle loops must match the interpreters."""
+
+import os
+import pickle
+import random
+
+import pytest
+
+from netlist_compiler import compile_netlist
+from sequential import CompiledSequentialSimulator, SequentialSimulator
+from simulator import (
+    Netlist,
+    evaluate_columns,
+    evaluate_truth_table,
+    flatten,
+    input_pattern,
+    load_workspace_library,
+)
+
+WORKSPACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workspace")
+
+
+def random_netlist(rng, clocked=False):
+    """A random NAND netlist using the NOT, XOR and mux idioms the compiler rewrites"""
+    net_count = 2
+
+    def new_net():
+        nonlocal net_count
+        net_count += 1
+        return net_count - 1
+
+    clock = new_net() if clocked else None
+    data = [new_net() for _ in range(rng.randint(1, 6))]
+    registers = [new_net() for _ in range(rng.randint(0, 5))] if clocked else []
+    pool = [0, 1] + data + registers
+    gates = []
+
+    def nand(a, b):
+        out = new_net()
+        gates.append((a, b, out))
+        return out
+
+    for _ in range(rng.randint(1, 60)):
+        r = rng.random()
+        if r < 0.2:
+            select, low, high = (rng.choice(pool) for _ in range(3))
+            not_select = nand(select, select)
+            pool.append(nand(nand(low, not_select), nand(high, select)))
+        elif r < 0.35:
+            a, b = rng.choice(pool), rng.choice(pool)
+            t = nand(a, b)
+            pool.append(nand(nand(a, t), nand(b, t)))
+        elif r < 0.5:
+            x = rng.choice(pool)
+            pool.append(nand(x, x))
+        else:
+            pool.append(nand(rng.choice(pool), rng.choice(pool)))
+
+    split = len(data) // 2 + 1
+    inputs = [("a", data[:split]), ("b", data[split:])]
+    if clocked:
+        inputs.insert(0, ("clk", [clock]))
+    inputs = [(name, nets) for name, nets in inputs if nets]
+    outputs = [
+        ("o", [rng.choice(pool) for _ in range(rng.randint(1, 5))]),
+        ("p", [rng.choice(pool)]),
+    ]
+    flops = [(clock, rng.choice(pool), q) for q in registers]
+    names = [f"n{i}" for i in range(net_count)]
+    return Netlist("random", inputs, outputs, gates, net_count, names, flops)
+
+
+def interpret(netlist):
+    bits = len(netlist.input_bits)
+    columns = [input_pattern(bits - 1 - i, bits) for i in range(bits)]
+    mask = (1 << (1 << bits)) - 1
+    values = evaluate_columns(netlist, columns, mask)
+    return columns, mask, [values[net] for net in netlist.output_bits]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_kernel_matches_interpreter(seed):
+    netlist = random_netlist(random.Random(seed))
+    columns, mask, expected = interpret(netlist)
+    kernel = compile_netlist(netlist)
+    assert kernel(columns, mask) == expected
+    assert kernel.gate_count <= netlist.nand_count
+
+
+def test_kernel_survives_pickling():
+    netlist = random_netlist(random.Random(7))
+    columns, mask, expected = interpret(netlist)
+    kernel = pickle.loads(pickle.dumps(compile_netlist(netlist)))
+    assert kernel(columns, mask) == expected
+
+
+def test_workspace_truth_tables_match():
+    library = load_workspace_library(WORKSPACE)
+    for name in library:
+        netlist = flatten(library, name)
+        if netlist.flops:
+            continue
+        kernel = compile_netlist(netlist)
+        assert evaluate_truth_table(netlist, kernel=kernel) == evaluate_truth_table(netlist)
+
+
+@pytest.mark.parametrize("seed", range(100))
+@pytest.mark.parametrize("lanes", [1, 3])
+def test_compiled_sequential_matches_interpreter(seed, lanes):
+    rng = random.Random(seed)
+    netlist = random_netlist(rng, clocked=True)
+    reference = SequentialSimulator(netlist, lanes)
+    compiled = CompiledSequentialSimulator(netlist, lanes)
+    widths = [(name, len(nets)) for name, nets in netlist.inputs if name != "clk"]
+    stimulus = [
+        {name: rng.getrandbits(width) for name, width in widths if rng.random() < 0.7}
+        for _ in range(30)
+    ]
+    watch = ["o", "p"] + [name for name, _ in widths]
+    assert compiled.run(stimulus, watch) == reference.run(stimulus, watch)
+    reference.step(5)
+    compiled.step(5)
+    for name in watch:
+        assert compiled.peek(name) == reference.peek(name)
+    assert compiled.cycle == reference.cycle == 35
@@ -0,0 +1,85 @@
+"""Flattening and truth tables of the workspace gates."""
+
+import os
+
+import pytest
+
+from simulator import (
+    SimulatorError,
+    evaluate_truth_table,
+    find_mismatches,
+    flatten,
+    load_workspace_library,
+    parse_source,
+)
+
+WORKSPACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workspace")
+
+# module: (NAND count, outY for rows 00, 01, 10, 11 of inA, inB)
+GATES = {
+    "nand_gate": (1, [1, 1, 1, 0]),
+    "and_gate": (2, [0, 0, 0, 1]),
+    "or_gate": (3, [0, 1, 1, 1]),
+    "nor_gate": (4, [1, 0, 0, 0]),
+    "xor_gate": (4, [0, 1, 1, 0]),
+    "xnor_gate": (5, [1, 0, 0, 1]),
+}
+
+
+@pytest.fixture(scope="module")
+def library():
+    return load_workspace_library(WORKSPACE)
+
+
+@pytest.mark.parametrize("name", sorted(GATES))
+def test_two_input_gates(library, name):
+    nand_count, outputs = GATES[name]
+    netlist = flatten(library, name)
+    assert netlist.nand_count == nand_count
+    table = evaluate_truth_table(netlist)
+    assert table.row_count == 4
+    assert [outs[0] for _, outs in table.rows()] == outputs
+
+
+def test_not_gate(library):
+    netlist = flatten(library, "not_gate")
+    assert netlist.nand_count == 1
+    assert [outs for _, outs in evaluate_truth_table(netlist).rows()] == [(1,), (0,)]
+
+
+def test_dff_has_a_flop_and_no_truth_table(library):
+    netlist = flatten(library, "dff")
+    assert netlist.nand_count == 0
+    assert len(netlist.flops) == 1
+    with pytest.raises(SimulatorError):
+        evaluate_truth_table(netlist)
+
+
+def test_multi_bit_ports(library):
+    source = """
+    module add2 (input logic [1:0] a, input logic b, output logic [1:0] y);
+        xor_gate u0 (.inA(a[0]), .inB(b), .outY(y[0]));
+        assign y[1] = a[1];
+    endmodule
+    """
+    library = dict(library)
+    for module in parse_source(source, "add2.sv"):
+        library[module.name] = module
+    netlist = flatten(library, "add2")
+    assert netlist.nand_count == 4
+    table = evaluate_truth_table(netlist)
+    assert table.row_count == 8
+    expected = [(a, b, a ^ b) for a in range(4) for b in range(2)]
+    assert [(ins[0], ins[1], outs[0]) for ins, outs in table.rows()] == expected
+
+
+def test_find_mismatches(library):
+    table = evaluate_truth_table(flatten(library, "and_gate"))
+    assert find_mismatches(table, lambda a, b: (a & b,)) == []
+    mismatches = find_mismatches(table, lambda a, b: (a | b,))
+    assert len(mismatches) == 2
+
+
+def test_missing_module_is_an_error(library):
+    with pytest.raises(SimulatorError):
+        flatten(library, "no_such_gate")
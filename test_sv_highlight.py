@@ -0,0 +1,79 @@
+"""Incremental highlighting must equal a full re-lex."""
+
+import random
+
+from line_rope import LineRope
+from sv_highlight import BLOCK_COMMENT, COMMENT, KEYWORD, NORMAL, SyntaxHighlighter, lex_line
+
+FRAGMENTS = [
+    "module m (input logic a, output logic y);",
+    "    assign y = ~(a & a);",
+    "endmodule",
+    "// line comment",
+    "/* block comment opens",
+    "   still inside",
+    "closes */ logic x;",
+    "/* one-line */ wire w = 4'b1010;",
+    '$display("hi /* not a comment */");',
+    "`define WIDTH 8",
+    "",
+]
+
+
+def full_lex(lines):
+    spans = []
+    state = NORMAL
+    for line in lines:
+        line_spans, state = lex_line(line, state)
+        spans.append(line_spans)
+    return spans
+
+
+def test_lex_line():
+    spans, state = lex_line("assign y = a; // done")
+    assert spans[0] == (0, 6, KEYWORD)
+    assert spans[-1] == (14, 21, COMMENT)
+    assert state == NORMAL
+    assert lex_line("x /* open", NORMAL)[1] == BLOCK_COMMENT
+    assert lex_line("still open", BLOCK_COMMENT) == (((0, 10, COMMENT),), BLOCK_COMMENT)
+
+
+def test_incremental_matches_full_lex():
+    rng = random.Random(3)
+    rope = LineRope(rng.choice(FRAGMENTS) for _ in range(3000))
+    highlighter = SyntaxHighlighter(cache_lines=256)
+    for step in range(300):
+        length = len(rope)
+        op = rng.randrange(4)
+        y = rng.randrange(length)
+        if op == 0:
+            rope[y] = rng.choice(FRAGMENTS)
+        elif op == 1:
+            rope.insert(y, rng.choice(FRAGMENTS))
+        elif op == 2 and length > 1:
+            del rope[y : y + rng.randint(1, 20)]
+        else:
+            rope[y:y] = [rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 50))]
+
+        start = rng.randrange(len(rope))
+        stop = start + rng.randint(1, 60)
+        expected = full_lex(rope[:stop])[start:stop]
+        assert highlighter.highlight(rope, start, stop) == expected, step
+
+
+def test_unrelated_edit_does_not_rescan_everything():
+    rope = LineRope(FRAGMENTS * 500)
+    highlighter = SyntaxHighlighter()
+    highlighter.highlight(rope, len(rope) - 10, len(rope))
+    rope[100] = "// edited"
+    lexed = highlighter.lex_count
+    assert highlighter.highlight(rope, 95, 105) == full_lex(rope[:105])[95:105]
+    assert highlighter.lex_count - lexed <= 10
+
+
+def test_clear():
+    rope = LineRope(FRAGMENTS)
+    highlighter = SyntaxHighlighter()
+    before = highlighter.highlight(rope, 0, len(rope))
+    highlighter.clear()
+    assert highlighter.highlight(rope, 0, len(rope)) == before
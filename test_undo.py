@@ -0,0 +1,102 @@
+"""UndoHistory coalescing and memory budget."""
+
+from undo import MAX_COALESCED_LENGTH, RECORD_OVERHEAD, UndoHistory, text_end_position
+
+
+def type_text(history, text, x=0, y=0):
+    for char in text:
+        history.record("type", x, y, "", char, (x, y), (x + 1, y))
+        x += 1
+
+
+def test_text_end_position():
+    assert text_end_position(3, 2, "abc") == (6, 2)
+    assert text_end_position(3, 2, "ab\ncd\nefg") == (3, 4)
+    assert text_end_position(3, 2, "ab\n") == (0, 3)
+
+
+def test_typing_coalesces_into_one_record():
+    history = UndoHistory()
+    type_text(history, "hello")
+    assert len(history.undo_stack) == 1
+    record = history.pop_undo()
+    assert record.inserted == "hello"
+    assert record.cursor_before == (0, 0)
+    assert record.cursor_after == (5, 0)
+    assert history.can_redo() and not history.can_undo()
+
+
+def test_coalescing_stops_at_breaks():
+    history = UndoHistory()
+    type_text(history, "ab")
+    type_text(history, "cd", x=10)  # Not where the run ended
+    assert len(history.undo_stack) == 2
+
+    history.seal()
+    type_text(history, "e", x=12)
+    assert len(history.undo_stack) == 3
+
+    history.record("delete", 12, 0, "e", "", (13, 0), (12, 0))
+    type_text(history, "f", x=12)
+    assert [r.kind for r in history.undo_stack] == ["type", "type", "type", "delete", "type"]
+
+    history.record("type", 13, 0, "", "\n", (13, 0), (0, 1))
+    assert len(history.undo_stack) == 6
+
+
+def test_coalescing_is_capped():
+    history = UndoHistory()
+    type_text(history, "x" * (MAX_COALESCED_LENGTH + 10))
+    assert [len(r.inserted) for r in history.undo_stack] == [MAX_COALESCED_LENGTH, 10]
+
+
+def test_new_edit_drops_redo():
+    history = UndoHistory()
+    type_text(history, "abc")
+    history.record("paste", 3, 0, "", "pasted", (3, 0), (9, 0))
+    history.pop_undo()
+    assert history.can_redo()
+    history.record("delete", 2, 0, "c", "", (3, 0), (2, 0))
+    assert not history.can_redo()
+    assert history.memory_used == sum(r.size() for r in history.undo_stack)
+
+
+def test_memory_budget_drops_oldest_records():
+    budget = 10 * (RECORD_OVERHEAD + 100)
+    history = UndoHistory(memory_budget=budget)
+    for i in range(50):
+        history.record("paste", 0, i, "", f"{i:03}" + "x" * 97, (0, i), (100, i))
+        assert history.memory_used <= budget
+        assert history.memory_used == sum(r.size() for r in history.undo_stack)
+    assert len(history.undo_stack) == 10
+    assert history.undo_stack[0].inserted.startswith("040")
+
+
+def test_newest_record_kept_even_over_budget():
+    history = UndoHistory(memory_budget=100)
+    history.record("paste", 0, 0, "", "y" * 1000, (0, 0), (1000, 0))
+    assert len(history.undo_stack) == 1
+    history.record("paste", 0, 0, "", "z" * 1000, (0, 0), (1000, 0))
+    assert [r.inserted[0] for r in history.undo_stack] == ["z"]
+
+
+def test_fits_stops_at_the_budget():
+    history = UndoHistory(memory_budget=RECORD_OVERHEAD + 9)
+    assert history.fits([])
+    assert history.fits(["abcd", "efgh"])  # 9 chars with the newline
+    assert not history.fits(["abcd", "efghi"])
+
+    def lines():
+        yield "x" * 100
+        raise AssertionError("read past the budget")
+
+    assert not history.fits(lines())
+
+
+def test_clear():
+    history = UndoHistory()
+    type_text(history, "abc")
+    history.pop_undo()
+    history.clear()
+    assert not history.can_undo() and not history.can_redo()
+    assert history.memory_used == 0
@@ -0,0 +1,141 @@
+"""Undo/redo history for the text editor.
+
+Every edit is stored as a compact delta - the position it happened at, the
+text it removed and the text it inserted - rather than a copy of the buffer.
+Undoing swaps the two: remove the inserted text, put the removed text back.
+Consecutive typed characters are coalesced into a single record so undo
+steps back a run of typing at a time, and the whole history is held under a
+memory budget by dropping the oldest records first.
+"""
+
+from collections import deque
+
+DEFAULT_MEMORY_BUDGET = 4 * 1024 * 1024  # bytes of history kept per file
+RECORD_OVERHEAD = 160  # Approximate bytes for a record besides its text
+MAX_COALESCED_LENGTH = 256  # Start a new record after this many typed chars
+
+
+def text_end_position(x, y, text):
+    """Return the (x, y) position just past `text` if inserted at (x, y)"""
+    newlines = text.count("\n")
+    if not newlines:
+        return x + len(text), y
+    return len(text) - text.rfind("\n") - 1, y + newlines
+
+
+class EditRecord:
+    """One undoable edit: at (x, y), `removed` was replaced by `inserted`"""
+
+    __slots__ = ("kind", "x", "y", "removed", "inserted", "cursor_before", "cursor_after")
+
+    def __init__(self, kind, x, y, removed, inserted, cursor_before, cursor_after):
+        self.kind = kind
+        self.x = x
+        self.y = y
+        self.removed = removed
+        self.inserted = inserted
+        self.cursor_before = cursor_before
+        self.cursor_after = cursor_after
+
+    def size(self):
+        """Approximate memory used by this record in bytes"""
+        return RECORD_OVERHEAD + len(self.removed) + len(self.inserted)
+
+
+class UndoHistory:
+    """Bounded undo/redo stacks of EditRecords"""
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.memory_used = 0
+        self._sealed = True  # Whether the next typed char must start a new record
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.memory_used = 0
+        self._sealed = True
+
+    def seal(self):
+        """Stop the current run of typing from absorbing further characters"""
+        self._sealed = True
+
+    def fits(self, lines):
+        """Whether the text of `lines` fits in one record under the memory budget.
+
+        Stops reading lines as soon as the budget is exceeded, so a large
+        lazily loaded buffer is not read in full just to be turned down.
+        """
+        size = RECORD_OVERHEAD - 1  # No separator before the first line
+        for line in lines:
+            size += len(line) + 1
+            if size > self.memory_budget:
+                return False
+        return True
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def record(self, kind, x, y, removed, inserted, cursor_before, cursor_after):
+        """Record an edit that replaced `removed` with `inserted` at (x, y).
+
+        Edits of kind "type" that insert directly after the previous typed run
+        are merged into it instead of creating a new record.
+        """
+        self._drop_redo()
+
+        last = self.undo_stack[-1] if self.undo_stack else None
+        if (
+            kind == "type"
+            and not self._sealed
+            and not removed
+            and "\n" not in inserted
+            and last is not None
+            and last.kind == "type"
+            and len(last.inserted) < MAX_COALESCED_LENGTH
+            and text_end_position(last.x, last.y, last.inserted) == (x, y)
+        ):
+            last.inserted += inserted
+            last.cursor_after = cursor_after
+            self.memory_used += len(inserted)
+        else:
+            record = EditRecord(kind, x, y, removed, inserted, cursor_before, cursor_after)
+            self.undo_stack.append(record)
+            self.memory_used += record.size()
+        self._enforce_budget()
+
+        # Only typing continues a run; anything else ends it
+        self._sealed = kind != "type"
+
+    def pop_undo(self):
+        """Move the newest record to the redo stack and return it (or None)"""
+        if not self.undo_stack:
+            return None
+        record = self.undo_stack.pop()
+        self.redo_stack.append(record)
+        self._sealed = True
+        return record
+
+    def pop_redo(self):
+        """Move the newest undone record back to the undo stack and return it (or None)"""
+        if not self.redo_stack:
+            return None
+        record = self.redo_stack.pop()
+        self.undo_stack.append(record)
+        self._sealed = True
+        return record
+
+    def _drop_redo(self):
+        for record in self.redo_stack:
+            self.memory_used -= record.size()
+        self.redo_stack.clear()
+
+    def _enforce_budget(self):
+        # Always keep the newest record so the latest edit can be undone
+        while self.memory_used > self.memory_budget and len(self.undo_stack) > 1:
+            self.memory_used -= self.undo_stack.popleft().size()
@@ -0,0 +1,464 @@
+"""Verify wide designs against a reference on every core.
+
+A truth table stops at MAX_TRUTH_TABLE_INPUTS input bits: a 16-bit adder
+with carry in has 2^33 rows. check_vectors() instead splits the input space
+into shards, checks them in a process pool and returns as soon as one shard
+reports a counterexample, telling the other workers to stop:
+
+- Up to `exhaustive_max_inputs` input bits every row is checked. A shard is
+  a run of chunks of 2^CHUNK_INPUT_BITS rows, each evaluated bit-parallel
+  the same way evaluate_truth_table() does.
+- Wider designs get corner-case vectors (0, 1, all ones, sign bits,
+  alternating bits, walking ones and zeros) and then `random_vectors`
+  seeded random vectors. A random batch is just one random int per input
+  bit, so it evaluates bit-parallel too, and the same seed always checks
+  the same vectors.
+
+The reference is either another Netlist with the same ports (checked
+bit-parallel, so equivalence checks are as fast as the design itself) or a
+function taking the tuple of input values and returning the tuple of
+output values, like find_mismatches() accepts. A function is called once
+per vector and must be picklable (defined at module level).
+
+Workers are started with the "spawn" method rather than forked, since the
+game calls this from a background thread of a process that has several.
+Spawning re-imports the caller's main module in every worker, so the game
+keeps one VectorPool for the session instead of a pool per check.
+
+    python vector_check.py design.sv adder16 reference.sv [REFERENCE_TOP]
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import pickle
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+from netlist_compiler import compile_netlist
+from simulator import (
+    CHUNK_INPUT_BITS,
+    Netlist,
+    SimulationCancelled,
+    SimulatorError,
+    flatten,
+    input_pattern,
+    load_workspace_library,
+    parse_file,
+)
+
+EXHAUSTIVE_MAX_INPUTS = 24  # Wider designs get corner-case and random vectors
+RANDOM_VECTORS = 1 << 22  # Random vectors checked above the exhaustive threshold
+BATCH_VECTORS = 1 << CHUNK_INPUT_BITS  # Vectors per bit-parallel evaluation
+SHARDS_PER_WORKER = 4  # Exhaustive shards per worker, so uneven shards balance out
+CORNER_LIMIT = 1 << 16  # Most corner-case vectors generated
+POLL_SECONDS = 0.05  # How often the parent checks should_cancel while waiting
+
+
+@dataclass
+class VectorCheckResult:
+    mode: str  # "exhaustive" or "random"
+    vectors: int  # Vectors checked (all of them when nothing failed)
+    mismatches: list = field(default_factory=list)  # (inputs, expected, actual) tuples
+    seconds: float = 0.0
+
+    @property
+    def passed(self):
+        return not self.mismatches
+
+
+def port_widths(ports):
+    return [len(nets) for _, nets in ports]
+
+
+def corner_values(width):
+    """Interesting values for one port: extremes, sign bits, patterns, walking bits"""
+    ones = (1 << width) - 1
+    base = [0, 1, ones, ones >> 1, 1 << (width - 1), 0x5555_5555_5555_5555 & ones,
+            0xAAAA_AAAA_AAAA_AAAA & ones]
+    walking = [1 << bit for bit in range(width)] + [ones ^ (1 << bit) for bit in range(width)]
+    return list(dict.fromkeys(base)), list(dict.fromkeys(base + walking))
+
+
+def corner_vectors(widths, limit=CORNER_LIMIT):
+    """Corner-case input vectors: every combination of the ports' extreme values,
+    plus each port's walking bits with the other ports all zeros or all ones
+    """
+    corners = [corner_values(width) for width in widths]
+    vectors = {}
+    combinations = 1
+    for base, _ in corners:
+        combinations *= len(base)
+    if combinations <= limit:
+        vectors.update(dict.fromkeys(itertools.product(*(base for base, _ in corners))))
+    for fill in (0, -1):
+        filled = [fill & ((1 << width) - 1) for width in widths]
+        for port, (_, values) in enumerate(corners):
+            for value in values:
+                vectors[tuple(filled[:port] + [value] + filled[port + 1 :])] = None
+    return list(vectors)[:limit]
+
+
+def pack_vectors(vectors, widths):
+    """Input columns (one int per input bit, most significant first) for explicit vectors"""
+    columns = []
+    for port, width in enumerate(widths):
+        for bit in range(width - 1, -1, -1):
+            column = 0
+            for row, vector in enumerate(vectors):
+                column |= ((vector[port] >> bit) & 1) << row
+            columns.append(column)
+    return columns
+
+
+def row_values(columns, widths, row):
+    """The port values of one row of packed columns (inverse of pack_vectors)"""
+    values = []
+    index = 0
+    for width in widths:
+        value = 0
+        for column in columns[index : index + width]:
+            value = (value << 1) | ((column >> row) & 1)
+        values.append(value)
+        index += width
+    return tuple(values)
+
+
+class ShardChecker:
+    """Checks shards of input vectors against the reference; one per worker"""
+
+    def __init__(self, netlist, expected, stop=None, limit=1):
+        self.kernel = compile_netlist(netlist)
+        self.input_widths = port_widths(netlist.inputs)
+        self.output_widths = port_widths(netlist.outputs)
+        self.reference = None
+        self.expected = expected
+        if isinstance(expected, Netlist):
+            self.reference = compile_netlist(expected)
+        self.stop = stop
+        self.limit = limit
+
+    def should_cancel(self):
+        return self.stop is not None and self.stop.is_set()
+
+    def columns(self, shard):
+        """Yield (input columns, row count) for each bit-parallel batch of a shard"""
+        kind = shard[0]
+        n = sum(self.input_widths)
+        if kind == "exhaustive":
+            _, first_chunk, chunk_count = shard
+            chunk_bits = min(n, CHUNK_INPUT_BITS)
+            mask = (1 << (1 << chunk_bits)) - 1
+            low_patterns = [input_pattern(bit, chunk_bits) for bit in range(chunk_bits)]
+            for chunk in range(first_chunk, first_chunk + chunk_count):
+                columns = []
+                for j in range(n):
+                    bit = n - 1 - j
+                    if bit < chunk_bits:
+                        columns.append(low_patterns[bit])
+                    else:
+                        columns.append(mask if (chunk >> (bit - chunk_bits)) & 1 else 0)
+                yield columns, 1 << chunk_bits
+        elif kind == "random":
+            _, seed, batch, count = shard
+            rng = random.Random(f"{seed}:{batch}")
+            yield [rng.getrandbits(count) for _ in range(n)], count
+        else:
+            _, vectors = shard
+            yield pack_vectors(vectors, self.input_widths), len(vectors)
+
+    def check(self, shard):
+        """Return (vectors checked, mismatches) for one shard"""
+        checked = 0
+        for columns, rows in self.columns(shard):
+            if self.should_cancel():
+                break
+            mask = (1 << rows) - 1
+            try:
+                actual = self.kernel(columns, mask, self.should_cancel)
+                if self.reference is not None:
+                    wanted = self.reference(columns, mask, self.should_cancel)
+                else:
+                    wanted = self.expected_columns(columns, rows)
+            except SimulationCancelled:
+                break
+            checked += rows
+            diff = 0
+            for a, b in zip(actual, wanted):
+                diff |= a ^ b
+            if diff:
+                return checked, self.mismatches(columns, actual, wanted, diff)
+        return checked, []
+
+    def expected_columns(self, columns, rows):
+        """Call the expected function on every row and pack its outputs"""
+        # Transpose through binary strings: shifting a 2^16-bit column once
+        # per row would copy the whole column every time
+        bits = [format(column, f"0{rows}b")[::-1] for column in columns]
+        spans = list(itertools.pairwise(itertools.accumulate(self.input_widths, initial=0)))
+        formats = [f"0{width}b" for width in self.output_widths]
+        expected = self.expected
+        output_rows = []
+        for row_bits in zip(*bits) if bits else [()] * rows:
+            text = "".join(row_bits)
+            outputs = expected(tuple(int(text[start:stop], 2) for start, stop in spans))
+            output_rows.append("".join(format(v, f) for v, f in zip(outputs, formats)))
+        return [int("".join(column)[::-1], 2) for column in zip(*output_rows)]
+
+    def mismatches(self, columns, actual, wanted, diff):
+        found = []
+        while diff and len(found) < self.limit:
+            row = (diff & -diff).bit_length() - 1
+            diff &= diff - 1
+            found.append(
+                (
+                    row_values(columns, self.input_widths, row),
+                    row_values(wanted, self.output_widths, row),
+                    row_values(actual, self.output_widths, row),
+                )
+            )
+        return found
+
+
+_current_job = None  # Worker side: the pool's shared id of the job being checked
+_job_checker = None  # Worker side: (job id, ShardChecker) of the last job seen
+
+
+class _JobStop:
+    """Stop flag of one job: set once the pool has moved on to another job"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def is_set(self):
+        return _current_job.value != self.job
+
+
+def _init_worker(current_job):
+    global _current_job
+    _current_job = current_job
+
+
+def _check_shard(job, payload, shard):
+    # The payload is the pickled (netlist, expected, limit), unpickled and
+    # compiled once per job; its other shards reuse the checker
+    global _job_checker
+    if _job_checker is None or _job_checker[0] != job:
+        netlist, expected, limit = pickle.loads(payload)
+        _job_checker = (job, ShardChecker(netlist, expected, _JobStop(job), limit))
+    return _job_checker[1].check(shard)
+
+
+class VectorPool:
+    """Worker processes kept across checks, so a game session starts them once.
+
+    Each check is a job with its own id; workers stop a shard as soon as the
+    shared job id moves past theirs, which is how a finished or cancelled
+    check tells them to stop. One check runs at a time.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.context = multiprocessing.get_context("spawn")
+        self.current_job = self.context.Value("q", 0)
+        self.lock = threading.Lock()
+        self.executor = None  # Started by the first check that needs it
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def run(self, netlist, expected, limit, shards, finish, should_cancel=None):
+        """Check shards until finish(checked, mismatches) returns True.
+
+        Raises BrokenProcessPool if a worker died; the next run starts new
+        workers.
+        """
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=self.context,
+                    initializer=_init_worker,
+                    initargs=(self.current_job,),
+                )
+            self.current_job.value += 1
+            job = self.current_job.value
+            payload = pickle.dumps((netlist, expected, limit))
+            pending = set()
+            try:
+                for shard in shards:
+                    pending.add(self.executor.submit(_check_shard, job, payload, shard))
+                while pending:
+                    done, pending = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    if any(finish(*future.result()) for future in done):
+                        break
+                    if should_cancel and should_cancel():
+                        raise SimulationCancelled("verification cancelled")
+            except BrokenProcessPool:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+                raise
+            finally:
+                # Stop running shards early and drop the ones not started
+                self.current_job.value += 1
+                for future in pending:
+                    future.cancel()
+
+    def close(self):
+        """Stop the worker processes (the next check starts new ones)"""
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
+
+
+def plan_shards(netlist, workers, exhaustive_max_inputs, random_vectors, seed):
+    """Return (mode, total vectors, shards) covering the vectors to check"""
+    n = len(netlist.input_bits)
+    if n <= exhaustive_max_inputs:
+        chunks = 1 << max(0, n - CHUNK_INPUT_BITS)
+        per_shard = max(1, chunks // (workers * SHARDS_PER_WORKER))
+        shards = [
+            ("exhaustive", first, min(per_shard, chunks - first))
+            for first in range(0, chunks, per_shard)
+        ]
+        return "exhaustive", 1 << n, shards
+
+    vectors = corner_vectors(port_widths(netlist.inputs))
+    shards = [
+        ("corners", vectors[start : start + BATCH_VECTORS])
+        for start in range(0, len(vectors), BATCH_VECTORS)
+    ]
+    for batch, start in enumerate(range(0, random_vectors, BATCH_VECTORS)):
+        shards.append(("random", seed, batch, min(BATCH_VECTORS, random_vectors - start)))
+    return "random", len(vectors) + random_vectors, shards
+
+
+def check_vectors(
+    netlist,
+    expected,
+    workers=None,
+    exhaustive_max_inputs=EXHAUSTIVE_MAX_INPUTS,
+    random_vectors=RANDOM_VECTORS,
+    seed=0,
+    limit=1,
+    should_cancel=None,
+    on_progress=None,
+    pool=None,
+):
+    """Check a combinational netlist against `expected` on a pool of processes.
+
+    Returns a VectorCheckResult holding up to `limit` mismatches from the
+    first shard that found any. `on_progress(checked, total)` is called as
+    shards finish. Raises SimulationCancelled if should_cancel() turns true.
+    Shards run on `pool` (a VectorPool) if given, else on a pool of
+    `workers` processes started for this check.
+    """
+    if netlist.flops:
+        raise SimulatorError(f"{netlist.name} has flip-flops; only combinational designs")
+    if isinstance(expected, Netlist):
+        if (port_widths(expected.inputs), port_widths(expected.outputs)) != (
+            port_widths(netlist.inputs),
+            port_widths(netlist.outputs),
+        ):
+            raise SimulatorError(f"{expected.name} and {netlist.name} have different ports")
+    workers = pool.workers if pool is not None else workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    mode, total, shards = plan_shards(netlist, workers, exhaustive_max_inputs, random_vectors, seed)
+    result = VectorCheckResult(mode, 0)
+
+    def finish(checked, mismatches):
+        result.vectors += checked
+        if on_progress:
+            on_progress(result.vectors, total)
+        if mismatches:
+            result.mismatches = mismatches
+            return True
+        return False
+
+    if workers == 1 or len(shards) == 1:
+        # Not worth starting processes for
+        checker = ShardChecker(netlist, expected, limit=limit)
+        for shard in shards:
+            if should_cancel and should_cancel():
+                raise SimulationCancelled("verification cancelled")
+            if finish(*checker.check(shard)):
+                break
+        result.seconds = time.perf_counter() - start
+        return result
+
+    if pool is not None:
+        pool.run(netlist, expected, limit, shards, finish, should_cancel)
+    else:
+        with VectorPool(min(workers, len(shards))) as pool:
+            pool.run(netlist, expected, limit, shards, finish, should_cancel)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def load_netlist(path, top=None):
+    workspace_dir = os.path.dirname(path) or "."
+    filename = os.path.basename(path)
+    modules = load_workspace_library(workspace_dir, filename)
+    if top is None:
+        top = parse_file(path)[-1].name
+    return flatten(modules, top)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("design", help="design .sv file")
+    parser.add_argument("top", help="design module to check")
+    parser.add_argument("reference", help="reference .sv file")
+    parser.add_argument("reference_top", nargs="?", help="reference module (default: last in file)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--exhaustive-max", type=int, default=EXHAUSTIVE_MAX_INPUTS,
+                        help=f"widest input checked exhaustively (default {EXHAUSTIVE_MAX_INPUTS})")
+    parser.add_argument("--vectors", type=int, default=RANDOM_VECTORS,
+                        help=f"random vectors above that (default {RANDOM_VECTORS})")
+    parser.add_argument("--seed", type=int, default=0, help="random vector seed (default 0)")
+    args = parser.parse_args(argv[1:])
+
+    try:
+        netlist = load_netlist(args.design, args.top)
+        reference = load_netlist(args.reference, args.reference_top)
+        result = check_vectors(
+            netlist,
+            reference,
+            workers=args.workers,
+            exhaustive_max_inputs=args.exhaustive_max,
+            random_vectors=args.vectors,
+            seed=args.seed,
+        )
+    except SimulatorError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(
+        f"{netlist.name} vs {reference.name}: {result.vectors} {result.mode} vectors "
+        f"in {result.seconds:.2f} s"
+    )
+    if result.passed:
+        print("PASS")
+        return 0
+    input_names = [name for name, _ in netlist.inputs]
+    output_names = [name for name, _ in netlist.outputs]
+    for inputs, wanted, actual in result.mismatches:
+        row = ", ".join(f"{n}={v}" for n, v in zip(input_names, inputs))
+        expected_text = ", ".join(f"{n}={v}" for n, v in zip(output_names, wanted))
+        actual_text = ", ".join(f"{n}={v}" for n, v in zip(output_names, actual))
+        print(f"FAIL: {row} expected {expected_text}, got {actual_text}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,15 @@
+// ------------------- D Flip-Flop -------------------
+// Function: outQ takes the value of inD on each rising edge of clk
+// and holds it until the next one
+// Timing:
+// clk | inD | outQ (after the edge)
+//  ^  |  0  |  0
+//  ^  |  1  |  1
+//  -  |  x  |  unchanged
+module dff (
+    input  logic clk,
+    input  logic inD,
+    output logic outQ
+);
+    always_ff @(posedge clk) outQ <= inD;
+endmodule